@@ -1,18 +1,32 @@
-from flask import Flask, url_for, request
-from sqlalchemy import text
-from sqlalchemy.exc import SQLAlchemyError
+from flask import Flask, url_for, request, send_file, g
 from models import db, Admin, Configuracao
 from blueprints.admin import admin_bp
 from blueprints.loja import loja_bp
 from blueprints.configuracoes import configuracoes_bp
 from blueprints.usuarios import usuarios_bp
-from werkzeug.security import generate_password_hash
+from services.assets import AssetManifest, gerar_manifesto, versao_do_manifesto
+from services.bundles import Bundles
+from services.compressao import comprimir_resposta, comprimivel, escolher_variante, tipo_mime
+from services.cache_http import versao_catalogo
+from services.sitemap import LIMITE_URLS, SitemapCache, origem_canonica
+from services.migracoes import estado as estado_schema, migrar
+from services.imagens import imagem_pronta, manifesto_imagem, upload_imutavel
+from services.logs import configurar_logs, obter_logger
+from services.perfil_sql import registrar as registrar_perfil_sql
+from services.metricas import registrar as registrar_metricas
+from services.banco import opcoes_engine, registrar as registrar_banco
+from services.replicas import binds_replicas, leitura_replica, registrar as registrar_replicas
+from services.consultas_lentas import registrar as registrar_consultas_lentas
+from services.precarga import preload_ativo, registrar as registrar_precarga
+from commands import register_commands
+from markupsafe import Markup, escape
+from werkzeug.security import generate_password_hash, safe_join
 from flask_wtf.csrf import CSRFProtect, generate_csrf
+import hashlib
 import os
+import threading
 import pymysql
-from colorama import Fore, Style
 # from init_config import init_config
-from datetime import datetime
 from dotenv import load_dotenv
 
 # Instalar PyMySQL como substituto do MySQLdb
@@ -22,41 +36,139 @@ pymysql.install_as_MySQLdb()
 load_dotenv()
 
 csrf = CSRFProtect()
+log = obter_logger('app')
+
+# Valores usados quando a tabela de configurações não pode ser lida
+CONFIGURACOES_PADRAO = {
+    'site_nome': 'PastaArt Encanto',
+    'site_descricao': 'Doces artesanais feitos com muito carinho',
+    'telefone': '(11) 99999-9999',
+    'email': 'contato@pastaart.com.br',
+    'endereco': 'Rua das Flores, 123 - Centro',
+    'whatsapp': '5511999999999',
+    'facebook_url': '',
+    'instagram_url': '',
+    'whatsapp_url': '',
+    'tiktok_url': '',
+    'youtube_url': '',
+    'linkedin_url': '',
+    'rodape_texto': '© 2025 PastaArt Encanto. Todos os direitos reservados.',
+    'site_logo': 'images/logo.svg',
+    'site_banner': 'images/banner.webp',
+    'card_tradicional_image': 'images/doces_tradicionais.png',
+    'card_personalizado_image': 'images/doces_personalizados.png',
+    'tradicional_title': 'Doces Tradicionais',
+    'tradicional_description': 'Nossos doces clássicos, feitos com receitas tradicionais e ingredientes selecionados.',
+    'personalizado_title': 'Doces Personalizados',
+    'personalizado_description': 'Doces únicos e personalizados para seus eventos especiais.',
+    'about_title': 'Sobre a PastaArt Encanto',
+    'about_description': 'Somos especialistas em criar doces únicos e personalizados que transformam seus momentos especiais em memórias inesquecíveis.',
+
+    'produtos_titulo': 'Nossos Doces',
+    'produtos_subtitulo': 'Escolha a categoria que melhor atende suas necessidades',
+    'checkout_titulo': 'Finalizar Pedido',
+    'checkout_descricao': 'Seus dados serão utilizados para contato via WhatsApp',
+    'checkout_botao_texto': 'Confirmar Pedido',
+    'checkout_telefone_obrigatorio': 'Telefone necessário! Precisamos do seu telefone para entrar em contato via WhatsApp.',
+    'pedido_sucesso_titulo': 'Pedido Enviado com Sucesso!',
+    'pedido_sucesso_subtitulo': 'Olá {nome}, seu pedido foi enviado para nosso WhatsApp',
+    'pedido_tempo_resposta': '1 hora',
+    'pedido_whatsapp_texto': 'Abrir WhatsApp',
+    'dashboard_titulo': 'Dashboard',
+    'dashboard_subtitulo': 'Visão geral da sua loja',
+    'dashboard_total_produtos': 'Total de Produtos',
+    'dashboard_produtos_ativos': 'Produtos Ativos',
+    'dashboard_produtos_inativos': 'Produtos Inativos',
+    'dashboard_pedidos_hoje': 'Pedidos Hoje',
+    'dashboard_pedidos_pendentes': 'pendentes',
+    'dashboard_novo_produto_titulo': 'Novo Produto',
+    'dashboard_novo_produto_descricao': 'Adicionar um novo doce ao catálogo',
+    'dashboard_gerenciar_produtos_titulo': 'Gerenciar Produtos',
+    'dashboard_gerenciar_produtos_descricao': 'Ver e editar produtos existentes',
+    'dashboard_ver_pedidos_titulo': 'Ver Pedidos',
+    'dashboard_ver_pedidos_descricao': 'Gerenciar todos os pedidos da loja',
+    'dashboard_ver_loja_titulo': 'Ver Loja',
+    'dashboard_ver_loja_descricao': 'Visualizar como os clientes veem sua loja',
+    'dashboard_pedidos_recentes_titulo': 'Pedidos Recentes',
+    'dashboard_produtos_recentes_titulo': 'Produtos Recentes',
+    'dashboard_ver_todos': 'Ver Todos',
+    'dashboard_ver_detalhes': 'Ver Detalhes',
+    'dashboard_editar': 'Editar',
+    'dashboard_mais': 'mais',
+    'admin_produtos_titulo': 'Produtos',
+    'admin_produtos_subtitulo': 'Gerencie todos os doces da sua loja',
+    'admin_novo_produto': 'Novo Produto',
+    'admin_lista_produtos': 'Lista de Produtos',
+    'admin_todos_status': 'Todos os Status',
+    'admin_apenas_ativos': 'Apenas Ativos',
+    'admin_apenas_inativos': 'Apenas Inativos',
+    'admin_coluna_imagem': 'Imagem',
+    'admin_coluna_nome': 'Nome',
+    'admin_coluna_preco': 'Preço',
+    'admin_coluna_sabores': 'Sabores',
+    'admin_coluna_qtd_min': 'Qtd. Mín.',
+    'admin_coluna_estoque': 'Estoque',
+    'admin_coluna_status': 'Status',
+    'admin_coluna_data': 'Data',
+    'admin_coluna_acoes': 'Ações',
+    'admin_editar': 'Editar',
+    'admin_excluir': 'Excluir',
+    'admin_confirmar_exclusao': 'Tem certeza que deseja excluir o produto',
+    'admin_nao_pode_excluir': 'Não é possível excluir este produto',
+    'admin_form_info_basicas': 'Informações Básicas',
+    'admin_form_nome_produto': 'Nome do Produto',
+    'admin_form_descricao': 'Descrição',
+    'admin_form_placeholder_nome': 'Ex: Brigadeiro Gourmet de Chocolate',
+    'admin_form_placeholder_descricao': 'Descreva os sabores, ingredientes e ocasiões especiais...',
+    'admin_form_hint_nome': 'Escolha um nome atrativo e descritivo',
+    'admin_form_hint_descricao': 'Descreva detalhes que atraiam os clientes'
+}
 
-def debug_log(message, level="INFO"):
-    """Log colorido para debug"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    colors = {
-        "INFO": Fore.CYAN,
-        "SUCCESS": Fore.GREEN,
-        "WARNING": Fore.YELLOW,
-        "ERROR": Fore.RED,
-        "ADMIN": Fore.MAGENTA
-    }
-    color = colors.get(level, Fore.WHITE)
-    print(f"{Fore.WHITE}[{timestamp}]{color} {level}: {message}{Style.RESET_ALL}")
 
 def create_app():
     """Criar e configurar a aplicação Flask"""
     app = Flask(__name__)
     
+    # Detectar ambiente de produção (LocalWeb/hospedagem compartilhada)
+    is_production = os.getenv('FLASK_ENV') == 'production' or 'public_html' in os.getcwd()
+    
+    # Logs estruturados: JSON em produção, texto colorido no desenvolvimento.
+    # LOG_AMOSTRA_CARRINHO é a fração dos eventos de carrinho registrados.
+    app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO' if is_production else 'DEBUG')
+    app.config['LOG_FORMAT'] = os.getenv('LOG_FORMAT', 'json' if is_production else 'texto')
+    app.config['LOG_AMOSTRA_CARRINHO'] = float(os.getenv('LOG_AMOSTRA_CARRINHO', '0.1' if is_production else '1'))
+    configurar_logs(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'],
+                    amostragem={'carrinho': app.config['LOG_AMOSTRA_CARRINHO']})
+    
     # Configurações
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'pasta-art-encanto-secret-key-2025')
-    # Versão de assets para cache busting (definível por variável de ambiente)
-    # Inclui microsegundos para garantir mudança a cada restart em dev
-    asset_version = (
-        os.getenv('ASSET_VERSION')
-        or os.getenv('RELEASE')
-        or datetime.now().strftime('%Y%m%d%H%M%S%f')[:16]  # YYYYMMDDHHMMSSFF
+    # Cache busting por hash do conteúdo de cada arquivo estático (ver services/assets.py).
+    # O manifesto é gerado no deploy (flask --app app assets-manifesto) ou, na falta
+    # dele, calculado na inicialização; é o mesmo em todos os workers.
+    app.config['ASSET_MANIFEST'] = os.getenv(
+        'ASSET_MANIFEST', os.path.join(app.root_path, 'assets-manifest.json')
     )
+    asset_manifest = AssetManifest(app.static_folder, app.config['ASSET_MANIFEST'])
+    app.extensions['asset_manifest'] = asset_manifest
+    # Bundles CSS/JS minificados por página (static/dist/), gerados no deploy
+    # (flask --app app assets-bundles) ou aqui, se ainda não existirem
+    try:
+        bundles = Bundles(app.static_folder)
+    except OSError as e:
+        bundles = None
+        log.error("Não foi possível gerar os bundles de static/dist: %s", e)
+    app.extensions['bundles'] = bundles
+    # ASSET_VERSION/RELEASE continuam aceitos para forçar uma versão global
+    asset_version = os.getenv('ASSET_VERSION') or os.getenv('RELEASE') or asset_manifest.versao
     app.config['ASSET_VERSION'] = asset_version
-    debug_log(f"🔄 Cache busting ativo: ASSET_VERSION={asset_version}", "INFO")
+    # Templates também entram no ETag das páginas: um deploy só de HTML invalida o cache
+    app.config['TEMPLATES_VERSION'] = versao_do_manifesto(
+        gerar_manifesto(os.path.join(app.root_path, app.template_folder))
+    )
+    log.info("Cache busting por hash (%s): ASSET_VERSION=%s", asset_manifest.origem, asset_version)
     # Cache padrão de arquivos estáticos (1 ano)
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
     
-    # Detectar ambiente de produção (LocalWeb/hospedagem compartilhada)
-    is_production = os.getenv('FLASK_ENV') == 'production' or 'public_html' in os.getcwd()
-    
     # Configuração do banco de dados
     db_host = os.getenv('DB_HOST', 'localhost')
     db_port = os.getenv('DB_PORT', '3306')
@@ -64,19 +176,31 @@ def create_app():
     db_user = os.getenv('DB_USER', 'pasta_art_user')
     db_password = os.getenv('DB_PASSWORD', '')
     
+    # DATABASE_URL tem prioridade (ex.: bancos temporários em scripts de carga)
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        log.info("Usando DATABASE_URL: %s", database_url.split('@')[-1])
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     # Verificar se as variáveis do MySQL estão configuradas
-    if not db_password:
+    elif not db_password:
         # Em desenvolvimento/teste, usar SQLite
-        debug_log("⚠️ Usando SQLite para desenvolvimento/teste", "WARNING")
+        log.warning("Usando SQLite para desenvolvimento/teste")
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///pasta_art.db'
     else:
         if is_production:
-            debug_log(f"🚀 PRODUÇÃO: Conectando ao MySQL: {db_host}:{db_port}/{db_name}", "SUCCESS")
+            log.info("PRODUÇÃO: conectando ao MySQL: %s:%s/%s", db_host, db_port, db_name)
         else:
-            debug_log(f"🔗 Conectando ao MySQL: {db_host}:{db_port}/{db_name}", "INFO")
+            log.info("Conectando ao MySQL: %s:%s/%s", db_host, db_port, db_name)
         app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}?charset=utf8mb4'
     
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool por worker com pre-ping e reciclagem antes do wait_timeout do MySQL (services/banco.py)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['DB_POOL_AQUECER'] = os.getenv('DB_POOL_AQUECER', '1' if is_production else '0') != '0'
+    # gunicorn --preload (gunicorn.conf.py): app montada no mestre, conexões só nos workers
+    app.config['PRELOAD'] = preload_ativo()
+    # Réplicas de leitura opcionais (URIs separadas por vírgula) para catálogo, sitemap e listagens do admin
+    app.config['SQLALCHEMY_BINDS'] = binds_replicas(os.getenv('DB_REPLICAS', ''))
     
     # Configurações específicas para produção
     if is_production:
@@ -86,6 +210,15 @@ def create_app():
         app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
         app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'static', 'uploads')
     
+    # Origem pública (ex.: https://pastaartencanto.com.br) das URLs do sitemap e do
+    # robots.txt; sem ela, essas URLs vêm do Host de quem pediu (ver origem_canonica)
+    app.config['SITE_URL'] = os.getenv('SITE_URL', '')
+    # Hosts aceitos (separados por vírgula): outros respondem 400 antes de chegar às views
+    if os.getenv('SITE_HOSTS'):
+        app.config['TRUSTED_HOSTS'] = [h.strip() for h in os.getenv('SITE_HOSTS').split(',') if h.strip()]
+    if is_production and not (app.config['SITE_URL'] or app.config.get('SERVER_NAME')):
+        log.warning("SITE_URL não configurada: sitemap e robots.txt usarão o Host de cada requisição")
+    
     # Configurações de autenticação social
     app.config['GOOGLE_CLIENT_ID'] = os.getenv('GOOGLE_CLIENT_ID', '')
     app.config['GOOGLE_CLIENT_SECRET'] = os.getenv('GOOGLE_CLIENT_SECRET', '')
@@ -93,6 +226,8 @@ def create_app():
     # Inicializar extensões
     db.init_app(app)
     csrf.init_app(app)
+    registrar_banco(app)
+    registrar_replicas(app)
     
     # Registrar blueprints
     app.register_blueprint(admin_bp, url_prefix='/admin')
@@ -100,103 +235,102 @@ def create_app():
     app.register_blueprint(configuracoes_bp, url_prefix='/admin')
     app.register_blueprint(usuarios_bp, url_prefix='/usuario')
     
-    # Migração leve: garantir colunas de endereço no MySQL
-    def ensure_usuario_address_columns():
-        try:
-            engine_name = db.engine.url.get_backend_name()
-        except Exception:
-            engine_name = ''
-        # Apenas para MySQL/MariaDB
-        if engine_name not in ('mysql', 'mariadb', 'mysql+pymysql'):
-            return
-        # Tenta adicionar colunas individualmente. Usa IF NOT EXISTS quando suportado.
-        ddls = [
-            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS cep VARCHAR(9) NULL",
-            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS logradouro VARCHAR(150) NULL",
-            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS bairro VARCHAR(100) NULL",
-            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS cidade VARCHAR(100) NULL",
-            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS estado VARCHAR(2) NULL",
-            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS numero_endereco VARCHAR(20) NULL",
-            "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS complemento_endereco VARCHAR(100) NULL",
-        ]
-        for ddl in ddls:
-            try:
-                db.session.execute(text(ddl))
-                db.session.commit()
-            except SQLAlchemyError as e:
-                # Se a variante IF NOT EXISTS não for suportada, tenta sem ela e ignora duplicatas
-                msg = str(e).lower()
-                if 'syntax' in msg or 'if not exists' in msg:
-                    try:
-                        fallback = ddl.replace(' IF NOT EXISTS', '')
-                        db.session.execute(text(fallback))
-                        db.session.commit()
-                    except SQLAlchemyError as e2:
-                        # Ignora erro de coluna duplicada
-                        if 'duplicate column' in str(e2).lower() or '1060' in str(e2):
-                            db.session.rollback()
-                            continue
-                        db.session.rollback()
-                        raise
-                else:
-                    # Ignora erro de coluna duplicada
-                    if 'duplicate column' in msg or '1060' in msg:
-                        db.session.rollback()
-                        continue
-                    db.session.rollback()
-                    raise
+    # Comandos de manutenção (flask --app app <comando>)
+    register_commands(app)
     
-    # Executar migração leve dentro do app context
-    try:
-        with app.app_context():
-            ensure_usuario_address_columns()
-            # Migração leve para schema de KIT
-            try:
-                engine_name = db.engine.url.get_backend_name()
-            except Exception:
-                engine_name = ''
-            if engine_name in ('mysql', 'mariadb', 'mysql+pymysql'):
-                kit_ddls = [
-                    "ALTER TABLE doces ADD COLUMN IF NOT EXISTS desconto_percentual DECIMAL(5,2) NULL",
-                    "ALTER TABLE doces ADD COLUMN IF NOT EXISTS mais_pedido TINYINT(1) NULL DEFAULT 0",
-                    "CREATE TABLE IF NOT EXISTS kit_itens (\n"
-                    "  id INT AUTO_INCREMENT PRIMARY KEY,\n"
-                    "  kit_id INT NOT NULL,\n"
-                    "  produto_id INT NOT NULL,\n"
-                    "  quantidade INT NOT NULL DEFAULT 1,\n"
-                    "  INDEX (kit_id), INDEX (produto_id),\n"
-                    "  CONSTRAINT fk_kit_itens_kit FOREIGN KEY (kit_id) REFERENCES doces(id) ON DELETE CASCADE,\n"
-                    "  CONSTRAINT fk_kit_itens_prod FOREIGN KEY (produto_id) REFERENCES doces(id)\n"
-                    ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
-                ]
-                for ddl in kit_ddls:
-                    try:
-                        db.session.execute(text(ddl))
-                        db.session.commit()
-                    except SQLAlchemyError as e:
-                        msg = str(e).lower()
-                        if 'if not exists' in msg or 'syntax' in msg:
-                            try:
-                                fallback = ddl.replace(' IF NOT EXISTS', '')
-                                db.session.execute(text(fallback))
-                                db.session.commit()
-                            except SQLAlchemyError:
-                                db.session.rollback()
-                                continue
-                        else:
-                            db.session.rollback()
-                            if 'duplicate' in msg or 'exists' in msg:
-                                continue
-                            raise
-    except Exception as e:
-        debug_log(f"Falha ao aplicar migração leve de endereço: {e}", "WARNING")
+    # Contagem de consultas SQL por requisição e alerta de N+1 (services/perfil_sql.py)
+    registrar_perfil_sql(app)
+    # Consultas acima de SQL_LENTA_MS, com parâmetros e EXPLAIN, em instance/logs/
+    registrar_consultas_lentas(app)
+    # Métricas Prometheus por rota em /admin/metrics (services/metricas.py). O
+    # coletor externo autentica com "Authorization: Bearer <METRICS_TOKEN>".
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN', '')
+    registrar_metricas(app)
+    
+    # Schema: as migrações rodam no deploy (flask --app app db-migrar, ver
+    # migrations/); na inicialização do worker só uma consulta de versão
+    app.config['SCHEMA_VERIFICAR'] = os.getenv('SCHEMA_VERIFICAR', '1') != '0'
+    if app.config['SCHEMA_VERIFICAR']:
+        try:
+            with app.app_context():
+                versao_banco, versao_codigo = estado_schema(db.engine)
+            if versao_banco is None or versao_banco < versao_codigo:
+                log.warning("Schema do banco na versão %s, código espera %s: rode 'flask --app app db-migrar'",
+                            versao_banco or 0, versao_codigo)
+            elif versao_banco > versao_codigo:
+                log.warning("Schema do banco (v%s) mais novo que o código (v%s)", versao_banco, versao_codigo)
+        except Exception as e:
+            log.warning("Não foi possível verificar a versão do schema: %s", e)
 
     # Helper para gerar URLs de assets com versão (cache busting)
     def asset_url(filename: str) -> str:
-        return url_for('static', filename=filename, v=app.config.get('ASSET_VERSION', '1'))
+        # Uploads endereçados por conteúdo já são únicos: sem ?v=, o cache sobrevive a deploys
+        if upload_imutavel(filename):
+            return url_for('static', filename=filename)
+        # Bundles já levam o hash no nome (dist/loja.css -> dist/loja.<hash>.css)
+        bundle = bundles.resolver(filename, recarregar=app.debug) if bundles else None
+        if bundle:
+            return url_for('static', filename=bundle)
+        # Em debug, arquivos editados ganham novo hash sem reiniciar
+        versao = asset_manifest.versao_de(filename, recarregar=app.debug) or app.config.get('ASSET_VERSION', '1')
+        return url_for('static', filename=filename, v=versao)
     app.jinja_env.globals['asset_url'] = asset_url
 
-    # Cabeçalhos de cache: HTML não é cacheado; estáticos são fortemente cacheados
+    # Helper para <picture> responsivo (srcset WebP + JPEG) a partir do manifesto de derivadas
+    def responsive_image(filename: str, alt: str = '', sizes: str = '100vw', **attrs) -> Markup:
+        extra = ''.join(
+            f' {escape(k.rstrip("_").replace("_", "-"))}="{escape(v)}"'
+            for k, v in attrs.items() if v is not None
+        )
+        manifesto = manifesto_imagem(filename)
+        if not manifesto or not manifesto.get('variantes'):
+            return Markup(f'<img src="{escape(asset_url(filename))}" alt="{escape(alt)}"{extra}>')
+        pasta = os.path.dirname(filename)
+        variantes = manifesto['variantes']
+
+        def srcset(formato):
+            return ', '.join(
+                f"{asset_url(f'{pasta}/{v[formato]}')} {v['largura']}w" for v in variantes
+            )
+
+        fallback = asset_url(f"{pasta}/{variantes[-1]['jpeg']}")
+        return Markup(
+            f'<picture>'
+            f'<source type="image/webp" srcset="{escape(srcset("webp"))}" sizes="{escape(sizes)}">'
+            f'<img src="{escape(fallback)}" srcset="{escape(srcset("jpeg"))}" sizes="{escape(sizes)}"'
+            f' alt="{escape(alt)}"{extra}>'
+            f'</picture>'
+        )
+    app.jinja_env.globals['responsive_image'] = responsive_image
+    # Imagens enviadas ficam pendentes até o pool terminar o processamento
+    app.jinja_env.globals['imagem_pronta'] = imagem_pronta
+
+    # Estáticos de texto: serve a variante .br/.gz gerada no deploy
+    # (flask --app app assets-comprimir) quando o cliente aceita; custo zero de CPU
+    servir_estatico_padrao = app.view_functions['static']
+
+    def servir_estatico(filename):
+        if not comprimivel(filename):
+            return servir_estatico_padrao(filename=filename)
+        path = safe_join(app.static_folder, filename)
+        variante = escolher_variante(path, request.accept_encodings) if path else None
+        if variante:
+            caminho_variante, codificacao = variante
+            response = send_file(
+                caminho_variante,
+                mimetype=tipo_mime(filename),
+                max_age=app.get_send_file_max_age(filename),
+                conditional=True,
+            )
+            response.headers['Content-Encoding'] = codificacao
+        else:
+            response = servir_estatico_padrao(filename=filename)
+        response.vary.add('Accept-Encoding')
+        return response
+    app.view_functions['static'] = servir_estatico
+
+    # Cabeçalhos de cache: estáticos são fortemente cacheados; páginas com
+    # @pagina_cacheavel revalidam por ETag; as demais (privadas) não são guardadas
     @app.after_request
     def add_cache_headers(response):
         try:
@@ -206,7 +340,7 @@ def create_app():
         if request_path.startswith('/static/'):
             # Regras específicas por tipo de arquivo
             _, ext = os.path.splitext(request_path.lower())
-            if ext in {'.css', '.js'}:
+            if ext in {'.css', '.js'} or upload_imutavel(request_path):
                 response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
             elif ext in {'.png', '.jpg', '.jpeg', '.webp', '.gif', '.svg', '.ico'}:
                 response.headers['Cache-Control'] = 'public, max-age=2592000'
@@ -214,16 +348,19 @@ def create_app():
                 response.headers['Cache-Control'] = 'public, max-age=604800'
             else:
                 response.headers['Cache-Control'] = 'public, max-age=604800'
-        else:
-            # Conteúdo HTML sempre revalida - forçar navegador a sempre verificar mudanças
+        elif not g.get('cache_http'):
+            # Páginas privadas (carrinho, checkout, conta, admin): nunca guardar
             response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
             response.headers['Pragma'] = 'no-cache'
             response.headers['Expires'] = '0'
-            response.headers['Last-Modified'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT')
-            # ETag único para cada resposta HTML garante detecção de mudanças
-            response.headers['ETag'] = f'"{asset_version}-{datetime.now().timestamp()}"'
         return response
 
+    # Compressão dinâmica de HTML/JSON (gzip, ou brotli se instalado). Registrado
+    # depois de add_cache_headers para rodar antes dele (ordem inversa do Flask)
+    @app.after_request
+    def compress_response(response):
+        return comprimir_resposta(response, request, app.config)
+
     # Context processor para configurações globais
     @app.context_processor
     def inject_configuracoes():
@@ -236,90 +373,7 @@ def create_app():
                 configs[config.chave] = config.valor
         except Exception:
             # Se não conseguir buscar, usar valores padrão
-            configs = {
-                'site_nome': 'PastaArt Encanto',
-                'site_descricao': 'Doces artesanais feitos com muito carinho',
-                'telefone': '(11) 99999-9999',
-                'email': 'contato@pastaart.com.br',
-                'endereco': 'Rua das Flores, 123 - Centro',
-                'whatsapp': '5511999999999',
-                'facebook_url': '',
-                'instagram_url': '',
-                'whatsapp_url': '',
-                'tiktok_url': '',
-                'youtube_url': '',
-                'linkedin_url': '',
-                'rodape_texto': '© 2025 PastaArt Encanto. Todos os direitos reservados.',
-                'site_logo': 'images/logo.svg',
-                'site_banner': 'images/banner.webp',
-                'card_tradicional_image': 'images/doces_tradicionais.png',
-                'card_personalizado_image': 'images/doces_personalizados.png',
-                'tradicional_title': 'Doces Tradicionais',
-                'tradicional_description': 'Nossos doces clássicos, feitos com receitas tradicionais e ingredientes selecionados.',
-                'personalizado_title': 'Doces Personalizados',
-                'personalizado_description': 'Doces únicos e personalizados para seus eventos especiais.',
-                'about_title': 'Sobre a PastaArt Encanto',
-                'about_description': 'Somos especialistas em criar doces únicos e personalizados que transformam seus momentos especiais em memórias inesquecíveis.',
-
-                'produtos_titulo': 'Nossos Doces',
-                'produtos_subtitulo': 'Escolha a categoria que melhor atende suas necessidades',
-                'checkout_titulo': 'Finalizar Pedido',
-                'checkout_descricao': 'Seus dados serão utilizados para contato via WhatsApp',
-                'checkout_botao_texto': 'Confirmar Pedido',
-                'checkout_telefone_obrigatorio': 'Telefone necessário! Precisamos do seu telefone para entrar em contato via WhatsApp.',
-                'pedido_sucesso_titulo': 'Pedido Enviado com Sucesso!',
-                'pedido_sucesso_subtitulo': 'Olá {nome}, seu pedido foi enviado para nosso WhatsApp',
-                'pedido_tempo_resposta': '1 hora',
-                'pedido_whatsapp_texto': 'Abrir WhatsApp',
-                'dashboard_titulo': 'Dashboard',
-                'dashboard_subtitulo': 'Visão geral da sua loja',
-                'dashboard_total_produtos': 'Total de Produtos',
-                'dashboard_produtos_ativos': 'Produtos Ativos',
-                'dashboard_produtos_inativos': 'Produtos Inativos',
-                'dashboard_pedidos_hoje': 'Pedidos Hoje',
-                'dashboard_pedidos_pendentes': 'pendentes',
-                'dashboard_novo_produto_titulo': 'Novo Produto',
-                'dashboard_novo_produto_descricao': 'Adicionar um novo doce ao catálogo',
-                'dashboard_gerenciar_produtos_titulo': 'Gerenciar Produtos',
-                'dashboard_gerenciar_produtos_descricao': 'Ver e editar produtos existentes',
-                'dashboard_ver_pedidos_titulo': 'Ver Pedidos',
-                'dashboard_ver_pedidos_descricao': 'Gerenciar todos os pedidos da loja',
-                'dashboard_ver_loja_titulo': 'Ver Loja',
-                'dashboard_ver_loja_descricao': 'Visualizar como os clientes veem sua loja',
-                'dashboard_pedidos_recentes_titulo': 'Pedidos Recentes',
-                'dashboard_produtos_recentes_titulo': 'Produtos Recentes',
-                'dashboard_ver_todos': 'Ver Todos',
-                'dashboard_ver_detalhes': 'Ver Detalhes',
-                'dashboard_editar': 'Editar',
-                'dashboard_mais': 'mais',
-                'admin_produtos_titulo': 'Produtos',
-                'admin_produtos_subtitulo': 'Gerencie todos os doces da sua loja',
-                'admin_novo_produto': 'Novo Produto',
-                'admin_lista_produtos': 'Lista de Produtos',
-                'admin_todos_status': 'Todos os Status',
-                'admin_apenas_ativos': 'Apenas Ativos',
-                'admin_apenas_inativos': 'Apenas Inativos',
-                'admin_coluna_imagem': 'Imagem',
-                'admin_coluna_nome': 'Nome',
-                'admin_coluna_preco': 'Preço',
-                'admin_coluna_sabores': 'Sabores',
-                'admin_coluna_qtd_min': 'Qtd. Mín.',
-                'admin_coluna_estoque': 'Estoque',
-                'admin_coluna_status': 'Status',
-                'admin_coluna_data': 'Data',
-                'admin_coluna_acoes': 'Ações',
-                'admin_editar': 'Editar',
-                'admin_excluir': 'Excluir',
-                'admin_confirmar_exclusao': 'Tem certeza que deseja excluir o produto',
-                'admin_nao_pode_excluir': 'Não é possível excluir este produto',
-                'admin_form_info_basicas': 'Informações Básicas',
-                'admin_form_nome_produto': 'Nome do Produto',
-                'admin_form_descricao': 'Descrição',
-                'admin_form_placeholder_nome': 'Ex: Brigadeiro Gourmet de Chocolate',
-                'admin_form_placeholder_descricao': 'Descreva os sabores, ingredientes e ocasiões especiais...',
-                'admin_form_hint_nome': 'Escolha um nome atrativo e descritivo',
-                'admin_form_hint_descricao': 'Descreva detalhes que atraiam os clientes'
-            }
+            configs = dict(CONFIGURACOES_PADRAO)
         
         return {'config': configs}
     
@@ -357,54 +411,82 @@ def create_app():
             'User-agent: *',
             'Allow: /',
             'Disallow: /admin',
-            f"Sitemap: {request.url_root.rstrip('/')}/sitemap.xml"
+            f"Sitemap: {origem_canonica()}sitemap.xml"
         ]
         from flask import Response
         return Response('\n'.join(lines), mimetype='text/plain; charset=utf-8')
 
-    @app.route('/sitemap.xml')
-    def sitemap_xml():
-        from flask import Response
+    # Sitemap: gerado por versão do catálogo e guardado em memória + instance/sitemap
+    sitemap_cache = SitemapCache(
+        os.path.join(app.instance_path, 'sitemap'),
+        ttl=app.config.get('SITEMAP_TTL', 60),
+        limite_urls=app.config.get('SITEMAP_MAX_URLS', LIMITE_URLS),
+    )
+
+    def sitemap_entradas():
         from models import Doce
-        import xml.etree.ElementTree as ET
         from urllib.parse import urljoin
 
-        urlset = ET.Element('urlset', attrib={
-            'xmlns': 'http://www.sitemaps.org/schemas/sitemap/0.9'
-        })
+        base = origem_canonica()
+        produtos = (
+            Doce.query.with_entities(Doce.id, Doce.categoria, Doce.data_criacao, Doce.data_atualizacao)
+            .filter_by(ativo=True).order_by(Doce.id).all()
+        )
+        ultima = {}
+        for p in produtos:
+            modificado = p.data_atualizacao or p.data_criacao
+            for chave in (None, p.categoria):
+                if modificado and (ultima.get(chave) is None or modificado > ultima[chave]):
+                    ultima[chave] = modificado
 
-        def add_url(loc: str, changefreq: str = 'weekly'):
-            url = ET.SubElement(urlset, 'url')
-            ET.SubElement(url, 'loc').text = loc
-            ET.SubElement(url, 'changefreq').text = changefreq
+        entradas = [
+            (urljoin(base, url_for('loja.index')), ultima.get(None), 'weekly'),
+            (urljoin(base, url_for('loja.doces_tradicionais')), ultima.get('tradicional'), 'weekly'),
+            (urljoin(base, url_for('loja.doces_personalizados')), ultima.get('personalizado'), 'weekly'),
+        ]
+        entradas += [
+            (urljoin(base, url_for('loja.detalhes_doce', doce_id=p.id)), p.data_atualizacao or p.data_criacao, 'weekly')
+            for p in produtos
+        ]
+        return entradas
 
-        base = request.url_root
-        # Rotas estáticas principais
-        add_url(urljoin(base, url_for('loja.index')))
-        add_url(urljoin(base, url_for('loja.doces_tradicionais')))
-        add_url(urljoin(base, url_for('loja.doces_personalizados')))
+    def responder_sitemap(nome):
+        from flask import Response, abort
 
-        # Produtos ativos
-        try:
-            with app.app_context():
-                produtos = Doce.query.filter_by(ativo=True).all()
-                for p in produtos:
-                    add_url(urljoin(base, url_for('loja.detalhes_doce', doce_id=p.id)), 'weekly')
-        except Exception:
-            pass
+        arquivo = sitemap_cache.obter(nome, origem_canonica(), versao_catalogo, sitemap_entradas)
+        if arquivo is None:
+            abort(404)
+        conteudo, lastmod = arquivo
+        response = Response(conteudo, mimetype='application/xml')
+        response.set_etag(hashlib.sha256(conteudo).hexdigest()[:32])
+        if lastmod:
+            response.last_modified = lastmod
+        response.headers['Cache-Control'] = 'public, no-cache'
+        g.cache_http = True
+        return response.make_conditional(request)
+
+    @app.route('/sitemap.xml')
+    @leitura_replica
+    def sitemap_xml():
+        return responder_sitemap('sitemap.xml')
 
-        xml_bytes = ET.tostring(urlset, encoding='utf-8', method='xml')
-        return Response(xml_bytes, mimetype='application/xml; charset=utf-8')
+    @app.route('/sitemap-<int:numero>.xml')
+    @leitura_replica
+    def sitemap_parte(numero):
+        return responder_sitemap(f'sitemap-{numero}.xml')
+
+    # Com PRELOAD: templates compilados no mestre (copy-on-write) e conexões do boot fechadas
+    registrar_precarga(app)
 
     return app
 
 def init_db():
     """Inicializar banco de dados"""
-    debug_log("Verificando banco de dados...")
+    log.info("Verificando banco de dados...")
     
-    with app.app_context():
-        # Criar tabelas apenas se não existirem
-        db.create_all()
+    with get_app().app_context():
+        # Criar tabelas e aplicar migrações pendentes
+        migrar(db.engine, aviso=lambda msg: log.info("Migração %s", msg))
         
         # Criar admin padrão se não existir
         admin = Admin.query.filter_by(usuario='admin').first()
@@ -415,15 +497,37 @@ def init_db():
             )
             db.session.add(admin)
             db.session.commit()
-            debug_log("✅ Admin padrão criado (admin/pasta123)", "SUCCESS")
+            log.info("Admin padrão criado (admin/pasta123)")
         
         # Popular com configurações iniciais
         # init_config()  # Comentado pois agora usamos init_config.py separado
-        debug_log("✅ Configurações iniciais populadas", "SUCCESS")
+        log.info("Configurações iniciais populadas")
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_app():
+    """Aplicação do módulo, criada no primeiro uso (e uma única vez)."""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = create_app()
+    return _app
+
+
+def __getattr__(nome):
+    # `app:app` (gunicorn), `flask --app app` e `from app import app` continuam
+    # funcionando, mas só importar o módulo (ex.: para usar create_app) não
+    # monta a aplicação inteira como efeito colateral
+    if nome == 'app':
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
-app = create_app()
 
 if __name__ == '__main__':
+    app = get_app()
     print("=" * 60)
     print("🍰 PASTAART ENCANTO - Iniciando Aplicação")
     print("=" * 60)
@@ -431,10 +535,9 @@ if __name__ == '__main__':
     # Inicializar banco
     init_db()
     
-    debug_log("✅ Aplicação iniciada com debug colorido!", "SUCCESS")
-    debug_log("📱 Loja: http://localhost:5000", "INFO")
-    debug_log("🛠️ Admin: http://localhost:5000/admin (admin/pasta123)", "ADMIN")
-    debug_log("🔍 Debug mode: ON - Logs coloridos ativados", "INFO")
+    log.info("Aplicação iniciada em modo debug")
+    log.info("Loja: http://localhost:5000")
+    log.info("Admin: http://localhost:5000/admin (admin/pasta123)")
     print("=" * 60)
     
     app.run(debug=True)
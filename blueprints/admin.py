@@ -1,15 +1,18 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from werkzeug.security import check_password_hash, generate_password_hash
-from werkzeug.utils import secure_filename
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, SelectField
 from wtforms.validators import DataRequired
-from models import Admin, Doce, Pedido, db, KitItem
-import os
-from PIL import Image, ImageOps
+from models import Admin, Doce, Pedido, db, KitItem, STATUS_PEDIDO
+from services.catalogo import filtros_da_requisicao, aplicar_filtros_doces, paginar_doces, cursor_anterior
+from services.estoque import reservar_estoque, devolver_estoque, EstoqueInsuficiente
+from services.imagens import ImagemRejeitada, enfileirar_upload, remover_imagem
+from services.logs import obter_logger
+from services.replicas import leitura_replica
 from datetime import datetime, date, timedelta
 
 admin_bp = Blueprint('admin', __name__)
+log = obter_logger('admin')
 
 class LoginForm(FlaskForm):
     """Formulário de login administrativo"""
@@ -33,33 +36,19 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def resize_image(image_path, max_size=(800, 600)):
-    """Ajustar orientação EXIF (iPhone) e redimensionar para otimizar carregamento."""
-    try:
-        with Image.open(image_path) as img:
-            # Corrigir orientação baseada no EXIF (iPhone)
-            try:
-                img = ImageOps.exif_transpose(img)
-            except Exception:
-                pass
-
-            # Redimensionar mantendo proporção
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-
-            # Salvar preservando formato quando possível
-            lower = image_path.lower()
-            if lower.endswith(('.jpg', '.jpeg')):
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-                img.save(image_path, format='JPEG', optimize=True, quality=85)
-            elif lower.endswith('.webp'):
-                img.save(image_path, format='WEBP', quality=85, method=6)
-            elif lower.endswith('.png'):
-                img.save(image_path, format='PNG', optimize=True)
-            else:
-                img.save(image_path, optimize=True)
-    except Exception as e:
-        print(f"Erro ao processar imagem (orientação/redimensionamento): {e}")
+def remover_imagem_se_orfa(imagem_url, doce_id):
+    """Remover imagem do disco se nenhum outro produto/configuração a referenciar"""
+    if not imagem_url:
+        return False
+    from models import Configuracao
+    em_uso = (
+        Doce.query.filter(Doce.imagem_url == imagem_url, Doce.id != doce_id).first()
+        or Configuracao.query.filter_by(valor=imagem_url).first()
+    )
+    if em_uso:
+        return False
+    remover_imagem(imagem_url)
+    return True
 
 @admin_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -92,6 +81,7 @@ def logout():
 
 @admin_bp.route('/')
 @login_required
+@leitura_replica
 def dashboard():
     """Dashboard administrativo"""
     
@@ -129,10 +119,22 @@ def dashboard():
 
 @admin_bp.route('/doces')
 @login_required
+@leitura_replica
 def listar_doces():
-    """Listar todos os doces"""
-    doces = Doce.query.order_by(Doce.data_criacao.desc()).all()
-    return render_template('admin/listar_doces.html', doces=doces)
+    """Listar doces com filtros no servidor e paginação por keyset"""
+    filtros = filtros_da_requisicao(request.args)
+    query = aplicar_filtros_doces(Doce.query, filtros)
+    cursor = request.args.get('cursor')
+    por_pagina = current_app.config.get('ADMIN_DOCES_POR_PAGINA', 50)
+    doces, proximo_cursor = paginar_doces(query, cursor, por_pagina)
+    return render_template('admin/listar_doces.html',
+                         doces=doces,
+                         total_filtrado=query.order_by(None).count(),
+                         filtros=filtros,
+                         filtros_ativos=any(filtros.values()),
+                         cursor=cursor,
+                         anterior=cursor_anterior(query, cursor, por_pagina),
+                         proximo_cursor=proximo_cursor)
 
 @admin_bp.route('/doces/novo', methods=['GET', 'POST'])
 @login_required
@@ -159,16 +161,11 @@ def novo_doce():
         if 'imagem' in request.files:
             file = request.files['imagem']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Adicionar timestamp para evitar conflitos
-                import time
-                timestamp = str(int(time.time()))
-                filename = f"{timestamp}_{filename}"
-                
-                file_path = os.path.join('static/uploads', filename)
-                file.save(file_path)
-                resize_image(file_path)
-                imagem_url = f'uploads/{filename}'
+                # Nome pelo hash do conteúdo; processamento roda no pool de imagens
+                try:
+                    imagem_url = enfileirar_upload(file, 'uploads', derivadas=True)
+                except ImagemRejeitada as e:
+                    flash(f'Imagem não enviada: {e}', 'warning')
         
         # Se for kit, ignorar preço informado e calcular com base nos itens
         desconto_percentual = request.form.get('desconto_percentual', type=float)
@@ -245,6 +242,8 @@ def editar_doce(doce_id):
         doce.estoque_disponivel = request.form.get('estoque_disponivel', type=int)
         doce.destaque = bool(request.form.get('destaque'))
         doce.mais_pedido = bool(request.form.get('mais_pedido'))
+        # Itens de kit não sujam o Doce: marca a alteração explicitamente
+        doce.data_atualizacao = datetime.utcnow()
 
         # Se for kit, recalcular preço e itens
         if doce.unidade_venda == 'kit':
@@ -279,26 +278,19 @@ def editar_doce(doce_id):
             doce.preco = preco_informado
 
         # Upload de nova imagem
+        imagem_antiga = doce.imagem_url
         if 'imagem' in request.files:
             file = request.files['imagem']
             if file and file.filename and allowed_file(file.filename):
-                # Remover imagem antiga se existir
-                if doce.imagem_url:
-                    old_path = os.path.join('static', doce.imagem_url)
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
-                
-                filename = secure_filename(file.filename)
-                import time
-                timestamp = str(int(time.time()))
-                filename = f"{timestamp}_{filename}"
-                
-                file_path = os.path.join('static/uploads', filename)
-                file.save(file_path)
-                resize_image(file_path)
-                doce.imagem_url = f'uploads/{filename}'
+                try:
+                    doce.imagem_url = enfileirar_upload(file, 'uploads', derivadas=True)
+                except ImagemRejeitada as e:
+                    flash(f'Imagem não enviada: {e}', 'warning')
         
         db.session.commit()
+        # Só depois do commit: se ele falhar, o produto continua com a imagem antiga no disco
+        if imagem_antiga != doce.imagem_url:
+            remover_imagem_se_orfa(imagem_antiga, doce.id)
         flash('Doce atualizado com sucesso!', 'success')
         return redirect(url_for('admin.listar_doces'))
     
@@ -312,16 +304,6 @@ def excluir_doce(doce_id):
     try:
         doce = Doce.query.get_or_404(doce_id)
         
-        # Log para debug
-        print(f"Tentando excluir doce ID: {doce_id}, Nome: {doce.nome}")
-        
-        # Remover imagem do disco
-        if doce.imagem_url:
-            image_path = os.path.join('static', doce.imagem_url)
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                print(f"Imagem removida: {image_path}")
-        
         # Verificar se há pedidos relacionados
         from models import ItemPedido
         pedidos_relacionados = ItemPedido.query.filter_by(doce_id=doce_id).first()
@@ -329,14 +311,19 @@ def excluir_doce(doce_id):
             flash('Não é possível excluir este produto pois existem pedidos relacionados a ele.', 'error')
             return redirect(url_for('admin.listar_doces'))
         
+        imagem_url = doce.imagem_url
         db.session.delete(doce)
         db.session.commit()
         
-        print(f"Doce {doce.nome} excluído com sucesso")
+        # Remover imagem do disco após o commit (uploads são deduplicados: só se não estiver em uso)
+        if imagem_url and remover_imagem_se_orfa(imagem_url, doce_id):
+            log.info("Imagem removida: %s", imagem_url)
+        
+        log.info("Doce %s (%s) excluído", doce_id, doce.nome)
         flash('Doce excluído com sucesso!', 'success')
         
-    except Exception as e:
-        print(f"Erro ao excluir doce: {e}")
+    except Exception:
+        log.exception("Erro ao excluir doce %s", doce_id)
         db.session.rollback()
         flash('Erro ao excluir o doce. Tente novamente.', 'error')
     
@@ -356,6 +343,7 @@ def toggle_status_doce(doce_id):
 
 @admin_bp.route('/pedidos')
 @login_required
+@leitura_replica
 def listar_pedidos():
     """Listar todos os pedidos"""
     
@@ -420,7 +408,17 @@ def atualizar_status_pedido(pedido_id):
     pedido = Pedido.query.get_or_404(pedido_id)
     novo_status = request.form.get('status')
     
-    if novo_status in ['pendente', 'preparando', 'pronto', 'entregando', 'concluido', 'cancelado']:
+    if novo_status in STATUS_PEDIDO:
+        # Cancelamento devolve o estoque; reabrir um pedido cancelado reserva de novo
+        try:
+            if novo_status == 'cancelado' and pedido.status != 'cancelado':
+                devolver_estoque(pedido)
+            elif pedido.status == 'cancelado' and novo_status != 'cancelado':
+                reservar_estoque(((item.doce_id, item.quantidade) for item in pedido.itens), pedido=pedido)
+        except EstoqueInsuficiente:
+            db.session.rollback()
+            flash('Não há estoque suficiente para reabrir este pedido.', 'error')
+            return redirect(url_for('admin.detalhes_pedido', pedido_id=pedido_id))
         pedido.status = novo_status
         db.session.commit()
         flash(f'Status do pedido #{pedido.numero_pedido} atualizado para {novo_status.title()}', 'success')
@@ -437,7 +435,7 @@ def excluir_pedido(pedido_id):
         pedido = Pedido.query.get_or_404(pedido_id)
         
         # Log para debug
-        print(f"Tentando excluir pedido ID: {pedido_id}, Número: {pedido.numero_pedido}")
+        log.debug("Excluindo pedido %s (%s)", pedido_id, pedido.numero_pedido)
         
         # Verificar se o pedido pode ser excluído (apenas se estiver pendente ou cancelado)
         if pedido.status not in ['pendente', 'cancelado']:
@@ -452,11 +450,11 @@ def excluir_pedido(pedido_id):
         db.session.delete(pedido)
         db.session.commit()
         
-        print(f"Pedido {pedido.numero_pedido} excluído com sucesso")
+        log.info("Pedido %s excluído", pedido.numero_pedido)
         flash(f'Pedido #{pedido.numero_pedido} excluído com sucesso!', 'success')
         
-    except Exception as e:
-        print(f"Erro ao excluir pedido: {e}")
+    except Exception:
+        log.exception("Erro ao excluir pedido %s", pedido_id)
         db.session.rollback()
         flash('Erro ao excluir o pedido. Tente novamente.', 'error')
     
@@ -524,10 +522,10 @@ def excluir_pedidos_multiplos():
                 db.session.delete(pedido)
                 excluidos_count += 1
                 
-                print(f"Pedido {pedido.numero_pedido} excluído com sucesso")
+                log.info("Pedido %s excluído", pedido.numero_pedido)
                 
-            except Exception as e:
-                print(f"Erro ao excluir pedido {pedido.numero_pedido}: {e}")
+            except Exception:
+                log.exception("Erro ao excluir pedido %s", pedido.numero_pedido)
                 continue
         
         # Commit das exclusões
@@ -540,8 +538,8 @@ def excluir_pedidos_multiplos():
             nao_excluiveis_numeros = [p.numero_pedido for p in pedidos_nao_excluiveis]
             flash(f'{len(pedidos_nao_excluiveis)} pedido(s) não puderam ser excluídos (status não permitido): {", ".join(nao_excluiveis_numeros)}', 'warning')
         
-    except Exception as e:
-        print(f"Erro ao excluir múltiplos pedidos: {e}")
+    except Exception:
+        log.exception("Erro ao excluir múltiplos pedidos")
         db.session.rollback()
         flash('Erro ao excluir os pedidos. Tente novamente.', 'error')
     
@@ -582,10 +580,10 @@ def remover_pedidos_multiplos():
                 pedido.data_remocao = datetime.now()
                 removidos_count += 1
                 
-                print(f"Pedido {pedido.numero_pedido} removido com sucesso")
+                log.info("Pedido %s removido", pedido.numero_pedido)
                 
-            except Exception as e:
-                print(f"Erro ao remover pedido {pedido.numero_pedido}: {e}")
+            except Exception:
+                log.exception("Erro ao remover pedido %s", pedido.numero_pedido)
                 continue
         
         # Commit das remoções
@@ -598,8 +596,8 @@ def remover_pedidos_multiplos():
             nao_removiveis_numeros = [p.numero_pedido for p in pedidos_nao_removiveis]
             flash(f'{len(pedidos_nao_removiveis)} pedido(s) não puderam ser removidos (status não permitido): {", ".join(nao_removiveis_numeros)}', 'warning')
         
-    except Exception as e:
-        print(f"Erro ao remover múltiplos pedidos: {e}")
+    except Exception:
+        log.exception("Erro ao remover múltiplos pedidos")
         db.session.rollback()
         flash('Erro ao remover os pedidos. Tente novamente.', 'error')
     
@@ -607,6 +605,7 @@ def remover_pedidos_multiplos():
 
 @admin_bp.route('/pedidos/lixeira')
 @login_required
+@leitura_replica
 def lixeira_pedidos():
     """Visualizar pedidos removidos (lixeira)"""
     
@@ -670,8 +669,8 @@ def restaurar_pedido(pedido_id):
         
         flash(f'Pedido #{pedido.numero_pedido} restaurado com sucesso!', 'success')
         
-    except Exception as e:
-        print(f"Erro ao restaurar pedido: {e}")
+    except Exception:
+        log.exception("Erro ao restaurar pedido")
         db.session.rollback()
         flash('Erro ao restaurar o pedido. Tente novamente.', 'error')
     
@@ -698,8 +697,8 @@ def excluir_pedido_permanente(pedido_id):
         
         flash(f'Pedido #{pedido.numero_pedido} excluído permanentemente!', 'success')
         
-    except Exception as e:
-        print(f"Erro ao excluir pedido permanentemente: {e}")
+    except Exception:
+        log.exception("Erro ao excluir pedido permanentemente")
         db.session.rollback()
         flash('Erro ao excluir o pedido. Tente novamente.', 'error')
     
@@ -729,3 +728,24 @@ def check_delete_possibility(doce_id):
             'can_delete': False,
             'error': str(e)
         }), 500
+
+@admin_bp.route('/metrics')
+def metrics():
+    """Métricas no formato Prometheus (admin logado ou Authorization: Bearer METRICS_TOKEN)"""
+    import hmac
+    from services.metricas import disponivel, gerar_metricas
+
+    token = current_app.config.get('METRICS_TOKEN')
+    enviado = request.headers.get('Authorization', '')
+    autorizado = 'admin_logged_in' in session or (
+        token and hmac.compare_digest(enviado.encode(), f'Bearer {token}'.encode())
+    )
+    if not autorizado:
+        return current_app.response_class('Não autorizado\n', status=401, mimetype='text/plain')
+    if not disponivel():
+        return current_app.response_class('prometheus_client não instalado\n', status=501, mimetype='text/plain')
+
+    conteudo, content_type = gerar_metricas()
+    response = current_app.response_class(conteudo, content_type=content_type)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
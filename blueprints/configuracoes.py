@@ -1,12 +1,12 @@
-import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from models import Configuracao, db
+from services.imagens import enfileirar_upload
+from services.logs import obter_logger
 from werkzeug.security import check_password_hash
-from werkzeug.utils import secure_filename
 from functools import wraps
-import uuid
 
 configuracoes_bp = Blueprint('configuracoes', __name__)
+log = obter_logger('configuracoes')
 
 def admin_required(f):
     """Decorator para proteger rotas administrativas"""
@@ -22,24 +22,13 @@ def allowed_file(filename, allowed_extensions):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
-def save_uploaded_file(file, folder, allowed_extensions):
-    """Salva um arquivo enviado e retorna o nome do arquivo"""
+def save_uploaded_file(file, folder, allowed_extensions, max_size=(1920, 1920)):
+    """Salva um arquivo enviado e retorna o nome do arquivo.
+    O arquivo vai para staging e é otimizado em segundo plano (services.imagens)."""
     if file and file.filename:
         if allowed_file(file.filename, allowed_extensions):
-            # Gerar nome único para o arquivo
-            filename = secure_filename(file.filename)
-            name, ext = os.path.splitext(filename)
-            unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
-            
-            # Criar diretório se não existir
-            upload_path = os.path.join(current_app.static_folder, 'images', folder)
-            os.makedirs(upload_path, exist_ok=True)
-            
-            # Salvar arquivo
-            file_path = os.path.join(upload_path, unique_filename)
-            file.save(file_path)
-            
-            return f"images/{folder}/{unique_filename}"
+            # Nome derivado do hash do conteúdo: reenviar a mesma imagem reaproveita o arquivo
+            return enfileirar_upload(file, f"images/{folder}", max_size)
     return None
 
 @configuracoes_bp.route('/configuracoes', methods=['GET', 'POST'])
@@ -162,30 +151,11 @@ def listar_configuracoes():
                 'email_host', 'email_port', 'email_user', 'email_password', 'email_from', 'email_site', 'email_use_tls'
             ]
             
-            current_app.logger.info(f"Campos de texto a serem processados: {text_fields}")
-            current_app.logger.info(f"Campos de contato na lista: {[f for f in text_fields if f in ['telefone', 'email', 'endereco']]}")
-            
-            # Log de todos os campos no request.form
-            current_app.logger.info("Todos os campos no request.form:")
-            for key, value in request.form.items():
-                current_app.logger.info(f"  {key} = '{value}'")
-            
+            criados, alterados = [], []
             for field in text_fields:
                 value = request.form.get(field, '').strip()
                 # Processar todos os campos, mesmo se estiverem vazios
-                current_app.logger.info(f"Processando campo: {field} = '{value}' (presente no form: {field in request.form})")
-                
-                # Log específico para campos de contato
-                if field in ['telefone', 'email', 'endereco']:
-                    current_app.logger.info(f"Campo de contato detectado: {field} = '{value}'")
-                    current_app.logger.info(f"Valor do campo {field} no request.form: '{request.form.get(field, 'NÃO ENCONTRADO')}'")
-                    current_app.logger.info(f"Campo {field} presente no request.form: {field in request.form}")
-                    current_app.logger.info(f"Todos os campos no request.form: {list(request.form.keys())}")
-                
                 config = Configuracao.query.filter_by(chave=field).first()
-                current_app.logger.info(f"Campo {field} existe no banco: {config is not None}")
-                if config:
-                    current_app.logger.info(f"Valor atual no banco para {field}: '{config.valor}'")
                 if not config:
                     # Determinar categoria baseada no nome do campo
                     if field.startswith('tradicional_') or field.startswith('personalizado_'):
@@ -194,10 +164,8 @@ def listar_configuracoes():
                         categoria = 'about_content'
                     elif field in ['telefone', 'email', 'endereco']:
                         categoria = 'contato'
-                        current_app.logger.info(f"Campo de contato categorizado: {field} -> {categoria}")
                     elif field.startswith('email_'):
                         categoria = 'email_config'
-                        current_app.logger.info(f"Campo de email categorizado: {field} -> {categoria}")
                     elif field in ['facebook_url', 'instagram_url', 'whatsapp_url', 'tiktok_url', 'youtube_url', 'linkedin_url']:
                         categoria = 'redes_sociais'
                     elif field.startswith('site_') or field.startswith('rodape_'):
@@ -221,84 +189,30 @@ def listar_configuracoes():
                         categoria=categoria
                     )
                     db.session.add(config)
-                    current_app.logger.info(f"Criando novo campo: {field} = '{value}' (categoria: {categoria})")
-                    
-                    # Log específico para campos de contato
-                    if field in ['telefone', 'email', 'endereco']:
-                        current_app.logger.info(f"Novo campo de contato criado: {field} = '{value}' (categoria: {categoria})")
-                        current_app.logger.info(f"Campo {field} adicionado à sessão do banco")
-                else:
-                    old_value = config.valor
+                    criados.append(field)
+                elif config.valor != value:
                     config.valor = value
-                    current_app.logger.info(f"Atualizando campo existente: {field} = '{old_value}' -> '{value}'")
-                    
-                    # Log específico para campos de contato
-                    if field in ['telefone', 'email', 'endereco']:
-                        current_app.logger.info(f"Campo de contato atualizado: {field} = '{old_value}' -> '{value}'")
-                        current_app.logger.info(f"Campo {field} modificado na sessão do banco")
-            
-            current_app.logger.info("Fazendo commit das alterações...")
-            try:
-                db.session.commit()
-                current_app.logger.info("Commit realizado com sucesso!")
-            except Exception as commit_error:
-                current_app.logger.error(f"Erro no commit: {commit_error}")
-                raise
+                    alterados.append(field)
             
-            # Verificar se os campos de contato foram salvos
-            current_app.logger.info("Verificando campos de contato após commit...")
-            for field in ['telefone', 'email', 'endereco']:
-                config = Configuracao.query.filter_by(chave=field).first()
-                if config:
-                    current_app.logger.info(f"Campo de contato salvo no banco: {field} = '{config.valor}'")
-                else:
-                    current_app.logger.warning(f"Campo de contato não encontrado no banco: {field}")
-                    
-            # Verificar todos os campos salvos
-            current_app.logger.info("Todos os campos salvos no banco:")
-            for config in Configuracao.query.all():
-                current_app.logger.info(f"  {config.chave} = '{config.valor}' (categoria: {config.categoria})")
+            db.session.commit()
+            # Só as chaves: valores podem conter senhas (email_password)
+            log.info("Configurações salvas: %d criada(s), %d alterada(s)", len(criados), len(alterados),
+                     extra={'criadas': criados, 'alteradas': alterados})
             flash('Configurações salvas com sucesso!', 'success')
             
         except Exception as e:
-            current_app.logger.error(f"Erro ao salvar configurações: {str(e)}")
-            current_app.logger.error(f"Tipo do erro: {type(e)}")
-            current_app.logger.error(f"Detalhes do erro: {e}")
             db.session.rollback()
-            current_app.logger.info("Rollback realizado devido ao erro")
+            log.exception("Erro ao salvar configurações")
             flash(f'Erro ao salvar configurações: {str(e)}', 'error')
-            current_app.logger.error(f'Erro ao salvar configurações: {str(e)}')
         
-        current_app.logger.info("Redirecionando após processamento")
         return redirect(url_for('configuracoes.listar_configuracoes'))
 
     # Buscar configurações existentes
     configs = {}
     configuracoes = Configuracao.query.all()
     
-    current_app.logger.info(f"Carregando {len(configuracoes)} configurações do banco de dados")
-    
     for config in configuracoes:
         configs[config.chave] = config.valor
-        current_app.logger.info(f"Configuração carregada: {config.chave} = '{config.valor}' (categoria: {config.categoria})")
-        
-        # Log específico para campos de contato
-        if config.chave in ['telefone', 'email', 'endereco']:
-            current_app.logger.info(f"Campo de contato carregado: {config.chave} = '{config.valor}' (categoria: {config.categoria})")
-    
-    current_app.logger.info(f"Renderizando template com {len(configs)} configurações")
-    
-    # Log específico para campos de contato
-    for field in ['telefone', 'email', 'endereco']:
-        if field in configs:
-            current_app.logger.info(f"Campo de contato disponível no template: {field} = '{configs[field]}'")
-        else:
-            current_app.logger.warning(f"Campo de contato não disponível no template: {field}")
-            
-    # Log de todos os campos disponíveis no template
-    current_app.logger.info("Todos os campos disponíveis no template:")
-    for key, value in configs.items():
-        current_app.logger.info(f"  {key} = '{value}'")
     
     return render_template('admin/configuracoes.html', configs=configs)
 
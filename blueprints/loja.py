@@ -1,23 +1,18 @@
-from flask import Blueprint, render_template, session, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, session, request, redirect, url_for, flash, jsonify, current_app
 from models import Doce, db
 from urllib.parse import quote
 import json
-from colorama import Fore, Style
-from datetime import datetime
 from services.email_service import send_order_emails
+from services.catalogo import filtros_da_requisicao, aplicar_filtros_doces, paginar_doces
+from services.estoque import reservar_estoque, EstoqueInsuficiente
+from services.cache_http import pagina_cacheavel
+from services.logs import obter_logger
+from services.perfil_sql import orcamento_sql
+from services.replicas import leitura_replica
 
-def debug_log(message, level="INFO"):
-    """Log colorido para debug - cópia local"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    colors = {
-        "INFO": Fore.CYAN,
-        "SUCCESS": Fore.GREEN,
-        "WARNING": Fore.YELLOW,
-        "ERROR": Fore.RED,
-        "CART": Fore.MAGENTA
-    }
-    color = colors.get(level, Fore.WHITE)
-    print(f"{Fore.WHITE}[{timestamp}]{color} LOJA {level}: {message}{Style.RESET_ALL}")
+log = obter_logger('loja')
+# Eventos de carrinho: DEBUG/INFO amostrados (ver LOG_AMOSTRA_CARRINHO)
+log_carrinho = obter_logger('carrinho')
 
 loja_bp = Blueprint('loja', __name__)
 
@@ -69,23 +64,47 @@ def calcular_totais_carrinho(cart):
     return subtotal_liquido, total_desconto_exibicao, total_final, cart_items_info
 
 @loja_bp.route('/')
+@orcamento_sql(4)
+@leitura_replica
+@pagina_cacheavel()
 def index():
     """Página inicial da loja"""
     return render_template('loja/index.html')
 
+def listar_catalogo(categoria):
+    """Página do catálogo de uma categoria, paginada por keyset"""
+    filtros = filtros_da_requisicao(request.args)
+    # Na loja só aparecem produtos ativos da categoria da página
+    filtros.update(status='ativo', categoria=categoria)
+    query = aplicar_filtros_doces(Doce.query, filtros)
+    por_pagina = current_app.config.get('CATALOGO_POR_PAGINA', 24)
+    doces, proximo_cursor = paginar_doces(query, request.args.get('cursor'), por_pagina)
+    return doces, proximo_cursor, filtros
+
 @loja_bp.route('/doces-tradicionais')
+@orcamento_sql(6)
+@leitura_replica
+@pagina_cacheavel()
 def doces_tradicionais():
     """Página de doces tradicionais"""
-    doces = Doce.query.filter_by(ativo=True, categoria='tradicional').order_by(Doce.data_criacao.desc()).all()
-    return render_template('loja/doces_tradicionais.html', doces=doces, categoria='tradicional')
+    doces, proximo_cursor, filtros = listar_catalogo('tradicional')
+    return render_template('loja/doces_tradicionais.html', doces=doces, categoria='tradicional',
+                           proximo_cursor=proximo_cursor, filtros=filtros)
 
 @loja_bp.route('/doces-personalizados')
+@orcamento_sql(6)
+@leitura_replica
+@pagina_cacheavel()
 def doces_personalizados():
     """Página de doces personalizados"""
-    doces = Doce.query.filter_by(ativo=True, categoria='personalizado').order_by(Doce.data_criacao.desc()).all()
-    return render_template('loja/doces_personalizados.html', doces=doces, categoria='personalizado')
+    doces, proximo_cursor, filtros = listar_catalogo('personalizado')
+    return render_template('loja/doces_personalizados.html', doces=doces, categoria='personalizado',
+                           proximo_cursor=proximo_cursor, filtros=filtros)
 
 @loja_bp.route('/doce/<int:doce_id>')
+@orcamento_sql(8)
+@leitura_replica
+@pagina_cacheavel()
 def detalhes_doce(doce_id):
     """Página de detalhes do doce"""
     doce = Doce.query.get_or_404(doce_id)
@@ -94,12 +113,9 @@ def detalhes_doce(doce_id):
 @loja_bp.route('/adicionar_carrinho', methods=['POST'])
 def adicionar_carrinho():
     """Adicionar item ao carrinho"""
-    debug_log("🛒 Iniciando adição ao carrinho", "CART")
-    
     # Verificar CSRF primeiro
     if 'csrf_token' not in request.form:
-        debug_log("❌ Token CSRF não encontrado no formulário", "ERROR")
-        debug_log(f"Form keys: {list(request.form.keys())}", "ERROR")
+        log.warning("Token CSRF não encontrado no formulário (campos: %s)", list(request.form.keys()))
         flash('Erro de segurança. Tente novamente.', 'error')
         return redirect(request.referrer or url_for('loja.index'))
     
@@ -107,15 +123,11 @@ def adicionar_carrinho():
     quantidade = request.form.get('quantidade', 1, type=int)
     sabor_selecionado = request.form.get('sabor_selecionado', '')
     
-    debug_log(f"Produto ID: {doce_id}, Quantidade: {quantidade}, Sabor: {sabor_selecionado}", "CART")
-    
     doce = Doce.query.get_or_404(doce_id)
-    debug_log(f"Produto encontrado: {doce.nome} - R$ {doce.preco}", "SUCCESS")
     
     # Inicializar carrinho se não existir
     if 'cart' not in session:
         session['cart'] = {}
-        debug_log("Carrinho inicializado", "CART")
     
     cart = session['cart']
     
@@ -123,10 +135,8 @@ def adicionar_carrinho():
     # Se não há sabor selecionado, usar apenas o doce_id
     if sabor_selecionado:
         cart_key = f"{doce_id}_{sabor_selecionado}"
-        debug_log(f"Usando chave composta: {cart_key}", "CART")
     else:
         cart_key = str(doce_id)
-        debug_log(f"Usando chave simples: {cart_key}", "CART")
     
     # Garantir quantidade mínima ao adicionar
     min_q = int(doce.quantidade_minima or 1)
@@ -140,7 +150,8 @@ def adicionar_carrinho():
             cart[cart_key]['quantidade'] = min_q
         # Somar a nova quantidade
         cart[cart_key]['quantidade'] += quantidade
-        debug_log(f"Produto com mesmo sabor já no carrinho. Quantidade: {quantidade_anterior} → {cart[cart_key]['quantidade']}", "CART")
+        log_carrinho.debug("Item %s já no carrinho: quantidade %s → %s",
+                           cart_key, quantidade_anterior, cart[cart_key]['quantidade'])
     else:
         cart[cart_key] = {
             'id': doce.id,
@@ -152,14 +163,11 @@ def adicionar_carrinho():
             'quantidade_minima': min_q,
             'unidade_venda': doce.unidade_venda
         }
-        debug_log(f"Novo produto/sabor adicionado ao carrinho: {doce.nome} - {sabor_selecionado}", "SUCCESS")
+        log_carrinho.info("Item %s adicionado ao carrinho (quantidade %s)", cart_key, quantidade)
     
     session['cart'] = cart
     session.modified = True
     
-    total_itens = sum(item['quantidade'] for item in cart.values())
-    debug_log(f"Carrinho atualizado. Total de itens: {total_itens}", "CART")
-    
     # Mensagem personalizada baseada no sabor
     if sabor_selecionado:
         flash(f'{doce.nome} (Sabor: {sabor_selecionado}) adicionado ao carrinho!', 'success')
@@ -206,8 +214,6 @@ def atualizar_quantidade_ajax():
         cart_key = str(data.get('cart_key'))  # Agora recebe a chave composta
         quantidade = int(data.get('quantidade'))
         
-        debug_log(f"AJAX: Atualizando quantidade - Chave {cart_key}, Quantidade: {quantidade}", "CART")
-        
         if 'cart' not in session:
             return jsonify({'success': False, 'error': 'Carrinho não encontrado'})
         
@@ -224,11 +230,11 @@ def atualizar_quantidade_ajax():
         if quantidade <= 0:
             # Remover item se quantidade for 0 ou negativa
             del cart[cart_key]
-            debug_log(f"AJAX: Item {cart_key} removido do carrinho", "CART")
+            log_carrinho.debug("AJAX: item %s removido do carrinho", cart_key)
         else:
             # Atualizar quantidade
             cart[cart_key]['quantidade'] = quantidade
-            debug_log(f"AJAX: Quantidade do item {cart_key} atualizada para {quantidade}", "CART")
+            log_carrinho.debug("AJAX: item %s com quantidade %s", cart_key, quantidade)
         
         session['cart'] = cart
         session.modified = True
@@ -240,8 +246,6 @@ def atualizar_quantidade_ajax():
             item_total = float(cart_items_info[cart_key]['item_total_liquido'])
         cart_count = sum(item['quantidade'] for item in cart.values())
         
-        debug_log(f"AJAX: Novos totais - Item: R$ {item_total:.2f}, Subtotal: R$ {subtotal:.2f}, Economia: R$ {total_desconto:.2f}, Total: R$ {cart_total:.2f}, Itens: {cart_count}", "SUCCESS")
-        
         return jsonify({
             'success': True,
             'item_total': f"{item_total:.2f}",
@@ -252,8 +256,8 @@ def atualizar_quantidade_ajax():
             'item_removed': quantidade <= 0
         })
         
-    except Exception as e:
-        debug_log(f"AJAX: Erro ao atualizar quantidade: {str(e)}", "ERROR")
+    except Exception:
+        log.exception("AJAX: erro ao atualizar quantidade")
         return jsonify({'success': False, 'error': 'Erro interno do servidor'})
 
 @loja_bp.route('/remover_carrinho/<cart_key>')
@@ -350,6 +354,9 @@ def finalizar_pedido():
             total=total_final,
             observacoes=f"Pedido realizado via site. Contato: {usuario.telefone or 'N/A'}"
         )
+        # Baixa atômica do estoque (inclui componentes de kits) na mesma transação;
+        # antes do INSERT para o pedido já ir gravado com o que foi reservado
+        reservar_estoque(((int(item['id']), int(item['quantidade'])) for item in cart.values()), pedido=pedido)
         db.session.add(pedido)
         db.session.flush()  # Para obter o ID do pedido
         
@@ -373,15 +380,16 @@ def finalizar_pedido():
             db.session.add(item_pedido)
         
         db.session.commit()
-        debug_log(f"Pedido #{pedido.id} criado para usuário {usuario.nome}", "SUCCESS")
+        log.info("Pedido #%s criado", pedido.id, extra={'pedido_id': pedido.id, 'usuario_id': usuario.id})
         
         # Enviar emails de confirmação (cliente e vendedora)
         emails_sent = False
         try:
             emails_sent = send_order_emails(pedido)
-            debug_log("Emails de confirmação processados", "SUCCESS" if emails_sent else "WARNING")
-        except Exception as e:
-            debug_log(f"Erro ao enviar emails: {str(e)}", "ERROR")
+            if not emails_sent:
+                log.warning("E-mails de confirmação do pedido #%s não enviados", pedido.id)
+        except Exception:
+            log.exception("Erro ao enviar e-mails do pedido #%s", pedido.id)
         
         # Limpar carrinho após finalizar pedido
         session.pop('cart', None)
@@ -401,8 +409,15 @@ def finalizar_pedido():
             emails_sent=emails_sent,
         )
         
-    except Exception as e:
+    except EstoqueInsuficiente as e:
+        db.session.rollback()
+        doce = Doce.query.get(e.doce_id)
+        log.warning("Estoque insuficiente ao finalizar pedido: %s", e)
+        nome = doce.nome if doce else 'um dos produtos'
+        flash(f'Estoque insuficiente para {nome}. Ajuste as quantidades do carrinho.', 'error')
+        return redirect(url_for('loja.carrinho'))
+    except Exception:
         db.session.rollback()
-        debug_log(f"Erro ao finalizar pedido: {str(e)}", "ERROR")
+        log.exception("Erro ao finalizar pedido")
         flash('Erro ao processar pedido. Tente novamente.', 'error')
         return redirect(url_for('loja.checkout'))
@@ -1,13 +1,18 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from models import Usuario, Pedido, db
+from services.estoque import devolver_estoque
+from services.logs import obter_logger
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 import re
-import requests
 import json
 from urllib.parse import urlencode
 
 usuarios_bp = Blueprint('usuarios', __name__)
+log = obter_logger('usuarios')
+
+# (conexão, leitura) em segundos para as chamadas ao Google no login social
+TIMEOUT_GOOGLE = (5, 10)
 
 def login_required(f):
     """Decorator para verificar se o usuário está logado"""
@@ -298,14 +303,15 @@ def cancelar_pedido(pedido_id):
         return redirect(url_for('usuarios.detalhes_pedido', pedido_id=pedido_id))
     
     try:
-        # Cancelar o pedido
+        # Cancelar o pedido e devolver os itens ao estoque
         pedido.status = 'cancelado'
+        devolver_estoque(pedido)
         db.session.commit()
         
         flash('Pedido cancelado com sucesso!', 'success')
         return redirect(url_for('usuarios.meus_pedidos'))
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
         flash('Erro ao cancelar pedido. Tente novamente.', 'error')
         return redirect(url_for('usuarios.detalhes_pedido', pedido_id=pedido_id))
@@ -350,6 +356,9 @@ def google_callback():
         flash('Código de autorização não recebido.', 'error')
         return redirect(url_for('usuarios.login'))
     
+    # requests só é usado no login com Google: importado aqui para não pesar na inicialização
+    import requests
+
     try:
         # Trocar código por token de acesso
         google_client_id = current_app.config.get('GOOGLE_CLIENT_ID', '')
@@ -365,7 +374,7 @@ def google_callback():
             'redirect_uri': redirect_uri
         }
         
-        token_response = requests.post(token_url, data=token_data)
+        token_response = requests.post(token_url, data=token_data, timeout=TIMEOUT_GOOGLE)
         token_response.raise_for_status()
         token_info = token_response.json()
         
@@ -374,7 +383,7 @@ def google_callback():
         # Obter informações do usuário
         user_info_url = 'https://www.googleapis.com/oauth2/v2/userinfo'
         headers = {'Authorization': f'Bearer {access_token}'}
-        user_response = requests.get(user_info_url, headers=headers)
+        user_response = requests.get(user_info_url, headers=headers, timeout=TIMEOUT_GOOGLE)
         user_response.raise_for_status()
         user_info = user_response.json()
         
@@ -427,8 +436,8 @@ def google_callback():
         session.pop('redirect_after_login', None)
         return redirect(redirect_url)
         
-    except Exception as e:
-        current_app.logger.error(f'Erro no callback do Google: {str(e)}')
+    except Exception:
+        log.exception('Erro no callback do Google')
         flash('Erro na autenticação com Google. Tente novamente.', 'error')
         return redirect(url_for('usuarios.login'))
 
@@ -0,0 +1,185 @@
+"""
+Comandos de manutenção da aplicação (flask --app app <comando>)
+"""
+
+import os
+
+import click
+from flask import current_app
+
+from models import Doce, Configuracao
+
+
+def register_commands(app):
+    """Registrar comandos CLI na aplicação"""
+
+    @app.cli.command('imagens-derivadas')
+    @click.option('--todas', is_flag=True, help='Regerar mesmo quando o manifesto já existe.')
+    def imagens_derivadas(todas):
+        """Gerar versões responsivas (srcset) das imagens de produtos já enviadas."""
+        from services.imagens import gerar_derivadas, manifesto_imagem
+
+        geradas = 0
+        for (imagem_url,) in Doce.query.with_entities(Doce.imagem_url).filter(Doce.imagem_url.isnot(None)):
+            caminho = os.path.join(current_app.static_folder, imagem_url)
+            if not os.path.exists(caminho):
+                continue
+            if not todas and manifesto_imagem(imagem_url):
+                continue
+            if gerar_derivadas(caminho):
+                geradas += 1
+                click.echo(f"✅ {imagem_url}")
+        click.echo(f"🎉 Derivadas geradas para {geradas} imagem(ns)")
+
+    @app.cli.command('limpar-uploads')
+    @click.option('--carencia-horas', default=24.0, show_default=True,
+                  help='Só move arquivos sem referência modificados há mais tempo que isso.')
+    @click.option('--dry-run', is_flag=True, help='Apenas relatar, sem mover arquivos.')
+    @click.option('--purgar-dias', type=float, default=None,
+                  help='Também apagar lotes da quarentena mais antigos que N dias.')
+    def limpar_uploads(carencia_horas, dry_run, purgar_dias):
+        """Mover para a quarentena uploads que nenhum produto/configuração referencia."""
+        from services.imagens import staging_folder
+        from services.limpeza_uploads import coletar_orfaos, purgar_quarentena
+
+        referenciados = set()
+        for (imagem_url,) in Doce.query.with_entities(Doce.imagem_url).filter(Doce.imagem_url.isnot(None)):
+            referenciados.add(imagem_url)
+        for (valor,) in Configuracao.query.with_entities(Configuracao.valor):
+            referenciados.add(valor)
+
+        quarentena = os.path.join(current_app.instance_path, 'quarentena')
+        resumo = coletar_orfaos(
+            current_app.static_folder,
+            referenciados,
+            quarentena,
+            carencia_horas * 3600,
+            extras=[staging_folder()],
+            dry_run=dry_run,
+        )
+        acao = 'seriam movidos' if dry_run else 'movidos'
+        for relativo in resumo['movidos']:
+            click.echo(f"🗑️  {relativo}")
+        click.echo(f"📦 {len(resumo['movidos'])} arquivo(s) {acao}, {resumo['mantidos']} mantido(s)")
+        click.echo(f"💾 Espaço recuperado: {resumo['bytes_recuperados'] / 1024:.1f} KB")
+        if resumo['quarentena']:
+            click.echo(f"📁 Quarentena: {resumo['quarentena']}")
+        if purgar_dias is not None and not dry_run:
+            liberados = purgar_quarentena(quarentena, purgar_dias)
+            click.echo(f"🧹 Quarentena purgada: {liberados / 1024:.1f} KB liberados")
+
+    @app.cli.command('assets-manifesto')
+    @click.option('--verificar', is_flag=True,
+                  help='Só comparar com o manifesto gravado (código 1 se estiver desatualizado).')
+    def assets_manifesto(verificar):
+        """Gerar o manifesto de hashes dos arquivos estáticos usado por asset_url."""
+        from services.assets import gerar_manifesto, gravar_manifesto, ler_manifesto, versao_do_manifesto
+
+        destino = current_app.config['ASSET_MANIFEST']
+        manifesto = gerar_manifesto(current_app.static_folder)
+        if verificar:
+            atual = ler_manifesto(destino)
+            if atual != manifesto:
+                click.echo(f"❌ Manifesto desatualizado: {destino}")
+                raise SystemExit(1)
+            click.echo(f"✅ Manifesto em dia ({len(manifesto)} arquivos)")
+            return
+        gravar_manifesto(manifesto, destino)
+        click.echo(f"✅ {len(manifesto)} arquivo(s), versão {versao_do_manifesto(manifesto)}")
+        click.echo(f"📄 {destino}")
+
+    @app.cli.command('assets-bundles')
+    @click.option('--limpar', is_flag=True, help='Apagar bundles de gerações anteriores em static/dist.')
+    def assets_bundles(limpar):
+        """Concatenar e minificar os bundles CSS/JS por página (com source maps)."""
+        from services.bundles import construir_bundles
+
+        manifesto = construir_bundles(current_app.static_folder, limpar=limpar)
+        for nome, bundle in manifesto.items():
+            reducao = 100 * (1 - bundle['bytes'] / bundle['bytes_fontes']) if bundle['bytes_fontes'] else 0
+            click.echo(f"✅ {nome:<10} → {bundle['arquivo']} "
+                       f"({bundle['bytes'] / 1024:.1f} KB, -{reducao:.0f}%, {len(bundle['fontes'])} arquivo(s))")
+
+    @app.cli.command('assets-comprimir')
+    @click.option('--forcar', is_flag=True, help='Regerar mesmo as variantes que já estão em dia.')
+    def assets_comprimir(forcar):
+        """Gerar variantes .br/.gz dos arquivos estáticos de texto (CSS, JS, SVG...)."""
+        from services.compressao import brotli, comprimir_pasta
+
+        if brotli is None:
+            click.echo("⚠️  Módulo Brotli não instalado: gerando apenas .gz")
+        resumo = comprimir_pasta(current_app.static_folder, forcar=forcar)
+        click.echo(f"✅ {resumo['variantes']} variante(s) gravada(s) para {resumo['arquivos']} arquivo(s)")
+        click.echo(f"💾 Economia: {resumo['bytes_economizados'] / 1024:.1f} KB")
+
+    @app.cli.command('db-migrar')
+    @click.option('--status', 'mostrar_status', is_flag=True, help='Apenas listar as migrações e quais já foram aplicadas.')
+    @click.option('--ate', type=int, default=None, help='Aplicar somente até esta versão.')
+    def db_migrar(mostrar_status, ate):
+        """Aplicar as migrações pendentes do schema (migrations/vNNNN_*.py)."""
+        from models import db
+        from services.migracoes import migrar, status
+
+        if mostrar_status:
+            for migracao, aplicada_em in status(db.engine):
+                marca = f"✅ {aplicada_em}" if aplicada_em else "⏳ pendente"
+                click.echo(f"v{migracao.versao:04d} {migracao.nome:<28} {marca}")
+            return
+        aplicadas = migrar(db.engine, ate=ate, aviso=lambda msg: click.echo(f"🔧 {msg}"))
+        if aplicadas:
+            click.echo(f"✅ {len(aplicadas)} migração(ões) registrada(s)")
+        else:
+            click.echo("✅ Schema em dia")
+
+    @app.cli.command('sql-lentas')
+    @click.option('--versao', default=None, help='Só registros desta versão (ASSET_VERSION); "atual" para o deploy corrente.')
+    @click.option('--top', default=15, show_default=True, help='Quantas consultas listar.')
+    @click.option('--plano', is_flag=True, help='Mostrar o EXPLAIN capturado de cada consulta.')
+    def sql_lentas(versao, top, plano):
+        """Resumir o log de consultas lentas por SQL (ocorrências, mediana e máximo)."""
+        from services.consultas_lentas import resumir
+
+        if versao == 'atual':
+            versao = current_app.config.get('ASSET_VERSION')
+        resumo = resumir(current_app.config['SQL_LENTA_ARQUIVO'], versao)
+        if not resumo:
+            click.echo("✅ Nenhuma consulta lenta registrada")
+            return
+        for item in resumo[:top]:
+            click.echo(f"🐢 {item['vezes']:>5}x  mediana {item['mediana_ms']:>7.0f} ms  máx {item['max_ms']:>7.0f} ms"
+                       f"  {', '.join(item['endpoints']) or '-'}")
+            click.echo(f"   {item['sql'][:200]}")
+            if plano and item['plano']:
+                for linha in item['plano']:
+                    click.echo(f"     {linha}")
+
+    @app.cli.command('dados-sinteticos')
+    # Padrões vazios: resolvidos dentro do comando, para o serviço só ser importado quando usado
+    @click.option('--produtos', type=int, default=None, help='Produtos (5% deles kits). Padrão: 10.000.')
+    @click.option('--usuarios', type=int, default=None, help='Clientes cadastrados. Padrão: 100.000.')
+    @click.option('--pedidos', type=int, default=None, help='Pedidos (1 a 5 itens cada). Padrão: 1.000.000.')
+    @click.option('--anos', default=3, show_default=True, help='Período coberto pelo histórico de pedidos.')
+    @click.option('--semente', default=42, show_default=True, help='Semente do gerador (mesma semente, mesmos dados).')
+    @click.option('--lote', type=int, default=None, help='Linhas por INSERT. Padrão: 5.000.')
+    @click.option('--forcar', is_flag=True, help='Permitir rodar com FLASK_ENV=production.')
+    def dados_sinteticos(produtos, usuarios, pedidos, anos, semente, lote, forcar):
+        """Popular o banco com catálogo, clientes e histórico de pedidos sintéticos (testes de desempenho)."""
+        import time
+        from models import db
+        from services.dados_sinteticos import LOTE, VOLUMES_PADRAO, gerar
+
+        produtos = VOLUMES_PADRAO['produtos'] if produtos is None else produtos
+        usuarios = VOLUMES_PADRAO['usuarios'] if usuarios is None else usuarios
+        pedidos = VOLUMES_PADRAO['pedidos'] if pedidos is None else pedidos
+        lote = LOTE if lote is None else lote
+        if os.getenv('FLASK_ENV') == 'production' and not forcar:
+            raise click.ClickException("Banco de produção: use --forcar se é isso mesmo")
+        click.echo(f"🌱 {produtos:,} produtos, {usuarios:,} usuários, {pedidos:,} pedidos (semente {semente})")
+        inicio = time.perf_counter()
+        contagem = gerar(db.engine, produtos, usuarios, pedidos, semente=semente, anos=anos, lote=lote,
+                         aviso=lambda msg: click.echo(f"   {msg}"))
+        duracao = time.perf_counter() - inicio
+        linhas = sum(contagem.values())
+        for tabela, quantidade in contagem.items():
+            click.echo(f"✅ {tabela:<13} {quantidade:>10,}")
+        click.echo(f"⏱️  {linhas:,} linhas em {duracao:.1f} s ({linhas / max(duracao, 0.001):,.0f} linhas/s)")
@@ -0,0 +1,71 @@
+"""
+Configuração do gunicorn: gunicorn -c gunicorn.conf.py app:app
+
+Perfis (GUNICORN_WORKER_CLASS):
+  * gthread (padrão): WEB_CONCURRENCY processos × GUNICORN_THREADS threads.
+    Um envio SMTP ou chamada ao Google lento prende uma thread, não o
+    processo; as demais continuam atendendo.
+  * sync: um pedido por processo (comportamento antigo).
+  * gevent: requer `pip install gevent`; milhares de conexões por processo.
+    Ajuste DB_POOL_SIZE, que no gevent não acompanha as threads.
+
+O pool do banco é dimensionado por GUNICORN_THREADS (services/banco.py), por
+isso o valor efetivo é exportado para o ambiente antes de carregar a app.
+
+Preload (GUNICORN_PRELOAD, padrão 1): a app é montada uma vez no mestre e os
+workers herdam templates compilados, módulos e manifestos por copy-on-write;
+o mestre fecha as conexões do boot e cada worker abre as suas no post_fork.
+Com preload, `kill -HUP` não recarrega o código: o deploy usa restart.
+Desligado no gevent, que precisa aplicar o monkey-patch antes da app carregar.
+"""
+
+import gc
+import os
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", "3"))
+threads = int(os.getenv("GUNICORN_THREADS", "4")) if worker_class == "gthread" else 1
+worker_connections = int(os.getenv("GUNICORN_CONEXOES", "200"))
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:8000")
+
+os.environ["GUNICORN_THREADS"] = str(threads)
+if worker_class == "gevent":
+    os.environ.setdefault("DB_POOL_SIZE", "10")
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0" and worker_class != "gevent"
+os.environ["GUNICORN_PRELOAD"] = "1" if preload_app else "0"
+
+# SMTP e OAuth têm timeout próprio (15 s / 10 s); isto só pega o que travou de vez
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recicla workers aos poucos (jitter evita que todos reiniciem juntos)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = max_requests // 10
+
+
+def pre_fork(server, worker):
+    # Objetos do mestre vão para a geração permanente: o coletor dos workers
+    # não mexe nos cabeçalhos deles e as páginas continuam compartilhadas
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Threads de escrita dos logs herdadas do processo pai não existem no filho
+    from services.logs import reiniciar_apos_fork
+
+    reiniciar_apos_fork()
+    if server.cfg.preload_app:
+        # App já carregada no mestre: pools novos (e aquecidos) neste worker
+        from services.banco import preparar_worker
+
+        preparar_worker(server.app.wsgi())
+
+
+def child_exit(server, worker):
+    # Gauges (requisições em andamento) do worker que saiu não entram mais na soma
+    from services.metricas import marcar_processo_encerrado
+
+    marcar_processo_encerrado(worker.pid)
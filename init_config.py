@@ -3,8 +3,7 @@
 Script para inicializar as configurações padrão do site
 """
 
-from app import app, db
-from models import Configuracao
+from models import Configuracao, db
 from datetime import datetime
 
 def init_configuracoes():
@@ -663,6 +662,9 @@ def init_configuracoes():
          }
     ]
     
+    from app import create_app
+
+    app = create_app()
     with app.app_context():
         print("🔧 Inicializando configurações do site...")
         
@@ -0,0 +1,14 @@
+"""
+Migrações versionadas do schema (aplicadas por services/migracoes.py).
+
+Cada arquivo vNNNN_descricao.py é uma migração; a versão é o número NNNN e
+elas rodam em ordem, uma única vez, registradas na tabela schema_version.
+Uma migração define:
+
+    DDL = [...]              # comandos SQL, executados um a um
+    DIALETOS = ('mysql',)    # opcional: só roda nesses bancos (nos outros é só registrada)
+    DDL_SQLITE = [...]       # opcional: comandos próprios de um dialeto, no lugar de DDL
+    def aplicar(conexao): …  # opcional: passo em Python, depois da DDL
+
+Nunca edite uma migração já publicada; crie a próxima versão.
+"""
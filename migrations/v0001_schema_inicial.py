@@ -0,0 +1,110 @@
+"""Schema inicial: as tabelas como estavam quando as migrações foram criadas.
+
+A definição fica congelada aqui (não importa o models.py): mudanças de
+modelo posteriores entram nas migrações seguintes. Em bancos anteriores às
+migrações, tabelas que já existem ficam como estão.
+"""
+
+from sqlalchemy import (Boolean, Column, DateTime, ForeignKey, Integer, MetaData,
+                        Numeric, String, Table, Text)
+
+schema = MetaData()
+
+Table(
+    'configuracoes', schema,
+    Column('id', Integer, primary_key=True),
+    Column('chave', String(100), unique=True, nullable=False, index=True),
+    Column('valor', Text(length=65535), nullable=False),
+    Column('descricao', String(200), nullable=True),
+    Column('tipo', String(20)),
+    Column('categoria', String(50), index=True),
+    Column('data_atualizacao', DateTime),
+)
+
+Table(
+    'usuarios', schema,
+    Column('id', Integer, primary_key=True),
+    Column('nome', String(100), nullable=False),
+    Column('email', String(120), unique=True, nullable=False, index=True),
+    Column('senha_hash', String(200), nullable=True),
+    Column('telefone', String(20), nullable=True),
+    Column('endereco', Text(length=16383), nullable=True),
+    Column('cep', String(9), nullable=True),
+    Column('logradouro', String(150), nullable=True),
+    Column('bairro', String(100), nullable=True),
+    Column('cidade', String(100), nullable=True),
+    Column('estado', String(2), nullable=True),
+    Column('numero_endereco', String(20), nullable=True),
+    Column('complemento_endereco', String(100), nullable=True),
+    Column('ativo', Boolean),
+    Column('data_criacao', DateTime),
+    Column('ultimo_login', DateTime, nullable=True),
+    Column('provider', String(20), nullable=True),
+    Column('provider_id', String(100), nullable=True, index=True),
+    Column('avatar_url', String(500), nullable=True),
+)
+
+Table(
+    'doces', schema,
+    Column('id', Integer, primary_key=True),
+    Column('nome', String(100), nullable=False, index=True),
+    Column('descricao', Text(length=16383), nullable=False),
+    Column('preco', Numeric(10, 2), nullable=False),
+    Column('imagem_url', String(200), nullable=True),
+    Column('ativo', Boolean, index=True),
+    Column('data_criacao', DateTime),
+    Column('sabores', Text(length=16383), nullable=True),
+    Column('quantidade_minima', Integer),
+    Column('unidade_venda', String(20)),
+    Column('estoque_disponivel', Integer, nullable=True),
+    Column('destaque', Boolean),
+    Column('mais_pedido', Boolean, index=True),
+    Column('categoria', String(50), index=True),
+    Column('desconto_percentual', Numeric(5, 2), nullable=True),
+)
+
+Table(
+    'pedidos', schema,
+    Column('id', Integer, primary_key=True),
+    Column('usuario_id', Integer, ForeignKey('usuarios.id'), nullable=False),
+    Column('numero_pedido', String(20), unique=True, nullable=False, index=True),
+    Column('status', String(20), index=True),
+    Column('total', Numeric(10, 2), nullable=False),
+    Column('observacoes', Text(length=16383), nullable=True),
+    Column('data_pedido', DateTime),
+    Column('data_atualizacao', DateTime),
+    Column('removido', Boolean, index=True),
+    Column('data_remocao', DateTime, nullable=True),
+)
+
+Table(
+    'itens_pedido', schema,
+    Column('id', Integer, primary_key=True),
+    Column('pedido_id', Integer, ForeignKey('pedidos.id'), nullable=False),
+    Column('doce_id', Integer, ForeignKey('doces.id'), nullable=False),
+    Column('quantidade', Integer, nullable=False),
+    Column('preco_unitario', Numeric(10, 2), nullable=False),
+    Column('preco_total', Numeric(10, 2), nullable=False),
+    Column('sabor_selecionado', String(100), nullable=True),
+)
+
+Table(
+    'kit_itens', schema,
+    Column('id', Integer, primary_key=True),
+    Column('kit_id', Integer, ForeignKey('doces.id'), nullable=False, index=True),
+    Column('produto_id', Integer, ForeignKey('doces.id'), nullable=False, index=True),
+    Column('quantidade', Integer, nullable=False),
+)
+
+Table(
+    'admins', schema,
+    Column('id', Integer, primary_key=True),
+    Column('usuario', String(50), unique=True, nullable=False),
+    Column('senha_hash', String(200), nullable=False),
+    Column('data_criacao', DateTime),
+)
+
+
+def aplicar(conexao):
+    # create_all só cria o que falta; tabelas existentes ficam como estão
+    schema.create_all(conexao)
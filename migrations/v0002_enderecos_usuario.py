@@ -0,0 +1,13 @@
+"""Colunas de endereço de entrega em usuarios."""
+
+DIALETOS = ('mysql', 'mariadb')
+
+DDL = [
+    "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS cep VARCHAR(9) NULL",
+    "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS logradouro VARCHAR(150) NULL",
+    "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS bairro VARCHAR(100) NULL",
+    "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS cidade VARCHAR(100) NULL",
+    "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS estado VARCHAR(2) NULL",
+    "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS numero_endereco VARCHAR(20) NULL",
+    "ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS complemento_endereco VARCHAR(100) NULL",
+]
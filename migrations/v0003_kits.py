@@ -0,0 +1,17 @@
+"""Kits: desconto, selo "O mais pedido" e tabela de itens do kit."""
+
+DIALETOS = ('mysql', 'mariadb')
+
+DDL = [
+    "ALTER TABLE doces ADD COLUMN IF NOT EXISTS desconto_percentual DECIMAL(5,2) NULL",
+    "ALTER TABLE doces ADD COLUMN IF NOT EXISTS mais_pedido TINYINT(1) NULL DEFAULT 0",
+    "CREATE TABLE IF NOT EXISTS kit_itens (\n"
+    "  id INT AUTO_INCREMENT PRIMARY KEY,\n"
+    "  kit_id INT NOT NULL,\n"
+    "  produto_id INT NOT NULL,\n"
+    "  quantidade INT NOT NULL DEFAULT 1,\n"
+    "  INDEX (kit_id), INDEX (produto_id),\n"
+    "  CONSTRAINT fk_kit_itens_kit FOREIGN KEY (kit_id) REFERENCES doces(id) ON DELETE CASCADE,\n"
+    "  CONSTRAINT fk_kit_itens_prod FOREIGN KEY (produto_id) REFERENCES doces(id)\n"
+    ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+]
@@ -0,0 +1,12 @@
+"""Data de atualização dos produtos (ETag das páginas do catálogo)."""
+
+DIALETOS = ('mysql', 'mariadb')
+
+DDL = [
+    "ALTER TABLE doces ADD COLUMN IF NOT EXISTS data_atualizacao DATETIME NULL",
+]
+
+# Sem IF NOT EXISTS no SQLite: services/migracoes.py confere a coluna antes (PRAGMA table_info)
+DDL_SQLITE = [
+    "ALTER TABLE doces ADD COLUMN data_atualizacao DATETIME",
+]
@@ -0,0 +1,11 @@
+"""Índice composto para as listagens paginadas do catálogo."""
+
+DIALETOS = ('mysql', 'mariadb')
+
+DDL = [
+    "CREATE INDEX ix_doces_ativo_categoria_data ON doces (ativo, categoria, data_criacao)",
+]
+
+DDL_SQLITE = [
+    "CREATE INDEX IF NOT EXISTS ix_doces_ativo_categoria_data ON doces (ativo, categoria, data_criacao)",
+]
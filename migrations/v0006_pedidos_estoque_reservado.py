@@ -0,0 +1,11 @@
+"""Quantidades baixadas do estoque no checkout (devolvidas no cancelamento)."""
+
+DIALETOS = ('mysql', 'mariadb')
+
+DDL = [
+    "ALTER TABLE pedidos ADD COLUMN IF NOT EXISTS estoque_reservado TEXT NULL",
+]
+
+DDL_SQLITE = [
+    "ALTER TABLE pedidos ADD COLUMN estoque_reservado TEXT",
+]
@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
-# Será inicializado em app.py
-db = SQLAlchemy()
+from services.replicas import SessaoRoteada
+
+# Será inicializado em app.py. A sessão manda leituras de rotas marcadas com
+# @leitura_replica para as réplicas de DB_REPLICAS, se houver (services/replicas.py)
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 class Configuracao(db.Model):
     """Modelo para configurações dinâmicas do site"""
@@ -80,6 +83,10 @@ class Usuario(db.Model):
             return ' - '.join(partes)
         return self.endereco or ''
 
+# Status que o admin pode atribuir a um pedido, na ordem do atendimento
+STATUS_PEDIDO = ('pendente', 'preparando', 'pronto', 'entregando', 'concluido', 'cancelado')
+
+
 class Pedido(db.Model):
     """Modelo para pedidos dos usuários"""
     __tablename__ = 'pedidos'
@@ -87,13 +94,15 @@ class Pedido(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     numero_pedido = db.Column(db.String(20), unique=True, nullable=False, index=True)
-    status = db.Column(db.String(20), default='pendente', index=True)  # pendente, confirmado, em_preparo, enviado, entregue, cancelado
+    status = db.Column(db.String(20), default='pendente', index=True)  # um de STATUS_PEDIDO
     total = db.Column(db.Numeric(10, 2), nullable=False)  # DECIMAL para precisão monetária
     observacoes = db.Column(db.Text(length=16383), nullable=True)  # TEXT
     data_pedido = db.Column(db.DateTime, default=datetime.utcnow)
     data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     removido = db.Column(db.Boolean, default=False, index=True)  # Soft delete
     data_remocao = db.Column(db.DateTime, nullable=True)  # Data da remoção
+    # JSON {doce_id: quantidade} baixado do estoque (kits já expandidos); o cancelamento devolve isso
+    estoque_reservado = db.Column(db.Text(length=16383), nullable=True)
     
     # Relacionamento com itens do pedido
     itens = db.relationship('ItemPedido', backref='pedido', lazy=True, cascade='all, delete-orphan')
@@ -123,6 +132,10 @@ class ItemPedido(db.Model):
 class Doce(db.Model):
     """Modelo para os doces da loja"""
     __tablename__ = 'doces'
+    __table_args__ = (
+        # Listagens do catálogo/admin filtram por ativo/categoria e ordenam por data
+        db.Index('ix_doces_ativo_categoria_data', 'ativo', 'categoria', 'data_criacao'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False, index=True)
@@ -131,6 +144,8 @@ class Doce(db.Model):
     imagem_url = db.Column(db.String(200), nullable=True)
     ativo = db.Column(db.Boolean, default=True, index=True)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    # Usada na versão do catálogo (ETag das páginas da loja)
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Novos campos para robustez
     sabores = db.Column(db.Text(length=16383), nullable=True)  # TEXT - Lista de sabores disponíveis
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark da compressão dinâmica: CPU gasta x bytes economizados nas páginas
+reais da loja (renderizadas com o Flask test client em um SQLite temporário).
+
+Mede cada codificação/nível isoladamente sobre o HTML renderizado e, ao fim,
+o tempo total da requisição com a compressão ligada e desligada.
+
+Uso:
+    python scripts/bench_compressao.py
+    python scripts/bench_compressao.py --produtos 200 --repeticoes 200
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CPU x bytes da compressão de respostas")
+    parser.add_argument("--produtos", type=int, default=60, help="produtos no catálogo de teste")
+    parser.add_argument("--repeticoes", type=int, default=100, help="execuções por medição")
+    return parser.parse_args()
+
+
+def medir(func, repeticoes):
+    """Mediana do tempo de CPU (process_time) por execução, em microssegundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.process_time_ns()
+        func()
+        tempos.append((time.process_time_ns() - inicio) / 1000)
+    return statistics.median(tempos)
+
+
+def main() -> int:
+    args = parse_args()
+    tmpdir = tempfile.mkdtemp(prefix="bench_compressao_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from app import app
+    from models import db, Doce
+    from services.compressao import brotli
+
+    with app.app_context():
+        db.create_all()
+        for i in range(args.produtos):
+            db.session.add(Doce(
+                nome=f"Doce {i}", descricao="Brigadeiro gourmet feito com chocolate belga. " * 3,
+                preco=3 + i % 7, categoria="tradicional" if i % 2 else "personalizado",
+            ))
+        db.session.commit()
+        primeiro_id = Doce.query.first().id
+
+    paginas = ["/", "/doces-tradicionais", "/doces-personalizados", f"/doce/{primeiro_id}", "/sitemap.xml"]
+    client = app.test_client()
+    app.config["COMPRESS_ENABLED"] = False
+    corpos = {url: client.get(url).data for url in paginas}
+
+    codecs = [("gzip", n, lambda d, n=n: gzip.compress(d, compresslevel=n, mtime=0)) for n in (1, 6, 9)]
+    if brotli is not None:
+        codecs += [("br", n, lambda d, n=n: brotli.compress(d, quality=n)) for n in (1, 4, 6, 11)]
+    else:
+        print("⚠️  Brotli não instalado: medindo apenas gzip\n")
+
+    print(f"{'página':<24} {'original':>9} {'codec':>8} {'bytes':>8} {'razão':>6} {'CPU µs':>9} {'KB/ms CPU':>10}")
+    print("-" * 80)
+    for url, corpo in corpos.items():
+        for nome, nivel, comprimir in codecs:
+            saida = comprimir(corpo)
+            cpu = medir(lambda: comprimir(corpo), args.repeticoes)
+            economia_kb = (len(corpo) - len(saida)) / 1024
+            print(f"{url:<24} {len(corpo):>9} {f'{nome}-{nivel}':>8} {len(saida):>8} "
+                  f"{len(saida) / len(corpo):>6.2f} {cpu:>9.0f} {economia_kb / (cpu / 1000):>10.1f}")
+        print()
+
+    print("Requisição completa (mediana de CPU, /doces-tradicionais):")
+    url = "/doces-tradicionais"
+    for ligado, encoding in ((False, None), (True, "gzip"), (True, "br")):
+        if encoding == "br" and brotli is None:
+            continue
+        app.config["COMPRESS_ENABLED"] = ligado
+        headers = {"Accept-Encoding": encoding} if encoding else {}
+        cpu = medir(lambda: client.get(url, headers=headers), max(10, args.repeticoes // 5))
+        tamanho = len(client.get(url, headers=headers).data)
+        print(f"  {'sem compressão' if not ligado else encoding:<15} {cpu / 1000:>7.2f} ms  {tamanho:>7} bytes")
+
+    shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
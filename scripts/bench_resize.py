@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do redimensionamento de uploads: compara o caminho antigo
+(exif_transpose + thumbnail sobre a imagem inteira) com o caminho rápido de
+services/imagens.resize_image (draft/reduce antes do LANCZOS).
+
+Cada medição roda em um subprocesso novo, para que o pico de memória
+(VmHWM no Linux) seja apenas daquela execução.
+
+Uso:
+    python scripts/bench_resize.py                     # JPEGs sintéticos de 12, 24 e 48 MP
+    python scripts/bench_resize.py --mp 12 48 --repeticoes 5
+    python scripts/bench_resize.py --arquivo foto.jpg --max 1920 1920
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def resize_legado(image_path, max_size, destino):
+    """Cópia do resize_image anterior ao caminho rápido (referência)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(image_path) as img:
+        try:
+            img = ImageOps.exif_transpose(img)
+        except Exception:
+            pass
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        if img.mode in ('RGBA', 'P'):
+            img = img.convert('RGB')
+        img.save(destino, format='JPEG', optimize=True, quality=85)
+    return True
+
+
+def gerar_jpeg(path, megapixels):
+    """JPEG sintético 4:3 com gradiente (comprime como uma foto, sem ser trivial)."""
+    from PIL import Image
+
+    largura = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    altura = int(largura * 3 / 4)
+    base = Image.linear_gradient('L').resize((largura, altura))
+    img = Image.merge('RGB', (base, base.transpose(Image.Transpose.ROTATE_180), base.rotate(90, expand=False)))
+    img.save(path, format='JPEG', quality=90)
+    return largura, altura
+
+
+def medir(caminho, arquivo, max_size):
+    """Executado no subprocesso: redimensiona uma vez e imprime tempo + pico de RSS."""
+    destino = os.path.join(tempfile.mkdtemp(prefix='bench_resize_'), 'saida.jpg')
+    if caminho == 'legado':
+        funcao = resize_legado
+    else:
+        from services.imagens import resize_image as funcao
+    inicio = time.perf_counter()
+    ok = funcao(arquivo, max_size, destino=destino)
+    duracao = time.perf_counter() - inicio
+    shutil.rmtree(os.path.dirname(destino), ignore_errors=True)
+    print(json.dumps({'ok': bool(ok), 'segundos': duracao, 'maxrss_kb': pico_rss_kb()}))
+
+
+def pico_rss_kb():
+    """Pico de memória residente deste processo, em KB.
+
+    No Linux usa VmHWM (zerado no exec); ru_maxrss herda o pico do processo
+    pai através do exec e distorceria a medição.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+
+def rodar(caminho, arquivo, max_size):
+    cmd = [sys.executable, __file__, '--_medir', caminho, '--arquivo', arquivo,
+           '--max', str(max_size[0]), str(max_size[1])]
+    saida = subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de resize_image (legado x caminho rápido)")
+    parser.add_argument('--mp', type=float, nargs='+', default=[12, 24, 48],
+                        help='megapixels dos JPEGs sintéticos')
+    parser.add_argument('--arquivo', help='usar uma imagem existente em vez das sintéticas')
+    parser.add_argument('--max', type=int, nargs=2, default=[800, 600], metavar=('LARG', 'ALT'),
+                        help='caixa máxima de saída (padrão: 800 600, a dos produtos)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='execuções por caminho (mediana)')
+    parser.add_argument('--_medir', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    max_size = tuple(args.max)
+    if args._medir:
+        medir(args._medir, args.arquivo, max_size)
+        return 0
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_resize_')
+    try:
+        if args.arquivo:
+            entradas = [(os.path.basename(args.arquivo), args.arquivo)]
+        else:
+            entradas = []
+            for mp in args.mp:
+                path = os.path.join(tmpdir, f'sintetica_{mp:g}mp.jpg')
+                largura, altura = gerar_jpeg(path, mp)
+                entradas.append((f'{mp:g} MP ({largura}x{altura})', path))
+
+        print(f"{'imagem':<26} {'caminho':<8} {'mediana (s)':>12} {'pico RSS (MB)':>14}")
+        print('-' * 64)
+        for nome, path in entradas:
+            resultados = {}
+            for caminho in ('legado', 'rapido'):
+                medicoes = [rodar(caminho, path, max_size) for _ in range(args.repeticoes)]
+                if not all(m['ok'] for m in medicoes):
+                    print(f"{nome:<26} {caminho:<8} falhou (imagem rejeitada?)")
+                    continue
+                tempos = sorted(m['segundos'] for m in medicoes)
+                resultados[caminho] = (tempos[len(tempos) // 2], max(m['maxrss_kb'] for m in medicoes) / 1024)
+                tempo, rss = resultados[caminho]
+                print(f"{nome:<26} {caminho:<8} {tempo:>12.3f} {rss:>14.1f}")
+            if len(resultados) == 2:
+                (t_old, m_old), (t_new, m_new) = resultados['legado'], resultados['rapido']
+                print(f"{'':<26} {'ganho':<8} {t_old / t_new:>11.1f}x {m_new - m_old:>+14.1f}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
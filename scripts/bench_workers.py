@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Compara perfis de worker do gunicorn (sync × gthread × gevent) sob carga mista.
+
+Sobe o gunicorn com gunicorn.conf.py para cada perfil, sobre o mesmo banco de
+teste, e dispara por --duracao segundos uma mistura de navegação no catálogo
+com uma fração de checkouts. Os checkouts enviam os e-mails do pedido por um
+SMTP local que demora --atraso-smtp segundos para responder, como um provedor
+lento: no perfil sync cada envio prende um worker inteiro e as páginas do
+catálogo entram na fila; no gthread (ou gevent) só a thread do checkout espera.
+
+Relata req/s e p50/p95 (ms) das páginas e do checkout por perfil. O perfil
+gevent só roda se o pacote estiver instalado.
+
+Uso:
+    python scripts/bench_workers.py
+    python scripts/bench_workers.py --perfis sync,gthread --workers 2 --threads 8 --duracao 20
+"""
+
+import argparse
+import os
+import random
+import shutil
+import signal
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from bench_carga import _CSRF, ClienteHttp, _porta_livre, popular  # noqa: E402
+
+PAGINAS = ("catalogo", "detalhe")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vazão dos perfis de worker do gunicorn com SMTP lento")
+    parser.add_argument("--perfis", default="sync,gthread,gevent", help="classes de worker, separadas por vírgula")
+    parser.add_argument("--workers", type=int, default=2, help="processos do gunicorn (WEB_CONCURRENCY)")
+    parser.add_argument("--threads", type=int, default=4, help="threads por worker no gthread (GUNICORN_THREADS)")
+    parser.add_argument("--processos", type=int, default=12, help="processos geradores de carga")
+    parser.add_argument("--duracao", type=float, default=10, help="segundos de carga por perfil")
+    parser.add_argument("--fracao-checkout", type=float, default=0.1, help="fração das visitas que finalizam pedido")
+    parser.add_argument("--atraso-smtp", type=float, default=0.5, help="segundos até o SMTP de teste responder")
+    parser.add_argument("--semente", type=int, default=42)
+    return parser.parse_args()
+
+
+# ---------------------------------------------------------------------------
+# SMTP lento (aceita tudo, sem TLS)
+# ---------------------------------------------------------------------------
+
+class _SmtpLento(socketserver.StreamRequestHandler):
+    atraso = 0.5
+
+    def _responder(self, linha):
+        self.wfile.write(linha.encode() + b"\r\n")
+
+    def handle(self):
+        time.sleep(self.atraso)
+        self._responder("220 bench ESMTP")
+        dados = False
+        for bruta in self.rfile:
+            linha = bruta.decode(errors="replace").rstrip("\r\n")
+            if dados:
+                if linha == ".":
+                    dados = False
+                    self._responder("250 OK")
+                continue
+            comando = linha.split(" ", 1)[0].upper()
+            if comando in ("EHLO", "HELO"):
+                self._responder("250-bench")
+                self._responder("250 AUTH PLAIN LOGIN")
+            elif comando == "AUTH":
+                self._responder("235 OK")
+            elif comando == "DATA":
+                dados = True
+                self._responder("354 Fim com .")
+            elif comando == "QUIT":
+                self._responder("221 Tchau")
+                return
+            else:
+                self._responder("250 OK")
+
+
+def subir_smtp(atraso):
+    _SmtpLento.atraso = atraso
+    socketserver.ThreadingTCPServer.daemon_threads = True
+    servidor = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SmtpLento)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, servidor.server_address[1]
+
+
+def configurar_email(app, porta_smtp):
+    from models import db, Configuracao
+
+    valores = {
+        "email_host": "127.0.0.1", "email_port": str(porta_smtp), "email_user": "bench",
+        "email_password": "bench", "email_from": "bench@bench.local",
+        "email_site": "vendas@bench.local", "email_use_tls": "false",
+    }
+    with app.app_context():
+        for chave, valor in valores.items():
+            db.session.add(Configuracao(chave=chave, valor=valor))
+        db.session.commit()
+
+
+# ---------------------------------------------------------------------------
+# Carga
+# ---------------------------------------------------------------------------
+
+def _processo(parametros):
+    url, ids, duracao, fracao_checkout, semente, indice = parametros
+    rng = random.Random(semente + indice)
+    usuario_id, email = ids["usuarios"][indice % len(ids["usuarios"])]
+    cliente = ClienteHttp(url)
+    cliente.login(usuario_id, email)
+    limite = time.monotonic() + duracao
+    while time.monotonic() < limite:
+        doce_id = rng.choice(ids["doces"])
+        cliente.requisitar("catalogo", "GET", "/doces-tradicionais")
+        _, html = cliente.requisitar("detalhe", "GET", f"/doce/{doce_id}")
+        if rng.random() < fracao_checkout:
+            encontrado = _CSRF.search(html)
+            token = encontrado.group(1) if encontrado else ""
+            cliente.requisitar(None, "POST", "/adicionar_carrinho",
+                               data={"doce_id": doce_id, "quantidade": 1, "csrf_token": token})
+            cliente.requisitar("checkout", "POST", "/finalizar_pedido", data={"csrf_token": token})
+    return dict(cliente.amostras)
+
+
+def subir_gunicorn(perfil, args, env, tmpdir):
+    import requests
+
+    porta = _porta_livre()
+    env = dict(env, GUNICORN_WORKER_CLASS=perfil, GUNICORN_BIND=f"127.0.0.1:{porta}",
+               WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads))
+    saida = open(os.path.join(tmpdir, f"gunicorn_{perfil}.log"), "wb")
+    processo = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "app:app"], cwd=ROOT, env=env,
+                                stdout=saida, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{porta}"
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite and processo.poll() is None:
+        try:
+            # Uma requisição por worker para compilar templates antes de medir
+            for _ in range(args.workers * 2):
+                requests.get(url + "/doces-tradicionais", timeout=10)
+            return processo, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    processo.kill()
+    raise SystemExit(f"gunicorn ({perfil}) não respondeu; veja {saida.name}")
+
+
+def medir(perfil, args, ids, env, tmpdir):
+    processo, url = subir_gunicorn(perfil, args, env, tmpdir)
+    try:
+        parametros = [(url, ids, args.duracao, args.fracao_checkout, args.semente, i)
+                      for i in range(args.processos)]
+        inicio = time.perf_counter()
+        with Pool(args.processos) as pool:
+            resultados = pool.map(_processo, parametros)
+        duracao = time.perf_counter() - inicio
+    finally:
+        processo.send_signal(signal.SIGTERM)
+        processo.wait(timeout=30)
+
+    grupos = {"paginas": [], "checkout": []}
+    erros = 0
+    for resultado in resultados:
+        for passo, lista in resultado.items():
+            grupos["paginas" if passo in PAGINAS else "checkout"].extend(ms for ms, _, _ in lista)
+            erros += sum(1 for _, _, status in lista if status != 200)
+    relatorio = {"req_s": sum(map(len, grupos.values())) / duracao, "erros": erros}
+    for grupo, tempos in grupos.items():
+        cortes = statistics.quantiles(tempos, n=100, method="inclusive") if len(tempos) > 1 else (tempos or [0]) * 99
+        relatorio[grupo] = (len(tempos), cortes[49], cortes[94])
+    return relatorio
+
+
+def main() -> int:
+    args = parse_args()
+    if not shutil.which("gunicorn"):
+        raise SystemExit("gunicorn não instalado")
+    perfis = []
+    for perfil in (p.strip() for p in args.perfis.split(",") if p.strip()):
+        if perfil == "gevent":
+            try:
+                import gevent  # noqa: F401
+            except ImportError:
+                print("⏭️  gevent não instalado: perfil ignorado")
+                continue
+        perfis.append(perfil)
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_workers_")
+    env = dict(os.environ, LOG_LEVEL="ERROR",
+               DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'bench.db')}?timeout=30")
+    os.environ.update(env)
+
+    from app import create_app
+
+    app = create_app()
+    print("Populando banco de teste...")
+    ids = popular(app, SimpleNamespace(produtos=200, usuarios=max(50, args.processos), pedidos=500,
+                                       semente=args.semente))
+    smtp, porta_smtp = subir_smtp(args.atraso_smtp)
+    configurar_email(app, porta_smtp)
+
+    relatorios = {}
+    try:
+        for perfil in perfis:
+            print(f"Medindo {perfil}...")
+            relatorios[perfil] = medir(perfil, args, ids, env, tmpdir)
+    finally:
+        smtp.shutdown()
+
+    print(f"\n=== {args.workers} workers, {args.threads} threads (gthread), {args.processos} clientes, "
+          f"{args.fracao_checkout:.0%} checkout, SMTP {args.atraso_smtp}s ===")
+    print(f"{'perfil':<10}{'req/s':>8}{'páginas p50':>13}{'p95':>9}{'checkout p50':>14}{'p95':>9}{'erros':>7}")
+    for perfil, r in relatorios.items():
+        _, pag50, pag95 = r["paginas"]
+        _, chk50, chk95 = r["checkout"]
+        print(f"{perfil:<10}{r['req_s']:>8.1f}{pag50:>13.1f}{pag95:>9.1f}{chk50:>14.1f}{chk95:>9.1f}{r['erros']:>7}")
+
+    shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
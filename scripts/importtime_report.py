@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Relatório do custo de inicialização de um worker (python -X importtime).
+
+Roda, em um processo novo, o mesmo que o gunicorn faz ao subir um worker
+(importar o módulo e obter `app`) e mostra:
+
+  * os módulos mais caros por tempo acumulado e por tempo próprio;
+  * quais módulos pesados e de uso raro (Pillow, requests, smtplib...)
+    foram carregados na inicialização — devem ficar para o primeiro uso;
+  * a mediana do cold start (import + create_app) em várias execuções.
+
+Usa um SQLite temporário para não depender do MySQL.
+
+Uso:
+    python scripts/importtime_report.py
+    python scripts/importtime_report.py --top 30 --repeticoes 10
+    python scripts/importtime_report.py --json relatorio.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Módulos que não deveriam ser importados só para subir o worker
+MODULOS_PREGUICOSOS = ("PIL", "requests", "smtplib", "email.mime", "urllib3", "charset_normalizer")
+
+_LINHA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+_CODIGO_COLD_START = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+importado = time.perf_counter()
+{modulo}.app
+pronto = time.perf_counter()
+print(json.dumps({{"import_ms": (importado - inicio) * 1000, "app_ms": (pronto - importado) * 1000,
+                  "modulos": sorted(sys.modules)}}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Custo de import/inicialização do worker")
+    parser.add_argument("--modulo", default="app", help="módulo com o objeto `app` (padrão: app)")
+    parser.add_argument("--top", type=int, default=20, help="quantos módulos listar")
+    parser.add_argument("--repeticoes", type=int, default=5, help="execuções do cold start")
+    parser.add_argument("--json", dest="saida_json", help="gravar o relatório completo neste arquivo")
+    return parser.parse_args()
+
+
+def ambiente(tmpdir):
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmpdir, 'importtime.db')}")
+    return env
+
+
+def medir_importtime(modulo, env):
+    """[(proprio_us, acumulado_us, profundidade, nome)] de um import completo."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}; {modulo}.app"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if processo.returncode != 0:
+        sys.stderr.write(processo.stderr[-2000:])
+        raise SystemExit(f"Falha ao importar {modulo}")
+    linhas = []
+    for linha in processo.stderr.splitlines():
+        encontrado = _LINHA.match(linha)
+        if encontrado:
+            proprio, acumulado, recuo, nome = encontrado.groups()
+            linhas.append((int(proprio), int(acumulado), len(recuo) // 2, nome))
+    return linhas
+
+
+def medir_cold_start(modulo, env, repeticoes):
+    resultados = []
+    for _ in range(repeticoes):
+        processo = subprocess.run(
+            [sys.executable, "-c", _CODIGO_COLD_START.format(modulo=modulo)],
+            cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+        if processo.returncode != 0:
+            sys.stderr.write(processo.stderr[-2000:])
+            raise SystemExit("Falha no cold start")
+        resultados.append(json.loads(processo.stdout.strip().splitlines()[-1]))
+    return resultados
+
+
+def main() -> int:
+    args = parse_args()
+    tmpdir = tempfile.mkdtemp(prefix="importtime_")
+    env = ambiente(tmpdir)
+
+    # A primeira execução aquece o cache de bytecode e gera bundles/manifesto
+    medir_cold_start(args.modulo, env, 1)
+    linhas = medir_importtime(args.modulo, env)
+    total_us = sum(proprio for proprio, _, _, _ in linhas)
+
+    print(f"Imports: {len(linhas)} módulos, {total_us / 1000:.1f} ms somando o tempo próprio\n")
+    print(f"Top {args.top} por tempo acumulado (imports diretos):")
+    primeiro_nivel = sorted((l for l in linhas if l[2] == 1), key=lambda l: l[1], reverse=True)
+    for proprio, acumulado, _, nome in primeiro_nivel[:args.top]:
+        print(f"  {acumulado / 1000:>8.1f} ms  {nome}")
+
+    print(f"\nTop {args.top} por tempo próprio:")
+    for proprio, acumulado, _, nome in sorted(linhas, key=lambda l: l[0], reverse=True)[:args.top]:
+        print(f"  {proprio / 1000:>8.1f} ms  {nome}")
+
+    execucoes = medir_cold_start(args.modulo, env, args.repeticoes)
+    carregados = execucoes[-1]["modulos"]
+    preguicosos = [m for m in MODULOS_PREGUICOSOS
+                   if any(c == m or c.startswith(f"{m}.") for c in carregados)]
+    print("\nMódulos de uso raro carregados na inicialização:",
+          ", ".join(preguicosos) if preguicosos else "nenhum ✅")
+
+    import_ms = statistics.median(e["import_ms"] for e in execucoes)
+    app_ms = statistics.median(e["app_ms"] for e in execucoes)
+    print(f"\nCold start (mediana de {args.repeticoes}): import {import_ms:.1f} ms"
+          f" + create_app {app_ms:.1f} ms = {import_ms + app_ms:.1f} ms")
+
+    if args.saida_json:
+        relatorio = {
+            "modulo": args.modulo,
+            "import_ms": import_ms,
+            "create_app_ms": app_ms,
+            "preguicosos_carregados": preguicosos,
+            "imports": [
+                {"modulo": nome, "proprio_us": proprio, "acumulado_us": acumulado, "profundidade": prof}
+                for proprio, acumulado, prof, nome in linhas
+            ],
+        }
+        with open(args.saida_json, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"📄 {args.saida_json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Memória por worker do gunicorn com e sem --preload (GUNICORN_PRELOAD).
+
+Sobe o gunicorn com gunicorn.conf.py nos dois modos, sobre o mesmo banco de
+teste, aquece todos os workers com as páginas da loja e do admin e lê
+/proc/<pid>/smaps_rollup (Linux) do mestre e de cada worker:
+
+  * RSS: páginas residentes, contando inteiras as compartilhadas com o mestre;
+  * PSS: compartilhadas divididas entre os processos que as usam;
+  * USS: só as páginas privadas do processo (o que um worker a mais custa).
+
+Com preload, RSS quase não muda (as páginas herdadas continuam residentes em
+cada worker); o ganho aparece em PSS/USS e no total da máquina. O script
+também confere que o mestre não fica com o arquivo do banco aberto.
+
+Uso:
+    python scripts/medir_memoria.py
+    python scripts/medir_memoria.py --workers 4 --requisicoes 400
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from bench_carga import ADMIN_SENHA, ADMIN_USUARIO, _CSRF, _porta_livre, popular  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="RSS/PSS/USS por worker com e sem preload")
+    parser.add_argument("--workers", type=int, default=4, help="processos do gunicorn (WEB_CONCURRENCY)")
+    parser.add_argument("--threads", type=int, default=4, help="threads por worker (GUNICORN_THREADS)")
+    parser.add_argument("--requisicoes", type=int, default=300, help="requisições de aquecimento")
+    return parser.parse_args()
+
+
+def memoria(pid):
+    """RSS, PSS e USS (kB) de um processo."""
+    campos = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == "kB":
+                campos[partes[0].rstrip(":")] = int(partes[1])
+    return campos["Rss"], campos["Pss"], campos["Private_Clean"] + campos["Private_Dirty"]
+
+
+def filhos(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def arquivos_abertos(pid, caminho):
+    total = 0
+    for fd in os.listdir(f"/proc/{pid}/fd"):
+        try:
+            if os.readlink(f"/proc/{pid}/fd/{fd}").startswith(caminho):
+                total += 1
+        except OSError:
+            pass
+    return total
+
+
+def aquecer(url, ids, args):
+    """Páginas da loja e do admin, em paralelo, até todos os workers terem servido cada uma."""
+    import requests
+
+    admin = requests.Session()
+    token = _CSRF.search(admin.get(url + "/admin/login").text).group(1)
+    admin.post(url + "/admin/login", data={"usuario": ADMIN_USUARIO, "senha": ADMIN_SENHA, "csrf_token": token})
+    paginas = ["/", "/doces-tradicionais", "/doces-personalizados", "/carrinho", "/usuario/login",
+               "/sitemap.xml", "/robots.txt"] + [f"/doce/{d}" for d in ids["doces"][:20]]
+    paginas_admin = ["/admin/", "/admin/doces", "/admin/pedidos"]
+
+    def uma(n):
+        if n % 5 == 0:
+            return admin.get(url + paginas_admin[n % len(paginas_admin)]).status_code
+        return requests.get(url + paginas[n % len(paginas)]).status_code
+
+    with ThreadPoolExecutor(args.workers * args.threads) as executor:
+        status = list(executor.map(uma, range(args.requisicoes)))
+    return sum(1 for s in status if s >= 500)
+
+
+def medir(preload, args, ids, env, tmpdir, banco):
+    import requests
+
+    porta = _porta_livre()
+    env = dict(env, GUNICORN_PRELOAD=preload, GUNICORN_BIND=f"127.0.0.1:{porta}",
+               WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads))
+    saida = open(os.path.join(tmpdir, f"gunicorn_preload{preload}.log"), "wb")
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "app:app"], cwd=ROOT, env=env,
+                                stdout=saida, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{porta}"
+    try:
+        limite = time.monotonic() + 60
+        while True:
+            if processo.poll() is not None or time.monotonic() > limite:
+                raise SystemExit(f"gunicorn não respondeu; veja {saida.name}")
+            try:
+                requests.get(url + "/robots.txt", timeout=10)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+        pronto = time.perf_counter() - inicio
+        erros = aquecer(url, ids, args)
+        time.sleep(0.5)
+        workers = filhos(processo.pid)
+        por_worker = [memoria(pid) for pid in workers]
+        return {
+            "pronto_s": pronto,
+            "erros": erros,
+            "mestre": memoria(processo.pid),
+            "mestre_banco_aberto": arquivos_abertos(processo.pid, banco),
+            "workers": por_worker,
+        }
+    finally:
+        processo.send_signal(signal.SIGTERM)
+        processo.wait(timeout=30)
+
+
+def main() -> int:
+    args = parse_args()
+    if not shutil.which("gunicorn"):
+        raise SystemExit("gunicorn não instalado")
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("Requer Linux (/proc/<pid>/smaps_rollup)")
+
+    tmpdir = tempfile.mkdtemp(prefix="medir_memoria_")
+    banco = os.path.join(tmpdir, "bench.db")
+    env = dict(os.environ, LOG_LEVEL="ERROR", DB_POOL_AQUECER="1", DATABASE_URL=f"sqlite:///{banco}?timeout=30")
+    os.environ.update(env)
+
+    from app import create_app
+
+    print("Populando banco de teste...")
+    ids = popular(create_app(), SimpleNamespace(produtos=200, usuarios=50, pedidos=500, semente=42))
+
+    resultados = {}
+    for preload in ("0", "1"):
+        print(f"Medindo GUNICORN_PRELOAD={preload}...")
+        resultados[preload] = medir(preload, args, ids, env, tmpdir, banco)
+
+    print(f"\n=== {args.workers} workers × {args.threads} threads, {args.requisicoes} requisições (kB) ===")
+    print(f"{'preload':<9}{'RSS/worker':>12}{'PSS/worker':>12}{'USS/worker':>12}{'PSS total':>11}"
+          f"{'mestre RSS':>12}{'boot s':>8}{'erros':>7}")
+    for preload, r in resultados.items():
+        n = len(r["workers"]) or 1
+        rss, pss, uss = (sum(w[i] for w in r["workers"]) / n for i in range(3))
+        total = r["mestre"][1] + sum(w[1] for w in r["workers"])
+        print(f"{'sim' if preload == '1' else 'não':<9}{rss:>12,.0f}{pss:>12,.0f}{uss:>12,.0f}{total:>11,}"
+              f"{r['mestre'][0]:>12,}{r['pronto_s']:>8.1f}{r['erros']:>7}")
+    for preload, r in resultados.items():
+        if r["mestre_banco_aberto"]:
+            print(f"⚠️  preload={preload}: mestre com {r['mestre_banco_aberto']} descritor(es) do banco abertos")
+
+    shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
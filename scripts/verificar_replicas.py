@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Verificação do roteamento leitura/escrita entre primário e réplica.
+
+Usa dois bancos (por padrão, dois SQLite temporários: o "primário" e uma cópia
+feita antes de uma alteração, fazendo o papel de réplica atrasada) e confere:
+
+  * páginas do catálogo anônimas leem da réplica;
+  * consultas fora de rotas de leitura vão ao primário;
+  * depois de uma escrita (pedido finalizado), o mesmo visitante lê do
+    primário até passar DB_REPLICA_ATRASO_MAX;
+  * réplica fora do ar sai da rotação e tudo vai para o primário.
+
+Uso:
+    python scripts/verificar_replicas.py
+    python scripts/verificar_replicas.py --primario mysql+pymysql://u:s@localhost/pa \\
+        --replica mysql+pymysql://u:s@localhost:3307/pa
+
+Com MySQL, a réplica precisa estar com a replicação PARADA (STOP REPLICA) para
+que a diferença entre os bancos seja observável. ATENÇÃO: o primário é recriado.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+ATRASO_MAX = 1.0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Roteamento de leituras para réplicas")
+    parser.add_argument("--primario", help="URI do primário (padrão: SQLite temporário)")
+    parser.add_argument("--replica", help="URI da réplica (padrão: cópia do SQLite primário)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    tmpdir = tempfile.mkdtemp(prefix="verificar_replicas_")
+    primario = args.primario or f"sqlite:///{os.path.join(tmpdir, 'primario.db')}"
+    replica = args.replica or f"sqlite:///{os.path.join(tmpdir, 'replica.db')}"
+    os.environ.update(
+        DATABASE_URL=primario, DB_REPLICAS=replica,
+        DB_REPLICA_ATRASO_MAX=str(ATRASO_MAX), DB_REPLICA_CHECAGEM="0",
+    )
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    from app import create_app
+    from models import db, Doce, Usuario
+    from services import replicas
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        doce = Doce(nome="Versão da réplica", descricao="Teste de roteamento", preco=2, categoria="tradicional")
+        usuario = Usuario(nome="Cliente", email="cliente@replicas.local", senha_hash="x")
+        db.session.add_all([doce, usuario])
+        db.session.commit()
+        doce_id, usuario_id = doce.id, usuario.id
+        db.engine.dispose()
+        if not args.replica:
+            shutil.copy(os.path.join(tmpdir, "primario.db"), os.path.join(tmpdir, "replica.db"))
+        # Alteração que a réplica ainda "não recebeu"
+        db.session.get(Doce, doce_id).nome = "Versão do primário"
+        db.session.commit()
+
+    resultados = []
+
+    def conferir(descricao, ok):
+        resultados.append(ok)
+        print(f"{'✅' if ok else '❌'} {descricao}")
+
+    cliente = app.test_client()
+    pagina = cliente.get(f"/doce/{doce_id}").get_data(as_text=True)
+    conferir("Detalhe do produto anônimo lido da réplica", "Versão da réplica" in pagina)
+
+    with cliente.session_transaction() as sess:
+        sess["user_id"] = usuario_id
+        sess["cart"] = {str(doce_id): {
+            "id": doce_id, "nome": "x", "preco": 2.0, "quantidade": 1, "quantidade_minima": 1,
+            "sabor_selecionado": "", "imagem_url": None, "unidade_venda": "unidade",
+        }}
+    with app.test_request_context(f"/doce/{doce_id}"):
+        conferir("Consulta fora de rota de leitura vai ao primário",
+                 db.session.get(Doce, doce_id).nome == "Versão do primário")
+
+    cliente.post("/finalizar_pedido")
+    pagina = cliente.get(f"/doce/{doce_id}").get_data(as_text=True)
+    conferir("Logo após escrever, o mesmo visitante lê do primário", "Versão do primário" in pagina)
+
+    outro = app.test_client()
+    pagina = outro.get(f"/doce/{doce_id}").get_data(as_text=True)
+    conferir("Outro visitante continua na réplica", "Versão da réplica" in pagina)
+
+    time.sleep(ATRASO_MAX + 0.1)
+    pagina = cliente.get(f"/doce/{doce_id}").get_data(as_text=True)
+    conferir("Passado o atraso tolerado, o visitante volta à réplica", "Versão da réplica" in pagina)
+
+    if args.replica:
+        print("⏭️  Réplica fora do ar: verificado só com SQLite")
+    else:
+        # Arquivo que não é um banco: qualquer conexão à réplica falha
+        with app.app_context():
+            for chave, engine in db.engines.items():
+                if chave and chave.startswith(replicas.PREFIXO_BIND):
+                    engine.dispose()
+        with open(os.path.join(tmpdir, "replica.db"), "wb") as f:
+            f.write(b"fora do ar" * 100)
+        resposta = outro.get(f"/doce/{doce_id}")
+        conferir("Réplica fora do ar sai da rotação (leitura no primário)",
+                 resposta.status_code == 200 and "Versão do primário" in resposta.get_data(as_text=True))
+
+    shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0 if all(resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
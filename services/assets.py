@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+# Pastas de static/ fora do manifesto: uploads mudam em tempo de execução e
+# os novos já são nomeados pelo hash do conteúdo; dist/ tem os bundles, que
+# também levam o hash no nome (ver services/bundles.py)
+PASTAS_IGNORADAS = ('uploads', 'images/uploads', 'dist')
+# Tamanho do hash usado em ?v= (12 hex = 48 bits, suficiente para cache busting)
+HASH_ASSET_LEN = 12
+CHUNK_SIZE = 64 * 1024
+
+
+def hash_arquivo(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_ASSET_LEN]
+
+
+def _listar_estaticos(static_folder: str, ignoradas: Iterable[str]) -> Iterable[str]:
+    ignoradas = {p.strip('/') for p in ignoradas}
+    for raiz, pastas, arquivos in os.walk(static_folder):
+        relativa = os.path.relpath(raiz, static_folder).replace(os.sep, '/')
+        pastas[:] = sorted(
+            p for p in pastas
+            if not p.startswith('.') and (p if relativa == '.' else f"{relativa}/{p}") not in ignoradas
+        )
+        for nome in sorted(arquivos):
+            # Variantes .gz/.br acompanham o original (mesmo ?v=)
+            if nome.startswith('.') or nome.endswith(('.gz', '.br')):
+                continue
+            yield nome if relativa == '.' else f"{relativa}/{nome}"
+
+
+def gerar_manifesto(static_folder: str, ignoradas: Iterable[str] = PASTAS_IGNORADAS) -> Dict[str, str]:
+    """Hash do conteúdo de cada arquivo estático: {caminho relativo: hash}."""
+    return {
+        relativo: hash_arquivo(os.path.join(static_folder, relativo))
+        for relativo in _listar_estaticos(static_folder, ignoradas)
+    }
+
+
+def versao_do_manifesto(manifesto: Dict[str, str]) -> str:
+    """Versão global derivada do manifesto (igual em todos os workers)."""
+    digest = hashlib.sha256(json.dumps(manifesto, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:HASH_ASSET_LEN]
+
+
+def gravar_manifesto(manifesto: Dict[str, str], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def ler_manifesto(path: str) -> Optional[Dict[str, str]]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def manifesto_em_dia(static_folder: str, manifesto: Dict[str, str], path: str,
+                     ignoradas: Iterable[str] = PASTAS_IGNORADAS) -> bool:
+    """Confere o manifesto só com stat: mesmos arquivos e nenhum modificado depois dele."""
+    try:
+        gerado_em = os.path.getmtime(path)
+    except OSError:
+        return False
+    arquivos = set()
+    for relativo in _listar_estaticos(static_folder, ignoradas):
+        if os.path.getmtime(os.path.join(static_folder, relativo)) > gerado_em:
+            return False
+        arquivos.add(relativo)
+    return arquivos == set(manifesto)
+
+
+class AssetManifest:
+    """Resolve a versão (?v=) de cada arquivo estático pelo hash do conteúdo.
+
+    Em produção o manifesto vem do arquivo gerado no deploy
+    (`flask --app app assets-manifesto`); sem ele, é calculado uma vez na
+    inicialização, ou quando o arquivo ficou para trás (arquivos estáticos
+    mais novos que ele ou lista diferente). Como o hash depende só dos
+    bytes, todos os workers chegam aos mesmos valores. Com `recarregar=True` em versao_de (modo debug) o
+    arquivo é re-hasheado quando o mtime muda, para refletir edições sem reiniciar.
+    """
+
+    def __init__(self, static_folder: str, manifest_path: Optional[str] = None):
+        self.static_folder = static_folder
+        self._lock = threading.Lock()
+        self._mtimes: Dict[str, float] = {}
+        manifesto = ler_manifesto(manifest_path) if manifest_path else None
+        self.origem = 'arquivo' if manifesto is not None else 'calculado'
+        if manifesto is not None and not manifesto_em_dia(static_folder, manifesto, manifest_path):
+            # Deploy sem `assets-manifesto`: hashes antigos fixariam arquivos velhos (immutable)
+            manifesto = None
+            self.origem = 'calculado, manifesto desatualizado'
+        self._hashes: Dict[str, str] = manifesto if manifesto is not None else gerar_manifesto(static_folder)
+        self.versao = versao_do_manifesto(self._hashes)
+
+    def _hash_sob_demanda(self, filename: str) -> Tuple[Optional[str], Optional[float]]:
+        path = os.path.join(self.static_folder, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None, None
+        if self._mtimes.get(filename) == mtime and filename in self._hashes:
+            return self._hashes[filename], mtime
+        return hash_arquivo(path), mtime
+
+    def versao_de(self, filename: str, recarregar: bool = False) -> Optional[str]:
+        """Hash do arquivo, ou None se não existir em static/."""
+        filename = filename.lstrip('/')
+        if not recarregar:
+            versao = self._hashes.get(filename)
+            if versao is not None:
+                return versao
+        # Arquivo fora do manifesto (ex.: upload antigo) ou modo debug
+        versao, mtime = self._hash_sob_demanda(filename)
+        if versao is not None:
+            with self._lock:
+                self._hashes[filename] = versao
+                self._mtimes[filename] = mtime
+        return versao
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import time
+import weakref
+from typing import Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import Pool, QueuePool
+
+from services.logs import obter_logger
+from services.metricas import observar_espera_pool
+
+log = obter_logger('banco')
+
+# O MySQL derruba conexões ociosas após wait_timeout (300 s em muitas
+# hospedagens); reciclar antes disso evita o erro na primeira consulta
+RECICLAR_SEGUNDOS = 280
+TIMEOUT_POOL = 10
+TIMEOUT_CONEXAO = 5
+
+_apps: 'weakref.WeakSet' = weakref.WeakSet()
+
+
+def threads_por_worker() -> int:
+    return max(1, int(os.getenv('GUNICORN_THREADS', '1')))
+
+
+def workers() -> int:
+    # Mesma variável que o gunicorn usa como padrão de --workers
+    return max(1, int(os.getenv('WEB_CONCURRENCY', '3')))
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mede quanto cada requisição esperou por uma conexão livre."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            observar_espera_pool(time.perf_counter() - inicio, esgotado=True)
+            raise
+        observar_espera_pool(time.perf_counter() - inicio)
+        return conexao
+
+
+def opcoes_engine(uri: str) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS para a URI: pool por worker, pre-ping e reciclagem.
+
+    Cada worker tem seu pool: `pool_size` acompanha as threads do worker
+    (GUNICORN_THREADS) e `max_overflow` absorve picos curtos. O total no
+    banco fica em workers × (pool_size + max_overflow), que precisa caber
+    no max_connections do MySQL. Tudo pode ser ajustado por DB_POOL_*.
+    """
+    url = make_url(uri)
+    if url.drivername.startswith('sqlite') and url.database in (None, '', ':memory:'):
+        # SQLite em memória usa StaticPool (Flask-SQLAlchemy), sem opções de fila
+        return {}
+    threads = threads_por_worker()
+    opcoes = {
+        'poolclass': PoolMedido,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', threads)),
+        'max_overflow': int(os.getenv('DB_POOL_OVERFLOW', max(2, threads))),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', TIMEOUT_POOL)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', RECICLAR_SEGUNDOS)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') != '0',
+        # Reusa sempre as mesmas conexões; as excedentes envelhecem e são recicladas
+        'pool_use_lifo': True,
+    }
+    if url.drivername.startswith('mysql'):
+        opcoes['connect_args'] = {'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', TIMEOUT_CONEXAO))}
+    return opcoes
+
+
+@event.listens_for(Pool, 'connect')
+def _marcar_processo(conexao_dbapi, registro):
+    registro.info['pid'] = os.getpid()
+
+
+@event.listens_for(Pool, 'checkout')
+def _conferir_processo(conexao_dbapi, registro, proxy):
+    # Conexão aberta em outro processo (fork sem descartar_apos_fork): o
+    # socket é compartilhado com o pai, então descarta e abre outra
+    if registro.info.get('pid', os.getpid()) != os.getpid():
+        registro.dbapi_connection = proxy.dbapi_connection = None
+        raise exc.DisconnectionError(f"Conexão criada no processo {registro.info['pid']}")
+
+
+def descartar_apos_fork(app) -> None:
+    """Troca os pools herdados por pools novos, sem fechar os sockets do processo pai."""
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def fechar_pools(app) -> None:
+    """Fecha as conexões do processo atual (ex.: mestre do gunicorn antes do fork)."""
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _apos_fork() -> None:
+    for app in list(_apps):
+        descartar_apos_fork(app)
+
+
+os.register_at_fork(after_in_child=_apos_fork)
+
+
+def aquecer_pool(app, conexoes: Optional[int] = None) -> int:
+    """Abre `conexoes` (padrão: pool_size) em cada engine para o primeiro acesso não pagar o connect.
+
+    Inclui as réplicas de leitura (binds de DB_REPLICAS, services/replicas.py);
+    uma engine fora do ar não impede o aquecimento das outras.
+    """
+    from models import db
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    total = 0
+    for engine in engines:
+        tamanho = conexoes or getattr(engine.pool, 'size', lambda: 1)()
+        abertas = []
+        try:
+            for _ in range(tamanho):
+                conexao = engine.connect()
+                abertas.append(conexao)
+                conexao.exec_driver_sql('SELECT 1')
+        except exc.SQLAlchemyError as e:
+            log.warning("Aquecimento do pool interrompido (%s): %s", engine.url.host or engine.url.database, e)
+        finally:
+            for conexao in abertas:
+                conexao.close()
+        total += len(abertas)
+    return total
+
+
+def _aquecer(app) -> None:
+    inicio = time.perf_counter()
+    abertas = aquecer_pool(app)
+    log.info("Pool aquecido: %d conexão(ões) em %.0f ms", abertas, (time.perf_counter() - inicio) * 1000)
+
+
+def preparar_worker(app) -> None:
+    """post_fork com --preload: pools novos neste worker e, com DB_POOL_AQUECER, aquecidos."""
+    descartar_apos_fork(app)
+    if app.config.get('DB_POOL_AQUECER'):
+        _aquecer(app)
+
+
+def registrar(app) -> None:
+    """Pools descartados após fork e, com DB_POOL_AQUECER, aquecidos ao subir o worker.
+
+    Com PRELOAD a aplicação sobe no mestre: o aquecimento fica para o
+    post_fork de cada worker (preparar_worker).
+    """
+    _apps.add(app)
+    opcoes = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    if 'pool_size' in opcoes:
+        por_worker = opcoes['pool_size'] + opcoes['max_overflow']
+        log.info("Pool do banco: %d + %d extra por worker (até %d conexões com %d workers)",
+                 opcoes['pool_size'], opcoes['max_overflow'], por_worker * workers(), workers())
+    if app.config.get('DB_POOL_AQUECER') and not app.config.get('PRELOAD'):
+        _aquecer(app)
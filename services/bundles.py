@@ -0,0 +1,506 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import posixpath
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from services.assets import hash_arquivo
+from services.compressao import comprimir_arquivo
+
+# Bundles por página: nome lógico -> arquivos de static/ na ordem original dos
+# <link>/<script>. @import de CSS é expandido no lugar; arquivos repetidos
+# ficam só na última posição, o que preserva a cascata de antes.
+BUNDLES: Dict[str, List[str]] = {
+    'loja.css': ['css/main.css', 'css/loja.css'],
+    'admin.css': ['css/main.css', 'css/components.css', 'css/admin.css'],
+    'loja.js': ['js/main.js', 'js/modal.js'],
+    'admin.js': ['js/admin.js', 'js/modal.js'],
+}
+PASTA_BUNDLES = 'dist'
+MANIFESTO_BUNDLES = 'bundles.json'
+HASH_BUNDLE_LEN = 12
+
+_IMPORT_RE = re.compile(r'''@import\s+(?:url\(\s*)?['"]?([^'")\s;]+)['"]?\s*\)?[^;\n]*;''')
+_COMENTARIO_CSS_RE = re.compile(r'/\*.*?\*/', re.S)
+_URL_RE = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_BASE64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+
+# ===== SOURCE MAP =====
+
+def _vlq(valor: int) -> str:
+    valor = (-valor << 1) | 1 if valor < 0 else valor << 1
+    saida = ''
+    while True:
+        digito = valor & 31
+        valor >>= 5
+        if valor:
+            digito |= 32
+        saida += _BASE64[digito]
+        if not valor:
+            return saida
+
+
+class _Saida:
+    """Acumula o código minificado e os segmentos do source map (v3).
+
+    Cada trecho emitido guarda (fonte, linha, coluna) de origem; o mapa
+    registra um segmento sempre que a linha de origem muda, o que basta
+    para o DevTools apontar o arquivo e a linha originais.
+    """
+
+    def __init__(self):
+        self.linhas: List[str] = ['']
+        self.segmentos: List[List[Tuple[int, int, int, int]]] = [[]]
+        self._ultima_origem: Optional[Tuple[int, int]] = None
+
+    def escrever(self, texto: str, fonte: int, linha: int, coluna: int) -> None:
+        partes = texto.split('\n')
+        for n, parte in enumerate(partes):
+            if n:
+                # Quebra dentro de um literal (template string): sempre preservada
+                self.linhas.append('')
+                self.segmentos.append([])
+                linha, coluna = linha + 1, 0
+            if not parte:
+                continue
+            if self._ultima_origem != (fonte, linha) or not self.linhas[-1]:
+                self.segmentos[-1].append((len(self.linhas[-1]), fonte, linha, coluna))
+                self._ultima_origem = (fonte, linha)
+            self.linhas[-1] += parte
+
+    def quebrar(self) -> None:
+        if self.linhas[-1]:
+            self.linhas.append('')
+            self.segmentos.append([])
+
+    def ultimo_char(self) -> str:
+        return self.linhas[-1][-1:] if self.linhas[-1] else ''
+
+    def remover_ultimo_char(self) -> None:
+        self.linhas[-1] = self.linhas[-1][:-1]
+
+    def _linhas_finais(self) -> int:
+        return len(self.linhas) - (1 if not self.linhas[-1] else 0)
+
+    def codigo(self) -> str:
+        return '\n'.join(self.linhas[:self._linhas_finais()]) + '\n'
+
+    def mapa(self, arquivo: str, fontes: List[str]) -> dict:
+        linhas_map = []
+        anterior = [0, 0, 0]  # fonte, linha, coluna (relativos entre segmentos)
+        for segmentos in self.segmentos[:self._linhas_finais()]:
+            coluna_saida = 0
+            codificados = []
+            for col, fonte, linha_origem, col_origem in segmentos:
+                codificados.append(
+                    _vlq(col - coluna_saida) + _vlq(fonte - anterior[0])
+                    + _vlq(linha_origem - anterior[1]) + _vlq(col_origem - anterior[2])
+                )
+                coluna_saida = col
+                anterior = [fonte, linha_origem, col_origem]
+            linhas_map.append(','.join(codificados))
+        return {'version': 3, 'file': arquivo, 'sources': fontes, 'names': [], 'mappings': ';'.join(linhas_map)}
+
+
+# ===== MINIFICAÇÃO =====
+
+class _Leitor:
+    """Percorre o código fonte mantendo linha/coluna (base 0) da posição atual."""
+
+    def __init__(self, codigo: str):
+        self.codigo = codigo
+        self.i = 0
+        self.linha = 0
+        self.coluna = 0
+
+    def fim(self) -> bool:
+        return self.i >= len(self.codigo)
+
+    def ver(self, n: int = 0) -> str:
+        j = self.i + n
+        return self.codigo[j] if j < len(self.codigo) else ''
+
+    def avancar(self, n: int = 1) -> str:
+        trecho = self.codigo[self.i:self.i + n]
+        for c in trecho:
+            if c == '\n':
+                self.linha += 1
+                self.coluna = 0
+            else:
+                self.coluna += 1
+        self.i += n
+        return trecho
+
+    def ler_string(self) -> str:
+        aspas = self.ver()
+        inicio = self.i
+        self.avancar()
+        while not self.fim() and self.ver() != aspas:
+            self.avancar(2 if self.ver() == '\\' else 1)
+        self.avancar()
+        return self.codigo[inicio:self.i]
+
+    def pular_comentario_bloco(self) -> bool:
+        """Pula /* ... */; retorna True se o comentário continha quebra de linha."""
+        fim = self.codigo.find('*/', self.i + 2)
+        fim = len(self.codigo) if fim == -1 else fim + 2
+        tinha_quebra = '\n' in self.codigo[self.i:fim]
+        self.avancar(fim - self.i)
+        return tinha_quebra
+
+
+_CSS_SEM_ESPACO = set('{};,>')
+
+
+def minificar_css(codigo: str, fonte: int, saida: _Saida) -> None:
+    """Remove comentários e espaços redundantes; uma regra por linha de saída."""
+    leitor = _Leitor(codigo)
+    espaco = False
+    while not leitor.fim():
+        c = leitor.ver()
+        if c.isspace():
+            espaco = True
+            leitor.avancar()
+            continue
+        if c == '/' and leitor.ver(1) == '*':
+            leitor.pular_comentario_bloco()
+            espaco = True
+            continue
+        linha, coluna = leitor.linha, leitor.coluna
+        token = leitor.ler_string() if c in '"\'' else leitor.avancar()
+        anterior = saida.ultimo_char()
+        if espaco and anterior and anterior not in _CSS_SEM_ESPACO and anterior not in ':(' \
+                and token[0] not in _CSS_SEM_ESPACO and token[0] != ')':
+            saida.escrever(' ', fonte, linha, coluna)
+        espaco = False
+        if token == '}' and saida.ultimo_char() == ';':
+            saida.remover_ultimo_char()
+        saida.escrever(token, fonte, linha, coluna)
+        if token == '}':
+            saida.quebrar()
+    saida.quebrar()
+
+
+# Depois destes caracteres/palavras, "/" inicia uma regex e não uma divisão
+_JS_ANTES_DE_REGEX = set('(,=:[!&|?{};+-*%<>~^')
+_JS_PALAVRAS_ANTES_DE_REGEX = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+_JS_SEM_ESPACO = set('{}()[];,:=<>?&|!*%^~')
+# Pares que não podem ser colados sem mudar o significado
+_JS_PARES_SENSIVEIS = {'++', '--', '//', '/*', '<!'}
+
+
+def _eh_palavra(c: str) -> bool:
+    return c.isalnum() or c in '_$' or ord(c) > 127
+
+
+def _ler_template(leitor: _Leitor) -> str:
+    """Lê um template literal inteiro, inclusive expressões ${...} aninhadas."""
+    inicio = leitor.i
+    leitor.avancar()
+    while not leitor.fim():
+        c = leitor.ver()
+        if c == '\\':
+            leitor.avancar(2)
+        elif c == '`':
+            leitor.avancar()
+            break
+        elif c == '$' and leitor.ver(1) == '{':
+            leitor.avancar(2)
+            profundidade = 1
+            while not leitor.fim() and profundidade:
+                c = leitor.ver()
+                if c in '"\'':
+                    leitor.ler_string()
+                elif c == '`':
+                    _ler_template(leitor)
+                else:
+                    profundidade += {'{': 1, '}': -1}.get(c, 0)
+                    leitor.avancar()
+        else:
+            leitor.avancar()
+    return leitor.codigo[inicio:leitor.i]
+
+
+def _ler_regex(leitor: _Leitor) -> str:
+    inicio = leitor.i
+    leitor.avancar()
+    em_classe = False
+    while not leitor.fim() and leitor.ver() != '\n':
+        c = leitor.ver()
+        if c == '\\':
+            leitor.avancar(2)
+            continue
+        leitor.avancar()
+        if c == '[':
+            em_classe = True
+        elif c == ']':
+            em_classe = False
+        elif c == '/' and not em_classe:
+            break
+    while not leitor.fim() and _eh_palavra(leitor.ver()):
+        leitor.avancar()
+    return leitor.codigo[inicio:leitor.i]
+
+
+def minificar_js(codigo: str, fonte: int, saida: _Saida) -> None:
+    """Minificação conservadora: remove comentários e indentação/espaços extras.
+
+    As quebras de linha são mantidas (a inserção automática de ponto e
+    vírgula continua valendo) e strings, templates e regex saem intactos.
+    """
+    leitor = _Leitor(codigo)
+    espaco = False
+    ultimo = ''
+    while not leitor.fim():
+        c = leitor.ver()
+        if c == '\n':
+            saida.quebrar()
+            espaco = False
+            leitor.avancar()
+            continue
+        if c.isspace():
+            espaco = True
+            leitor.avancar()
+            continue
+        if c == '/' and leitor.ver(1) == '/':
+            while not leitor.fim() and leitor.ver() != '\n':
+                leitor.avancar()
+            continue
+        if c == '/' and leitor.ver(1) == '*':
+            if leitor.pular_comentario_bloco():
+                saida.quebrar()
+                espaco = False
+            else:
+                espaco = True
+            continue
+
+        linha, coluna = leitor.linha, leitor.coluna
+        if c in '"\'':
+            token = leitor.ler_string()
+        elif c == '`':
+            token = _ler_template(leitor)
+        elif c == '/' and (not ultimo or ultimo[-1] in _JS_ANTES_DE_REGEX
+                           or ultimo in _JS_PALAVRAS_ANTES_DE_REGEX):
+            token = _ler_regex(leitor)
+        elif _eh_palavra(c):
+            inicio = leitor.i
+            while not leitor.fim() and (_eh_palavra(leitor.ver()) or leitor.ver() == '.' and c.isdigit()):
+                leitor.avancar()
+            token = codigo[inicio:leitor.i]
+        else:
+            token = leitor.avancar()
+
+        anterior = saida.ultimo_char()
+        if espaco and anterior and (
+            (anterior not in _JS_SEM_ESPACO and token[0] not in _JS_SEM_ESPACO)
+            or anterior + token[0] in _JS_PARES_SENSIVEIS
+        ):
+            saida.escrever(' ', fonte, linha, coluna)
+        espaco = False
+        saida.escrever(token, fonte, linha, coluna)
+        ultimo = token
+    saida.quebrar()
+
+
+# ===== MONTAGEM =====
+
+def _sem_comentarios_css(codigo: str) -> str:
+    """Remove comentários mantendo as quebras de linha (e a numeração das linhas)."""
+    return _COMENTARIO_CSS_RE.sub(lambda m: '\n' * m.group(0).count('\n'), codigo)
+
+
+def _expandir_css(static_folder: str, relativo: str, visitados: Tuple[str, ...] = ()) -> List[str]:
+    """Lista de arquivos na ordem da cascata, com @import expandidos antes do arquivo."""
+    if relativo in visitados:
+        return []
+    with open(os.path.join(static_folder, relativo), encoding='utf-8') as f:
+        codigo = _sem_comentarios_css(f.read())
+    arquivos: List[str] = []
+    pasta = posixpath.dirname(relativo)
+    for alvo in _IMPORT_RE.findall(codigo):
+        if '://' in alvo or alvo.startswith('//'):
+            continue
+        arquivos += _expandir_css(static_folder, posixpath.normpath(posixpath.join(pasta, alvo)),
+                                  visitados + (relativo,))
+    return arquivos + [relativo]
+
+
+def _ultima_ocorrencia(arquivos: List[str]) -> List[str]:
+    vistos = set()
+    ordem = []
+    for arquivo in reversed(arquivos):
+        if arquivo not in vistos:
+            vistos.add(arquivo)
+            ordem.append(arquivo)
+    return list(reversed(ordem))
+
+
+def _reescrever_urls(codigo: str, origem: str, destino: str) -> str:
+    """Ajusta url() relativos ao mudar o CSS de pasta (mantém o número de linhas)."""
+    pasta_origem = posixpath.dirname(origem)
+
+    def _trocar(match):
+        aspas, url = match.group(1), match.group(2).strip()
+        if url.startswith(('data:', '/', '#')) or '://' in url:
+            return match.group(0)
+        absoluto = posixpath.normpath(posixpath.join(pasta_origem, url))
+        return f"url({aspas}{posixpath.relpath(absoluto, destino)}{aspas})"
+
+    return _URL_RE.sub(_trocar, codigo)
+
+
+def fontes_do_bundle(static_folder: str, nome: str, bundles: Dict[str, List[str]] = BUNDLES) -> List[str]:
+    arquivos = bundles[nome]
+    if nome.endswith('.css'):
+        arquivos = [a for arquivo in arquivos for a in _expandir_css(static_folder, arquivo)]
+    return _ultima_ocorrencia(arquivos)
+
+
+def montar_bundle(static_folder: str, nome: str, bundles: Dict[str, List[str]] = BUNDLES,
+                  pasta: str = PASTA_BUNDLES) -> Tuple[str, dict, List[str]]:
+    """Concatena e minifica um bundle. Retorna (código, source map, fontes)."""
+    fontes = fontes_do_bundle(static_folder, nome, bundles)
+    saida = _Saida()
+    for indice, relativo in enumerate(fontes):
+        with open(os.path.join(static_folder, relativo), encoding='utf-8') as f:
+            codigo = f.read()
+        if nome.endswith('.css'):
+            # @import viram linhas vazias: os arquivos já entraram na ordem certa
+            codigo = _IMPORT_RE.sub('', _sem_comentarios_css(codigo))
+            minificar_css(_reescrever_urls(codigo, relativo, pasta), indice, saida)
+        else:
+            minificar_js(codigo, indice, saida)
+            # Separador entre scripts concatenados (a ASI não vale entre arquivos)
+            saida.escrever(';', indice, codigo.count('\n'), 0)
+            saida.quebrar()
+    mapa_fontes = [posixpath.relpath(f, pasta) for f in fontes]
+    return saida.codigo(), saida.mapa(nome, mapa_fontes), fontes
+
+
+def construir_bundles(static_folder: str, bundles: Dict[str, List[str]] = BUNDLES,
+                      pasta: str = PASTA_BUNDLES, limpar: bool = False) -> Dict[str, dict]:
+    """Gera static/<pasta>/<nome>.<hash>.<ext> + .map e grava o manifesto dos bundles.
+
+    O hash é do conteúdo minificado, então o nome só muda quando o código
+    muda. As variantes .br/.gz são gravadas junto (services/compressao.py). Com `limpar=True`, apaga gerações anteriores; sem ele, os arquivos
+    antigos ficam para páginas ainda em cache durante um deploy.
+    """
+    destino = os.path.join(static_folder, pasta)
+    os.makedirs(destino, exist_ok=True)
+    manifesto: Dict[str, dict] = {}
+    for nome in bundles:
+        codigo, mapa, fontes = montar_bundle(static_folder, nome, bundles, pasta)
+        digest = hashlib.sha256(codigo.encode('utf-8')).hexdigest()[:HASH_BUNDLE_LEN]
+        base, ext = os.path.splitext(nome)
+        arquivo = f"{base}.{digest}{ext}"
+        mapa['file'] = arquivo
+        if ext == '.css':
+            codigo += f"/*# sourceMappingURL={arquivo}.map */\n"
+        else:
+            codigo += f"//# sourceMappingURL={arquivo}.map\n"
+        for caminho, conteudo in ((arquivo, codigo), (f"{arquivo}.map", json.dumps(mapa))):
+            final = os.path.join(destino, caminho)
+            with open(f"{final}.tmp", 'w', encoding='utf-8') as f:
+                f.write(conteudo)
+            os.replace(f"{final}.tmp", final)
+            comprimir_arquivo(final)
+        manifesto[nome] = {
+            'arquivo': f"{pasta}/{arquivo}",
+            'fontes': fontes,
+            # Conferidos na inicialização: fonte editada (ou @import novo) regera o bundle
+            'hashes_fontes': {f: hash_arquivo(os.path.join(static_folder, f)) for f in fontes},
+            'bytes': len(codigo.encode('utf-8')),
+            'bytes_fontes': sum(os.path.getsize(os.path.join(static_folder, f)) for f in fontes),
+        }
+
+    manifesto_path = os.path.join(destino, MANIFESTO_BUNDLES)
+    with open(f"{manifesto_path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, sort_keys=True)
+    os.replace(f"{manifesto_path}.tmp", manifesto_path)
+
+    if limpar:
+        atuais = {posixpath.basename(b['arquivo']) for b in manifesto.values()}
+        atuais |= {f"{a}.map" for a in atuais}
+        atuais |= {f"{a}{sufixo}" for a in atuais for sufixo in ('.gz', '.br')} | {MANIFESTO_BUNDLES}
+        for entry in os.scandir(destino):
+            if entry.is_file() and entry.name not in atuais:
+                os.remove(entry.path)
+    return manifesto
+
+
+class Bundles:
+    """Resolve nomes lógicos (ex.: 'dist/loja.css') para o arquivo com hash.
+
+    Lê static/dist/bundles.json e regera na inicialização se ele não existir
+    ou não bater com as fontes atuais (hash de cada arquivo); o resultado é
+    determinístico, então workers concorrentes gravam os mesmos arquivos. Com `recarregar=True` (modo debug), regera quando
+    alguma fonte muda.
+    """
+
+    def __init__(self, static_folder: str, bundles: Dict[str, List[str]] = BUNDLES, pasta: str = PASTA_BUNDLES):
+        self.static_folder = static_folder
+        self.bundles = bundles
+        self.pasta = pasta
+        self._lock = threading.Lock()
+        self._assinatura: Optional[Tuple[float, ...]] = None
+        self.manifesto: Dict[str, dict] = {}
+        try:
+            with open(os.path.join(static_folder, pasta, MANIFESTO_BUNDLES), encoding='utf-8') as f:
+                self.manifesto = json.load(f)
+        except (OSError, ValueError):
+            self.manifesto = {}
+        if not self._em_dia():
+            self.construir()
+
+    def _em_dia(self) -> bool:
+        """Manifesto com os mesmos bundles, fontes e hashes das fontes, e arquivos gerados no disco."""
+        if set(self.manifesto) != set(self.bundles):
+            return False
+        try:
+            for nome, bundle in self.manifesto.items():
+                hashes = bundle.get('hashes_fontes') or {}
+                fontes = fontes_do_bundle(self.static_folder, nome, self.bundles)
+                if bundle.get('fontes') != fontes or set(hashes) != set(fontes):
+                    return False
+                if not os.path.exists(os.path.join(self.static_folder, bundle['arquivo'])):
+                    return False
+                if any(hash_arquivo(os.path.join(self.static_folder, f)) != h for f, h in hashes.items()):
+                    return False
+        except (OSError, KeyError):
+            return False
+        return True
+
+    def _mtimes(self) -> Tuple[float, ...]:
+        fontes = {f for b in self.manifesto.values() for f in b.get('fontes', [])}
+        return tuple(
+            os.path.getmtime(os.path.join(self.static_folder, f)) if os.path.exists(os.path.join(self.static_folder, f)) else 0
+            for f in sorted(fontes)
+        )
+
+    def construir(self) -> Dict[str, dict]:
+        with self._lock:
+            self.manifesto = construir_bundles(self.static_folder, self.bundles, self.pasta)
+            self._assinatura = self._mtimes()
+        return self.manifesto
+
+    def resolver(self, filename: str, recarregar: bool = False) -> Optional[str]:
+        """Caminho (relativo a static/) do bundle com hash, ou None se não for um bundle."""
+        prefixo = f"{self.pasta}/"
+        if not filename.startswith(prefixo):
+            return None
+        nome = filename[len(prefixo):]
+        if nome not in self.bundles:
+            return None
+        if recarregar:
+            if self._assinatura is None or self._assinatura != self._mtimes():
+                self.construir()
+        bundle = self.manifesto.get(nome)
+        return bundle['arquivo'] if bundle else None
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from functools import wraps
+from typing import Optional
+
+from flask import current_app, g, make_response, request, session
+from sqlalchemy import text
+
+from models import db
+from services.imagens import uploads_pendentes
+
+# Uma consulta só para a versão do catálogo + configurações. COUNT pega
+# exclusões; MAX(data_atualizacao) pega inclusões e edições.
+_SQL_VERSAO_CATALOGO = text(
+    "SELECT "
+    "(SELECT COUNT(*) FROM doces), "
+    "(SELECT MAX(COALESCE(data_atualizacao, data_criacao)) FROM doces), "
+    "(SELECT COUNT(*) FROM kit_itens), "
+    "(SELECT COUNT(*) FROM configuracoes), "
+    "(SELECT MAX(data_atualizacao) FROM configuracoes)"
+)
+
+CACHE_CONTROL_REVALIDAR = 'private, no-cache'
+
+
+def versao_catalogo() -> str:
+    """Assinatura do estado de produtos, kits e configurações."""
+    linha = db.session.execute(_SQL_VERSAO_CATALOGO).first()
+    return '|'.join(str(valor) for valor in linha)
+
+
+def _estado_usuario() -> str:
+    """Parte da sessão que aparece no HTML (login, carrinho, token CSRF)."""
+    estado = [
+        str(session.get('user_id') or ''),
+        str(session.get('admin_id') or ''),
+        repr(sorted((k, v.get('quantidade')) for k, v in session.get('cart', {}).items())),
+        str(session.get('csrf_token') or ''),
+    ]
+    # O token CSRF do formulário é assinado com horário: renova a página na
+    # metade do prazo para o 304 nunca reaproveitar um token prestes a expirar
+    limite = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if limite:
+        estado.append(str(int(time.time() // max(1, limite // 2))))
+    return '|'.join(estado)
+
+
+def calcular_etag(publica: bool = False) -> str:
+    # Calculado de novo depois da view (ver pagina_cacheavel): a versão do catálogo não muda no meio do GET
+    if 'versao_catalogo' not in g:
+        g.versao_catalogo = versao_catalogo()
+    partes = [
+        request.full_path,
+        g.versao_catalogo,
+        current_app.config.get('ASSET_VERSION', ''),
+        current_app.config.get('TEMPLATES_VERSION', ''),
+        # Imagem em processamento aparece como placeholder; ao ficar pronta, o ETag muda
+        uploads_pendentes(),
+    ]
+    if not publica:
+        partes.append(_estado_usuario())
+    return hashlib.sha256('\n'.join(partes).encode('utf-8')).hexdigest()[:32]
+
+
+def pagina_cacheavel(publica: bool = False, cache_control: Optional[str] = None):
+    """Decorator de GET condicional (ETag/304) para páginas que mudam só com o catálogo.
+
+    O ETag é calculado antes da view (versão do catálogo/configurações, do
+    deploy, uploads de imagem ainda em processamento e, se a página não for
+    `publica`, do estado do usuário); se bater
+    com If-None-Match, responde 304 sem renderizar o template. Quando a
+    página é renderizada, o ETag enviado é recalculado depois da view, que
+    pode ter criado o token CSRF na sessão. Páginas com mensagens flash
+    pendentes são sempre renderizadas e não ganham ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or (not publica and session.get('_flashes')):
+                return view(*args, **kwargs)
+
+            etag = calcular_etag(publica)
+            controle = cache_control or ('public, no-cache' if publica else CACHE_CONTROL_REVALIDAR)
+            # Comparação fraca: a compressão dinâmica marca o ETag como W/
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if not publica:
+                    # Primeira visita: o token CSRF nasce no render; o ETag usa a sessão final
+                    etag = calcular_etag(publica)
+            g.cache_http = True
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = controle
+            if not publica:
+                response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
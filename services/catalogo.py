@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from models import Doce
+
+CURSOR_FORMAT = "%Y%m%d%H%M%S%f"
+# Produtos sem data_criacao: no MySQL/SQLite o NULL vem por último em DESC
+CURSOR_NULO = "nulo"
+
+# Filtros aceitos via query string (valores vazios = sem filtro)
+STATUS_FILTROS = {"ativo", "inativo"}
+CATEGORIA_FILTROS = {"tradicional", "personalizado"}
+TIPO_FILTROS = {"kit", "avulso"}
+ESTOQUE_FILTROS = {"disponivel", "baixo", "esgotado", "ilimitado"}
+
+ESTOQUE_BAIXO_LIMITE = 5
+
+
+def encode_cursor(doce: Doce) -> str:
+    """Gera o cursor (data_criacao, id) do último item de uma página."""
+    data = doce.data_criacao.strftime(CURSOR_FORMAT) if doce.data_criacao else CURSOR_NULO
+    return f"{data}-{doce.id}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Optional[datetime], int]]:
+    """Interpreta um cursor; retorna None quando ausente ou inválido.
+
+    A data vem como None quando o último item visto não tinha data_criacao.
+    """
+    if not cursor:
+        return None
+    try:
+        data_str, id_str = cursor.split("-", 1)
+        data = None if data_str == CURSOR_NULO else datetime.strptime(data_str, CURSOR_FORMAT)
+        return data, int(id_str)
+    except (ValueError, TypeError):
+        return None
+
+
+def filtros_da_requisicao(args) -> dict:
+    """Extrai e valida os filtros de produtos de request.args."""
+    def _valor(nome, permitidos):
+        valor = (args.get(nome) or "").strip().lower()
+        return valor if valor in permitidos else ""
+
+    return {
+        "status": _valor("status", STATUS_FILTROS),
+        "categoria": _valor("categoria", CATEGORIA_FILTROS),
+        "tipo": _valor("tipo", TIPO_FILTROS),
+        "estoque": _valor("estoque", ESTOQUE_FILTROS),
+    }
+
+
+def aplicar_filtros_doces(query, filtros: dict):
+    """Aplica no banco os filtros de status, categoria, kit/avulso e estoque."""
+    status = filtros.get("status")
+    if status == "ativo":
+        query = query.filter(Doce.ativo == True)
+    elif status == "inativo":
+        query = query.filter(Doce.ativo == False)
+
+    if filtros.get("categoria"):
+        query = query.filter(Doce.categoria == filtros["categoria"])
+
+    tipo = filtros.get("tipo")
+    if tipo == "kit":
+        query = query.filter(Doce.unidade_venda == "kit")
+    elif tipo == "avulso":
+        query = query.filter(or_(Doce.unidade_venda != "kit", Doce.unidade_venda.is_(None)))
+
+    estoque = filtros.get("estoque")
+    if estoque == "disponivel":
+        query = query.filter(or_(Doce.estoque_disponivel.is_(None), Doce.estoque_disponivel > 0))
+    elif estoque == "baixo":
+        query = query.filter(Doce.estoque_disponivel > 0, Doce.estoque_disponivel <= ESTOQUE_BAIXO_LIMITE)
+    elif estoque == "esgotado":
+        query = query.filter(Doce.estoque_disponivel <= 0)
+    elif estoque == "ilimitado":
+        query = query.filter(Doce.estoque_disponivel.is_(None))
+
+    return query
+
+
+def paginar_doces(query, cursor: Optional[str], por_pagina: int) -> Tuple[List[Doce], Optional[str]]:
+    """Paginação por keyset em (data_criacao DESC, id DESC).
+
+    Em vez de OFFSET, filtra a partir do último item visto; o custo de cada
+    página não cresce com o tamanho do catálogo. Retorna (itens, proximo_cursor).
+    """
+    posicao = decode_cursor(cursor)
+    if posicao:
+        data_cursor, id_cursor = posicao
+        if data_cursor is None:
+            # Já no trecho final, dos produtos sem data: só o id desempata
+            query = query.filter(Doce.data_criacao.is_(None), Doce.id < id_cursor)
+        else:
+            query = query.filter(or_(
+                Doce.data_criacao < data_cursor,
+                and_(Doce.data_criacao == data_cursor, Doce.id < id_cursor),
+                Doce.data_criacao.is_(None),
+            ))
+
+    itens = (
+        query.order_by(Doce.data_criacao.desc(), Doce.id.desc())
+        .limit(por_pagina + 1)
+        .all()
+    )
+    proximo_cursor = None
+    if len(itens) > por_pagina:
+        itens = itens[:por_pagina]
+        proximo_cursor = encode_cursor(itens[-1])
+    return itens, proximo_cursor
+
+
+def cursor_anterior(query, cursor: Optional[str], por_pagina: int) -> Optional[str]:
+    """Cursor da página anterior à que começa depois de `cursor` (None = primeira página).
+
+    Lê para trás, a partir do próprio item do cursor (o último da página
+    anterior), até um item além do tamanho da página: esse item é o cursor.
+    """
+    posicao = decode_cursor(cursor)
+    if not posicao:
+        return None
+    data_cursor, id_cursor = posicao
+    if data_cursor is None:
+        query = query.filter(or_(
+            Doce.data_criacao.isnot(None),
+            and_(Doce.data_criacao.is_(None), Doce.id >= id_cursor),
+        ))
+    else:
+        query = query.filter(or_(
+            Doce.data_criacao > data_cursor,
+            and_(Doce.data_criacao == data_cursor, Doce.id >= id_cursor),
+        ))
+
+    # Ordem inversa da listagem (no ASC o NULL vem primeiro no MySQL/SQLite)
+    itens = (
+        query.order_by(Doce.data_criacao.asc(), Doce.id.asc())
+        .limit(por_pagina + 1)
+        .all()
+    )
+    return encode_cursor(itens[por_pagina]) if len(itens) > por_pagina else None
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import os
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Brotli é opcional: sem ele, apenas .gz
+    brotli = None
+
+# Tipos de texto que valem a pena comprimir (imagens raster já são comprimidas)
+EXTENSOES_COMPRIMIVEIS = (
+    '.css', '.js', '.map', '.svg', '.json', '.webmanifest', '.xml', '.txt', '.html', '.ico',
+)
+# Não grava a variante se ela não economizar pelo menos isso
+GANHO_MINIMO = 0.05
+TAMANHO_MINIMO = 256
+
+# (sufixo, Content-Encoding), em ordem de preferência
+VARIANTES = (('.br', 'br'), ('.gz', 'gzip'))
+
+
+def comprimivel(path: str) -> bool:
+    return path.lower().endswith(EXTENSOES_COMPRIMIVEIS)
+
+
+def comprimir_bytes(conteudo: bytes, codificacao: str) -> bytes:
+    if codificacao == 'br':
+        return brotli.compress(conteudo, quality=11)
+    # mtime=0: saída determinística (mesmo arquivo → mesmos bytes e ETag)
+    return gzip.compress(conteudo, compresslevel=9, mtime=0)
+
+
+def _gravar_variante(path: str, sufixo: str, codificacao: str, conteudo: bytes) -> Tuple[bool, int]:
+    """Grava <path><sufixo> se compensar; remove variante antiga que não compense."""
+    destino = f"{path}{sufixo}"
+    comprimido = comprimir_bytes(conteudo, codificacao)
+    if len(comprimido) > len(conteudo) * (1 - GANHO_MINIMO):
+        if os.path.exists(destino):
+            os.remove(destino)
+        return False, 0
+    with open(f"{destino}.tmp", 'wb') as f:
+        f.write(comprimido)
+    os.replace(f"{destino}.tmp", destino)
+    return True, len(conteudo) - len(comprimido)
+
+
+def comprimir_arquivo(path: str, forcar: bool = False) -> Dict[str, int]:
+    """Gera as variantes .br/.gz de um arquivo; pula as que já estão em dia.
+
+    Retorna {codificacao: bytes economizados} das variantes gravadas.
+    """
+    resultado: Dict[str, int] = {}
+    if not comprimivel(path) or os.path.getsize(path) < TAMANHO_MINIMO:
+        return resultado
+    mtime = os.path.getmtime(path)
+    conteudo = None
+    for sufixo, codificacao in VARIANTES:
+        if codificacao == 'br' and brotli is None:
+            continue
+        variante = f"{path}{sufixo}"
+        if not forcar and os.path.exists(variante) and os.path.getmtime(variante) >= mtime:
+            continue
+        if conteudo is None:
+            with open(path, 'rb') as f:
+                conteudo = f.read()
+        gravou, economia = _gravar_variante(path, sufixo, codificacao, conteudo)
+        if gravou:
+            resultado[codificacao] = economia
+    return resultado
+
+
+def comprimir_pasta(pasta: str, ignoradas: Iterable[str] = (), forcar: bool = False) -> Dict[str, int]:
+    """Gera variantes para todos os arquivos comprimíveis de uma pasta (recursivo)."""
+    ignoradas = {os.path.normpath(os.path.join(pasta, p)) for p in ignoradas}
+    resumo = {'arquivos': 0, 'variantes': 0, 'bytes_economizados': 0}
+    for raiz, pastas, arquivos in os.walk(pasta):
+        pastas[:] = [p for p in pastas if os.path.normpath(os.path.join(raiz, p)) not in ignoradas]
+        for nome in arquivos:
+            path = os.path.join(raiz, nome)
+            if not comprimivel(path):
+                continue
+            resumo['arquivos'] += 1
+            variantes = comprimir_arquivo(path, forcar)
+            resumo['variantes'] += len(variantes)
+            resumo['bytes_economizados'] += sum(variantes.values())
+    return resumo
+
+
+def escolher_variante(path: str, accept_encodings) -> Optional[Tuple[str, str]]:
+    """Variante pré-comprimida aceita pelo cliente: (caminho, Content-Encoding) ou None.
+
+    `accept_encodings` é o request.accept_encodings do Werkzeug. Só usa a
+    variante se ela for mais nova que o original (nunca serve conteúdo velho).
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    for sufixo, codificacao in VARIANTES:
+        if not accept_encodings[codificacao]:
+            continue
+        variante = f"{path}{sufixo}"
+        try:
+            if os.path.getmtime(variante) >= mtime:
+                return variante, codificacao
+        except OSError:
+            continue
+    return None
+
+
+def tipo_mime(path: str) -> Optional[str]:
+    return mimetypes.guess_type(path)[0]
+
+
+# ===== COMPRESSÃO DINÂMICA (respostas geradas pela aplicação) =====
+
+TIPOS_DINAMICOS = (
+    'text/html', 'text/plain', 'text/xml', 'text/css', 'text/javascript',
+    'application/json', 'application/xml', 'application/javascript', 'image/svg+xml',
+)
+NIVEL_GZIP_DINAMICO = 6
+# Brotli 11 é caro demais por requisição; 4 comprime melhor que gzip 6 gastando menos CPU
+NIVEL_BR_DINAMICO = 4
+TAMANHO_MINIMO_DINAMICO = 500
+
+
+def escolher_codificacao(accept_encodings) -> Optional[str]:
+    """Melhor codificação aceita pelo cliente ('br', 'gzip') ou None."""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compressor(codificacao: str, nivel: int):
+    """Objeto com .comprimir(bytes) e .finalizar() para respostas em streaming."""
+    if codificacao == 'br':
+        comp = brotli.Compressor(quality=nivel)
+
+        class _Br:
+            def comprimir(self, dados):
+                return comp.process(dados) + comp.flush()
+
+            def finalizar(self):
+                return comp.finish()
+        return _Br()
+
+    comp = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # 31 = formato gzip
+
+    class _Gzip:
+        def comprimir(self, dados):
+            return comp.compress(dados) + comp.flush(zlib.Z_SYNC_FLUSH)
+
+        def finalizar(self):
+            return comp.flush()
+    return _Gzip()
+
+
+def _comprimir_stream(iteravel, codificacao: str, nivel: int):
+    compressor = _compressor(codificacao, nivel)
+    try:
+        for pedaco in iteravel:
+            if isinstance(pedaco, str):
+                pedaco = pedaco.encode('utf-8')
+            if pedaco:
+                # Flush a cada pedaço: o cliente recebe o conteúdo assim que é gerado
+                yield compressor.comprimir(pedaco)
+        yield compressor.finalizar()
+    finally:
+        if hasattr(iteravel, 'close'):
+            iteravel.close()
+
+
+def comprimir_resposta(response, request, config):
+    """Comprime HTML/JSON/XML gerados pela aplicação conforme Accept-Encoding.
+
+    Pula respostas já codificadas, arquivos enviados por send_file (os
+    estáticos têm variantes pré-comprimidas), tipos fora da lista, corpos
+    menores que COMPRESS_MIN_SIZE e Cache-Control: no-transform. Respostas
+    em streaming são comprimidas pedaço a pedaço. O ETag vira fraco, pois
+    a representação muda mas o conteúdo é o mesmo.
+    """
+    if not config.get('COMPRESS_ENABLED', True):
+        return response
+    if response.mimetype not in TIPOS_DINAMICOS:
+        return response
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers or response.direct_passthrough
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    codificacao = escolher_codificacao(request.accept_encodings)
+    if codificacao is None or request.method == 'HEAD':
+        return response
+    nivel = config.get('COMPRESS_LEVEL_BR', NIVEL_BR_DINAMICO) if codificacao == 'br' \
+        else config.get('COMPRESS_LEVEL_GZIP', NIVEL_GZIP_DINAMICO)
+
+    if response.is_streamed:
+        response.response = _comprimir_stream(response.response, codificacao, nivel)
+        response.headers.pop('Content-Length', None)
+    else:
+        dados = response.get_data()
+        if len(dados) < config.get('COMPRESS_MIN_SIZE', TAMANHO_MINIMO_DINAMICO):
+            return response
+        if codificacao == 'br':
+            comprimido = brotli.compress(dados, quality=nivel)
+        else:
+            comprimido = gzip.compress(dados, compresslevel=nivel, mtime=0)
+        response.set_data(comprimido)
+
+    response.headers['Content-Encoding'] = codificacao
+    etag, fraco = response.get_etag()
+    if etag and not fraco:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+
+from flask import g, has_request_context, request
+from sqlalchemy.engine import Engine
+
+from services.logs import FormatadorJson, handler_em_fila, obter_logger
+from services.perfil_sql import assinar, formato_consulta
+
+log = obter_logger('sql')
+# Registros completos (parâmetros, plano) vão só para o arquivo rotativo
+log_arquivo = obter_logger('sql.lentas')
+
+LIMITE_MS = 200
+TAMANHO_ARQUIVO = 5 * 1024 * 1024
+ARQUIVOS_ANTIGOS = 5
+# Mesmo SQL só ganha um novo EXPLAIN depois desse intervalo
+INTERVALO_EXPLAIN = 600
+_MAX_PLANOS_EM_CACHE = 500
+_MAX_PARAMETROS = 500
+
+_PREFIXO_EXPLAIN = {'mysql': 'EXPLAIN ', 'mariadb': 'EXPLAIN ', 'sqlite': 'EXPLAIN QUERY PLAN '}
+
+_config: Dict[str, object] = {}
+_explicadas: 'OrderedDict[str, float]' = OrderedDict()
+_lock = threading.Lock()
+_instalado = False
+
+
+def _reservar_explain(dialeto: str, statement: str) -> bool:
+    """True se a consulta deve ganhar um EXPLAIN agora (SELECT, dialeto conhecido, fora do intervalo)."""
+    if dialeto not in _PREFIXO_EXPLAIN or not statement.lstrip().upper().startswith('SELECT'):
+        return False
+    agora = time.monotonic()
+    with _lock:
+        if agora - _explicadas.get(statement, -INTERVALO_EXPLAIN) < INTERVALO_EXPLAIN:
+            return False
+        _explicadas[statement] = agora
+        _explicadas.move_to_end(statement)
+        while len(_explicadas) > _MAX_PLANOS_EM_CACHE:
+            _explicadas.popitem(last=False)
+    return True
+
+
+def _capturar_explain(engine: Engine, statement: str, parameters) -> List[list]:
+    """Plano da consulta numa conexão própria, pelo cursor DBAPI (sem disparar os eventos do SQLAlchemy)."""
+    try:
+        with engine.connect() as conexao:
+            cursor = conexao.connection.cursor()
+            try:
+                cursor.execute(_PREFIXO_EXPLAIN[engine.dialect.name] + statement, parameters)
+                return [list(linha) for linha in cursor.fetchall()]
+            finally:
+                cursor.close()
+    except Exception as e:
+        return [[f"EXPLAIN falhou: {e}"]]
+
+
+def _explicar_e_gravar(pendentes: list) -> None:
+    for engine, statement, parameters, registro in pendentes:
+        registro['plano'] = _capturar_explain(engine, statement, parameters)
+        log_arquivo.warning("consulta lenta", extra=registro)
+
+
+def _explicar_em_thread(pendentes: list) -> None:
+    threading.Thread(target=_explicar_e_gravar, args=(pendentes,), name='consultas-lentas-explain',
+                     daemon=True).start()
+
+
+def _consulta_executada(conn, statement, parameters, duracao, executemany):
+    """Assinante de services.perfil_sql: registra as consultas acima do limite."""
+    ms = duracao * 1000
+    if ms < _config.get('limite_ms', LIMITE_MS):
+        return
+
+    origem = {'endpoint': None, 'metodo': None, 'path': None}
+    if has_request_context():
+        origem = {'endpoint': request.endpoint, 'metodo': request.method, 'path': request.path}
+    log.warning("Consulta lenta (%.0f ms) em %s: %s", ms, origem['endpoint'] or 'fora de requisição',
+                formato_consulta(statement)[:160])
+    registro = {
+        'ms': round(ms, 1),
+        'sql': formato_consulta(statement),
+        'parametros': repr(parameters)[:_MAX_PARAMETROS],
+        'versao': _config.get('versao'),
+        'plano': None,
+        **origem,
+    }
+    if not (_config.get('explain') and not executemany and _reservar_explain(conn.dialect.name, statement)):
+        log_arquivo.warning("consulta lenta", extra=registro)
+        return
+
+    # O EXPLAIN não roda aqui, no meio da requisição e na conexão dela: fica para
+    # depois da resposta enviada (ou para uma thread, fora de requisição)
+    pendente = (conn.engine, statement, parameters, registro)
+    if has_request_context():
+        g.setdefault('consultas_lentas_explain', []).append(pendente)
+    else:
+        _explicar_em_thread([pendente])
+
+
+def registrar(app) -> None:
+    """Grava em arquivo rotativo (JSON por linha) as consultas acima de SQL_LENTA_MS.
+
+    Cada registro leva o SQL, os parâmetros, a rota que o disparou, a versão
+    do deploy (ASSET_VERSION) e, com SQL_LENTA_EXPLAIN, o plano de execução
+    (MySQL/SQLite), capturado no máximo uma vez a cada 10 min por consulta,
+    numa conexão separada e depois que a resposta foi enviada.
+    """
+    app.config.setdefault('SQL_LENTA_MS', float(os.getenv('SQL_LENTA_MS', LIMITE_MS)))
+    app.config.setdefault('SQL_LENTA_EXPLAIN', os.getenv('SQL_LENTA_EXPLAIN', '1') != '0')
+    app.config.setdefault('SQL_LENTA_ARQUIVO', os.getenv(
+        'SQL_LENTA_ARQUIVO', os.path.join(app.instance_path, 'logs', 'consultas_lentas.log')
+    ))
+    if not app.config['SQL_LENTA_MS']:
+        return
+
+    _config.update(
+        limite_ms=app.config['SQL_LENTA_MS'],
+        explain=app.config['SQL_LENTA_EXPLAIN'],
+        versao=app.config.get('ASSET_VERSION'),
+    )
+
+    @app.after_request
+    def agendar_explain(response):
+        pendentes = g.pop('consultas_lentas_explain', None)
+        if pendentes:
+            response.call_on_close(lambda: _explicar_e_gravar(pendentes))
+        return response
+
+    @app.teardown_request
+    def explain_sem_resposta(_erro=None):
+        # Requisição que terminou em exceção não passou pelo after_request
+        pendentes = g.pop('consultas_lentas_explain', None)
+        if pendentes:
+            _explicar_em_thread(pendentes)
+
+    global _instalado
+    if _instalado:
+        return
+    try:
+        os.makedirs(os.path.dirname(app.config['SQL_LENTA_ARQUIVO']), exist_ok=True)
+        arquivo = logging.handlers.RotatingFileHandler(
+            app.config['SQL_LENTA_ARQUIVO'], maxBytes=TAMANHO_ARQUIVO,
+            backupCount=ARQUIVOS_ANTIGOS, encoding='utf-8', delay=True,
+        )
+    except OSError as e:
+        log.warning("Log de consultas lentas desativado: %s", e)
+        return
+    arquivo.setFormatter(FormatadorJson())
+    log_arquivo.addHandler(handler_em_fila(arquivo))
+    log_arquivo.propagate = False
+    assinar(_consulta_executada)
+    _instalado = True
+
+
+def resumir(caminho: str, versao: Optional[str] = None) -> List[dict]:
+    """Agrupa o arquivo (e os rotacionados) por SQL: ocorrências, mediana e máximo em ms."""
+    grupos: Dict[str, dict] = defaultdict(lambda: {'tempos': [], 'endpoints': set(), 'plano': None})
+    arquivos = [f"{caminho}.{n}" for n in range(ARQUIVOS_ANTIGOS, 0, -1)] + [caminho]
+    for arquivo in arquivos:
+        if not os.path.exists(arquivo):
+            continue
+        with open(arquivo, encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    continue
+                if versao and registro.get('versao') != versao:
+                    continue
+                grupo = grupos[registro.get('sql', '')]
+                grupo['tempos'].append(registro.get('ms', 0))
+                if registro.get('endpoint'):
+                    grupo['endpoints'].add(registro['endpoint'])
+                grupo['plano'] = registro.get('plano') or grupo['plano']
+    resumo = [
+        {
+            'sql': sql,
+            'vezes': len(g['tempos']),
+            'mediana_ms': statistics.median(g['tempos']),
+            'max_ms': max(g['tempos']),
+            'endpoints': sorted(g['endpoints']),
+            'plano': g['plano'],
+        }
+        for sql, g in grupos.items()
+    ]
+    resumo.sort(key=lambda r: r['vezes'] * r['mediana_ms'], reverse=True)
+    return resumo
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, Engine
+from werkzeug.security import generate_password_hash
+
+from models import STATUS_PEDIDO, Doce, ItemPedido, KitItem, Pedido, Usuario
+
+# Volumes de um banco "grande" para testes de desempenho
+VOLUMES_PADRAO = {'produtos': 10_000, 'usuarios': 100_000, 'pedidos': 1_000_000}
+LOTE = 5_000
+
+FRACAO_KITS = 0.05
+FRACAO_REMOVIDOS = 0.03
+ITENS_POR_PEDIDO = (1, 5)
+# Pedidos mais novos que isso ainda podem estar em andamento
+DIAS_EM_ANDAMENTO = 30
+
+SENHA_PADRAO = 'sintetico123'
+DOMINIO_EMAIL = 'sintetico.local'
+
+_TIPOS = ('Brigadeiro', 'Beijinho', 'Bem-casado', 'Trufa', 'Pão de mel', 'Cajuzinho', 'Bombom', 'Camafeu')
+_ADJETIVOS = ('gourmet', 'tradicional', 'belga', 'de festa', 'recheado', 'premium', 'artesanal', 'zero açúcar')
+_SABORES = ('Chocolate', 'Chocolate Branco', 'Morango', 'Coco', 'Ninho', 'Pistache', 'Limão', 'Maracujá', 'Nozes')
+_UNIDADES = ('unidade', 'unidade', 'unidade', 'cento', 'caixa')
+_CIDADES = (('São Paulo', 'SP'), ('Campinas', 'SP'), ('Rio de Janeiro', 'RJ'), ('Belo Horizonte', 'MG'),
+            ('Curitiba', 'PR'), ('Porto Alegre', 'RS'), ('Salvador', 'BA'), ('Recife', 'PE'))
+
+
+def _lotes(linhas: Iterable[dict], tamanho: int) -> Iterator[List[dict]]:
+    lote: List[dict] = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _proximo_id(conexao: Connection, modelo) -> int:
+    return (conexao.execute(select(func.max(modelo.id))).scalar() or 0) + 1
+
+
+@contextmanager
+def _carga_rapida(conexao: Connection):
+    """Afrouxa durabilidade/checagens só nesta conexão enquanto a carga roda."""
+    dialeto = conexao.dialect.name
+    if dialeto == 'sqlite':
+        conexao.exec_driver_sql('PRAGMA synchronous = OFF')
+    elif dialeto in ('mysql', 'mariadb'):
+        conexao.exec_driver_sql('SET SESSION unique_checks = 0, foreign_key_checks = 0')
+    try:
+        yield
+    finally:
+        if dialeto == 'sqlite':
+            conexao.exec_driver_sql('PRAGMA synchronous = FULL')
+        elif dialeto in ('mysql', 'mariadb'):
+            conexao.exec_driver_sql('SET SESSION unique_checks = 1, foreign_key_checks = 1')
+
+
+def _inserir(conexao: Connection, tabela, linhas: Iterable[dict], lote: int,
+             aviso: Callable[[str], None], total: int) -> int:
+    """INSERT em lotes (executemany), um commit por lote."""
+    inseridas = 0
+    proximo_aviso = max(total // 10, lote)
+    for bloco in _lotes(linhas, lote):
+        conexao.execute(tabela.insert(), bloco)
+        conexao.commit()
+        inseridas += len(bloco)
+        if inseridas >= proximo_aviso:
+            aviso(f"{tabela.name}: {inseridas:,}/{total:,}")
+            proximo_aviso += max(total // 10, lote)
+    return inseridas
+
+
+def gerar(engine: Engine, produtos: int, usuarios: int, pedidos: int, semente: int = 42,
+          anos: int = 3, lote: int = LOTE, senha: str = SENHA_PADRAO,
+          aviso: Callable[[str], None] = print) -> Dict[str, int]:
+    """Insere produtos (com sabores e kits), usuários e pedidos com itens em volume.
+
+    Mesma `semente` e mesmo banco de partida geram os mesmos dados (as datas
+    são relativas ao momento da carga). Os ids
+    são atribuídos aqui (a partir do maior existente), então os itens são
+    gerados junto com os pedidos sem reler o banco; tudo vai em INSERTs de
+    `lote` linhas. Os pedidos se espalham pelos últimos `anos`, em ordem
+    crescente de data, com uma fração marcada como removida (lixeira).
+    """
+    rng = random.Random(semente)
+    agora = datetime.utcnow().replace(microsecond=0)
+    inicio = agora - timedelta(days=365 * anos)
+    contagem: Dict[str, int] = {}
+
+    with engine.connect() as conexao, _carga_rapida(conexao):
+        # --- Produtos e kits ------------------------------------------------
+        primeiro_doce = _proximo_id(conexao, Doce)
+        quantidade_kits = int(produtos * FRACAO_KITS)
+        catalogo = []  # (id, preço, sabores) para montar os itens dos pedidos
+
+        def linhas_doces():
+            for n in range(produtos):
+                doce_id = primeiro_doce + n
+                kit = n >= produtos - quantidade_kits
+                sabores = None if kit or rng.random() < 0.6 else ', '.join(rng.sample(_SABORES, rng.randint(2, 5)))
+                preco = round(rng.uniform(40, 180) if kit else rng.uniform(1.5, 12), 2)
+                criado = inicio + timedelta(seconds=rng.randrange(int((agora - inicio).total_seconds())))
+                catalogo.append((doce_id, preco, sabores.split(', ') if sabores else None))
+                yield {
+                    'id': doce_id,
+                    'nome': f"{'Kit ' if kit else ''}{rng.choice(_TIPOS)} {rng.choice(_ADJETIVOS)} {doce_id}",
+                    'descricao': f"{rng.choice(_TIPOS)} {rng.choice(_ADJETIVOS)} feito artesanalmente. " * 3,
+                    'preco': preco,
+                    'imagem_url': None,
+                    'ativo': rng.random() < 0.92,
+                    'data_criacao': criado,
+                    'data_atualizacao': criado,
+                    'sabores': sabores,
+                    'quantidade_minima': 1 if kit else rng.choice((1, 1, 10, 25, 50)),
+                    'unidade_venda': 'kit' if kit else rng.choice(_UNIDADES),
+                    'estoque_disponivel': rng.randint(0, 500) if rng.random() < 0.3 else None,
+                    'destaque': rng.random() < 0.03,
+                    'mais_pedido': rng.random() < 0.02,
+                    'categoria': 'personalizado' if kit or rng.random() < 0.3 else 'tradicional',
+                    'desconto_percentual': round(rng.uniform(5, 20), 2) if kit else None,
+                }
+
+        contagem['doces'] = _inserir(conexao, Doce.__table__, linhas_doces(), lote, aviso, produtos)
+
+        avulsos = catalogo[:produtos - quantidade_kits]
+
+        def linhas_kits():
+            for kit_id, _, _ in catalogo[produtos - quantidade_kits:]:
+                for produto_id, _, _ in rng.sample(avulsos, min(len(avulsos), rng.randint(2, 4))):
+                    yield {'kit_id': kit_id, 'produto_id': produto_id, 'quantidade': rng.choice((6, 12, 25, 50))}
+
+        if avulsos:
+            contagem['kit_itens'] = _inserir(conexao, KitItem.__table__, linhas_kits(), lote, aviso,
+                                             quantidade_kits * 3)
+
+        # --- Usuários ---------------------------------------------------------
+        primeiro_usuario = _proximo_id(conexao, Usuario)
+        # Um hash só: gerar 100k hashes levaria mais que a carga inteira
+        senha_hash = generate_password_hash(senha)
+
+        def linhas_usuarios():
+            for n in range(usuarios):
+                usuario_id = primeiro_usuario + n
+                cidade, estado = rng.choice(_CIDADES)
+                yield {
+                    'id': usuario_id,
+                    'nome': f"Cliente Sintético {usuario_id}",
+                    'email': f"cliente{usuario_id}@{DOMINIO_EMAIL}",
+                    'senha_hash': senha_hash,
+                    'telefone': f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                    'cep': f"{rng.randint(10000, 99999)}-{rng.randint(100, 999)}",
+                    'logradouro': f"Rua {rng.choice(_SABORES)}",
+                    'numero_endereco': str(rng.randint(1, 2000)),
+                    'bairro': 'Centro',
+                    'cidade': cidade,
+                    'estado': estado,
+                    'ativo': rng.random() < 0.98,
+                    'data_criacao': inicio + timedelta(seconds=rng.randrange(int((agora - inicio).total_seconds()))),
+                    'provider': 'local',
+                }
+
+        contagem['usuarios'] = _inserir(conexao, Usuario.__table__, linhas_usuarios(), lote, aviso, usuarios)
+
+        # --- Pedidos e itens (gerados juntos, inseridos lote a lote) --------------
+        if pedidos and usuarios and avulsos:
+            primeiro_pedido = _proximo_id(conexao, Pedido)
+            proximo_item = _proximo_id(conexao, ItemPedido)
+            intervalo = (agora - inicio).total_seconds() / pedidos
+            contagem['pedidos'] = contagem['itens_pedido'] = 0
+
+            for bloco_inicio in range(0, pedidos, lote):
+                linhas_pedidos, linhas_itens = [], []
+                for n in range(bloco_inicio, min(pedidos, bloco_inicio + lote)):
+                    pedido_id = primeiro_pedido + n
+                    data = inicio + timedelta(seconds=n * intervalo + rng.random() * intervalo)
+                    if (agora - data).days > DIAS_EM_ANDAMENTO:
+                        status = 'cancelado' if rng.random() < 0.12 else 'concluido'
+                    else:
+                        status = rng.choice(STATUS_PEDIDO)
+                    removido = rng.random() < FRACAO_REMOVIDOS
+                    total = 0.0
+                    for _ in range(rng.randint(*ITENS_POR_PEDIDO)):
+                        # Poucos produtos concentram a maior parte das vendas
+                        doce_id, preco, sabores = catalogo[int(len(catalogo) * rng.random() ** 3)]
+                        quantidade = rng.choice((1, 2, 6, 12, 25, 50, 100))
+                        linhas_itens.append({
+                            'id': proximo_item,
+                            'pedido_id': pedido_id,
+                            'doce_id': doce_id,
+                            'quantidade': quantidade,
+                            'preco_unitario': preco,
+                            'preco_total': round(preco * quantidade, 2),
+                            'sabor_selecionado': rng.choice(sabores) if sabores else None,
+                        })
+                        proximo_item += 1
+                        total += preco * quantidade
+                    linhas_pedidos.append({
+                        'id': pedido_id,
+                        'usuario_id': primeiro_usuario + rng.randrange(usuarios),
+                        'numero_pedido': f"S{pedido_id:010d}",
+                        'status': status,
+                        'total': round(total, 2),
+                        'observacoes': None,
+                        'data_pedido': data,
+                        'data_atualizacao': data,
+                        'removido': removido,
+                        'data_remocao': data + timedelta(days=rng.randint(1, 60)) if removido else None,
+                    })
+                conexao.execute(Pedido.__table__.insert(), linhas_pedidos)
+                conexao.execute(ItemPedido.__table__.insert(), linhas_itens)
+                conexao.commit()
+                contagem['pedidos'] += len(linhas_pedidos)
+                contagem['itens_pedido'] += len(linhas_itens)
+                if (bloco_inicio // lote) % max(1, pedidos // lote // 10) == 0:
+                    aviso(f"pedidos: {contagem['pedidos']:,}/{pedidos:,} ({contagem['itens_pedido']:,} itens)")
+
+    return contagem
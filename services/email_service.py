@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from typing import Dict, Optional
 from urllib.parse import quote
 
 from models import Configuracao
+from services.logs import obter_logger
+from services.metricas import medir_smtp
+
+log = obter_logger('email')
+
+# Sem timeout, um servidor SMTP travado prende o worker/thread indefinidamente
+TIMEOUT_SMTP = 15
 
 
 def _get_config_value(key: str, default: Optional[str] = None) -> Optional[str]:
@@ -170,9 +174,14 @@ def _send_email(destinatario: str, assunto: str, html_content: str) -> bool:
     use_tls = (cfg.get("use_tls") or "true").lower() != "false"
 
     if not (host and port and user and password and sender):
-        print("[EMAIL] Configuração de SMTP incompleta. Emails não enviados.")
+        log.warning("Configuração de SMTP incompleta. E-mails não enviados.")
         return False
 
+    # smtplib/email só carregam quando um e-mail é de fato enviado
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     try:
         msg = MIMEMultipart('alternative')
         msg['Subject'] = assunto
@@ -180,16 +189,16 @@ def _send_email(destinatario: str, assunto: str, html_content: str) -> bool:
         msg['To'] = destinatario
         msg.attach(MIMEText(html_content, 'html', 'utf-8'))
 
-        with smtplib.SMTP(host, port) as server:
+        with medir_smtp(), smtplib.SMTP(host, port, timeout=TIMEOUT_SMTP) as server:
             if use_tls:
                 server.starttls()
             server.login(user, password)
             server.send_message(msg)
 
-        print(f"[EMAIL] Enviado para {destinatario}")
+        log.info("E-mail enviado para %s", destinatario)
         return True
     except Exception as e:
-        print(f"[EMAIL] Erro ao enviar para {destinatario}: {e}")
+        log.error("Erro ao enviar e-mail para %s: %s", destinatario, e)
         return False
 
 
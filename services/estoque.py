@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import text
+
+from models import Doce, KitItem, db
+
+# Decremento condicional: só baixa se houver saldo; estoque NULL (ilimitado)
+# continua NULL e a linha ainda conta como reservada.
+_SQL_BAIXAR = text(
+    "UPDATE doces SET estoque_disponivel = estoque_disponivel - :q, data_atualizacao = :agora "
+    "WHERE id = :id AND (estoque_disponivel IS NULL OR estoque_disponivel >= :q)"
+)
+_SQL_DEVOLVER = text(
+    "UPDATE doces SET estoque_disponivel = estoque_disponivel + :q, data_atualizacao = :agora "
+    "WHERE id = :id AND estoque_disponivel IS NOT NULL"
+)
+
+
+class EstoqueInsuficiente(Exception):
+    """Levantada quando um produto não tem saldo para a quantidade pedida."""
+
+    def __init__(self, doce_id: int, quantidade: int):
+        self.doce_id = doce_id
+        self.quantidade = quantidade
+        super().__init__(f"Estoque insuficiente para o produto {doce_id} (pedido: {quantidade})")
+
+
+def quantidades_por_produto(linhas: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Agrega (doce_id, quantidade) por produto, expandindo kits em seus itens.
+
+    O kit baixa o próprio estoque (se controlado) e o de cada componente
+    multiplicado pela quantidade definida em kit_itens.
+    """
+    totais: Dict[int, int] = defaultdict(int)
+    for doce_id, quantidade in linhas:
+        if quantidade > 0:
+            totais[int(doce_id)] += int(quantidade)
+    if not totais:
+        return {}
+
+    kit_ids = [
+        d.id for d in Doce.query.with_entities(Doce.id)
+        .filter(Doce.id.in_(list(totais)), Doce.unidade_venda == 'kit')
+    ]
+    if kit_ids:
+        for item in KitItem.query.filter(KitItem.kit_id.in_(kit_ids)):
+            totais[item.produto_id] += totais[item.kit_id] * int(item.quantidade or 0)
+    return dict(totais)
+
+
+def reservar_estoque(linhas: Iterable[Tuple[int, int]], pedido=None) -> Dict[int, int]:
+    """Baixa o estoque de todas as linhas na transação corrente.
+
+    Cada produto recebe um UPDATE condicional, em ordem de id para que
+    checkouts concorrentes travem as linhas sempre na mesma sequência.
+    Não faz commit: em caso de EstoqueInsuficiente o chamador deve dar
+    rollback, desfazendo também as baixas já feitas. Com `pedido`, as
+    quantidades baixadas ficam registradas nele (estoque_reservado).
+    """
+    totais = quantidades_por_produto(linhas)
+    agora = datetime.utcnow()
+    for doce_id in sorted(totais):
+        resultado = db.session.execute(_SQL_BAIXAR, {'id': doce_id, 'q': totais[doce_id], 'agora': agora})
+        if resultado.rowcount != 1:
+            raise EstoqueInsuficiente(doce_id, totais[doce_id])
+    if pedido is not None:
+        pedido.estoque_reservado = json.dumps({str(doce_id): totais[doce_id] for doce_id in sorted(totais)})
+    return totais
+
+
+def devolver_estoque(pedido) -> None:
+    """Devolve ao estoque o que foi baixado para um pedido cancelado (sem commit).
+
+    Usa as quantidades registradas no checkout: se a composição de um kit
+    mudou depois, volta só o que de fato saiu do estoque.
+    """
+    if pedido.estoque_reservado:
+        totais = {int(doce_id): int(q) for doce_id, q in json.loads(pedido.estoque_reservado).items()}
+    else:
+        # Pedidos anteriores ao registro: expande os kits pela composição atual
+        totais = quantidades_por_produto((item.doce_id, item.quantidade) for item in pedido.itens)
+    agora = datetime.utcnow()
+    for doce_id in sorted(totais):
+        db.session.execute(_SQL_DEVOLVER, {'id': doce_id, 'q': totais[doce_id], 'agora': agora})
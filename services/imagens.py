@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from services.logs import obter_logger
+
+log = obter_logger('imagens')
+
+# Pool de processos para processar imagens fora do ciclo da requisição.
+# Criado sob demanda e recriado se o processo for "forkado" (ex.: gunicorn).
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+# Manifestos de derivadas já lidos do disco: caminho relativo -> (mtime_ns, manifesto).
+# O mtime é conferido a cada uso, então remoções/regravações feitas por outro
+# worker (ou pelo pool de imagens) valem de imediato
+_manifestos = {}
+
+# Larguras geradas para srcset (a original também entra se for menor/diferente)
+LARGURAS_DERIVADAS = (320, 480, 640, 800)
+FORMATOS_SEM_DERIVADAS = ('.svg', '.gif')
+
+# Uploads são nomeados pelo SHA-256 do conteúdo original (32 primeiros hex);
+# derivadas acrescentam "-<largura>w". Esses arquivos nunca mudam de conteúdo.
+HASH_LEN = 32
+UPLOAD_IMUTAVEL_RE = re.compile(r'(^|/)[0-9a-f]{%d}(-\d+w)?\.[a-z0-9]+$' % HASH_LEN)
+CHUNK_SIZE = 64 * 1024
+
+# Limite de pixels aceitos (fotos de 48 MP de celular cabem com folga); acima
+# disso o upload é recusado pelo cabeçalho, antes de decodificar os pixels
+MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 64_000_000))
+# Folga mantida antes do LANCZOS final (mesma ideia do reducing_gap do Pillow)
+REDUCING_GAP = 2.0
+# Orientações EXIF que giram a imagem em 90°
+_ORIENTACOES_GIRADAS = (5, 6, 7, 8)
+# Modos aceitos por Image.reduce() (que o thumbnail() também usa)
+_MODOS_REDUCE = ('L', 'LA', 'RGB', 'RGBA', 'RGBX', 'CMYK', 'La', 'RGBa', 'I', 'F')
+
+
+class ImagemRejeitada(ValueError):
+    """Upload que não é uma imagem válida ou excede o limite de pixels."""
+
+
+def sondar_imagem(image_path) -> Tuple[int, int]:
+    """Lê apenas o cabeçalho e valida dimensões; não decodifica os pixels."""
+    from PIL import Image
+
+    try:
+        with Image.open(image_path) as img:
+            largura, altura = img.size
+    except Image.DecompressionBombError as e:
+        raise ImagemRejeitada(f"Imagem grande demais: {e}")
+    except Exception as e:
+        raise ImagemRejeitada(f"Arquivo de imagem inválido: {e}")
+    if largura * altura > MAX_PIXELS:
+        raise ImagemRejeitada(
+            f"Imagem grande demais ({largura}x{altura}); máximo de {MAX_PIXELS // 1_000_000} MP"
+        )
+    return largura, altura
+
+
+def _modo_redutivel(img):
+    """Converte paleta (P), 1 bit e 16 bits por canal para um modo aceito por reduce()."""
+    if img.mode in _MODOS_REDUCE:
+        return img
+    if img.mode in ('P', 'PA'):
+        transparente = img.mode == 'PA' or 'transparency' in img.info
+        return img.convert('RGBA' if transparente else 'RGB')
+    if img.mode.startswith('I;16'):
+        # 16 bits -> 8 bits (convert('L') direto satura tudo acima de 255)
+        return img.convert('I').point(lambda v: v / 256).convert('L')
+    if img.mode == '1':
+        return img.convert('L')
+    return img.convert('RGB')
+
+
+def _tamanho_alvo(tamanho: Tuple[int, int], max_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Tamanho final mantendo a proporção (mesma regra do Image.thumbnail)."""
+    largura, altura = tamanho
+    escala = min(max_size[0] / largura, max_size[1] / altura, 1.0)
+    return max(1, round(largura * escala)), max(1, round(altura * escala))
+
+
+def resize_image(image_path, max_size=(800, 600), destino=None):
+    """Ajustar orientação EXIF (iPhone) e redimensionar para otimizar carregamento.
+
+    Caminho rápido para arquivos grandes: o tamanho é sondado pelo cabeçalho,
+    JPEGs são decodificados já reduzidos (draft, escala 1/2 a 1/8 feita pelo
+    próprio decodificador) e os demais formatos passam por reduce() inteiro
+    antes do LANCZOS final. Assim o pico de memória acompanha o tamanho de
+    saída, não o da foto original.
+
+    Sem `destino`, sobrescreve o próprio arquivo; com `destino`, grava lá de
+    forma atômica (arquivo temporário + os.replace).
+    """
+    from PIL import Image, ImageOps
+
+    destino = destino or image_path
+    tmp_path = _temporario_ao_lado(destino)
+    try:
+        sondar_imagem(image_path)
+        with Image.open(image_path) as img:
+            # Orientação EXIF 5-8 gira 90°: a caixa de destino vale para a imagem girada
+            try:
+                orientacao = img.getexif().get(0x0112, 1)
+            except Exception:
+                orientacao = 1
+            caixa = (max_size[1], max_size[0]) if orientacao in _ORIENTACOES_GIRADAS else max_size
+            alvo = _tamanho_alvo(img.size, caixa)
+
+            if img.format == 'JPEG':
+                # Decodificação reduzida pelo libjpeg (só antes do load)
+                img.draft('RGB' if img.mode not in ('L', 'CMYK') else img.mode,
+                          (int(alvo[0] * REDUCING_GAP), int(alvo[1] * REDUCING_GAP)))
+            else:
+                img = _modo_redutivel(img)
+                fator = int(min(img.width / (alvo[0] * REDUCING_GAP), img.height / (alvo[1] * REDUCING_GAP)))
+                if fator >= 2:
+                    img = img.reduce(fator)
+
+            # Corrigir orientação baseada no EXIF (iPhone)
+            try:
+                img = ImageOps.exif_transpose(img)
+            except Exception:
+                pass
+
+            # Redimensionar mantendo proporção
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+            # Salvar preservando formato quando possível
+            lower = destino.lower()
+            if lower.endswith(('.jpg', '.jpeg')):
+                if img.mode in ('RGBA', 'P'):
+                    img = img.convert('RGB')
+                img.save(tmp_path, format='JPEG', optimize=True, quality=85)
+            elif lower.endswith('.webp'):
+                img.save(tmp_path, format='WEBP', quality=85, method=6)
+            elif lower.endswith('.png'):
+                img.save(tmp_path, format='PNG', optimize=True)
+            else:
+                fmt = Image.registered_extensions().get(os.path.splitext(lower)[1])
+                img.save(tmp_path, format=fmt, optimize=True)
+        os.replace(tmp_path, destino)
+        return True
+    except Exception as e:
+        log.error("Erro ao processar imagem (orientação/redimensionamento): %s", e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def _temporario_ao_lado(destino: str) -> str:
+    """Arquivo temporário exclusivo na pasta do destino (os.replace atômico no fim).
+
+    Nome único: dois uploads do mesmo conteúdo (mesmo destino) processados ao
+    mesmo tempo não escrevem no mesmo temporário.
+    """
+    fd, caminho = tempfile.mkstemp(prefix=f".{os.path.basename(destino)}.", suffix='.tmp',
+                                   dir=os.path.dirname(destino) or '.')
+    os.close(fd)
+    return caminho
+
+
+def _publicar(escrever, destino: str) -> None:
+    """Grava por `escrever(caminho_temporario)` e publica em `destino` atomicamente."""
+    tmp_path = _temporario_ao_lado(destino)
+    try:
+        escrever(tmp_path)
+        os.replace(tmp_path, destino)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _caminho_manifesto(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}.srcset.json"
+
+
+def _nome_derivada(destino: str, largura: int, ext: str) -> str:
+    return f"{os.path.splitext(destino)[0]}-{largura}w{ext}"
+
+
+def gerar_derivadas(destino: str, larguras=LARGURAS_DERIVADAS) -> Optional[dict]:
+    """Gera versões WebP + JPEG em várias larguras e grava o manifesto ao lado da imagem.
+
+    O manifesto guarda apenas nomes de arquivo (mesma pasta da imagem), para
+    que o helper de template monte o srcset sem tocar nas imagens.
+    """
+    if destino.lower().endswith(FORMATOS_SEM_DERIVADAS):
+        return None
+    from PIL import Image
+
+    try:
+        with Image.open(destino) as img:
+            img.load()
+            largura_original, altura_original = img.size
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+            alvos = sorted({l for l in larguras if l < largura_original} | {largura_original})
+            variantes = []
+            for largura in alvos:
+                altura = max(1, round(altura_original * largura / largura_original))
+                versao = img if largura == largura_original else img.resize((largura, altura), Image.Resampling.LANCZOS)
+                webp_path = _nome_derivada(destino, largura, '.webp')
+                jpeg_path = _nome_derivada(destino, largura, '.jpg')
+                _publicar(lambda tmp: versao.save(tmp, format='WEBP', quality=80, method=4), webp_path)
+                _publicar(lambda tmp: versao.convert('RGB').save(tmp, format='JPEG', quality=82,
+                                                                 optimize=True, progressive=True), jpeg_path)
+                variantes.append({
+                    'largura': largura,
+                    'altura': altura,
+                    'webp': os.path.basename(webp_path),
+                    'jpeg': os.path.basename(jpeg_path),
+                })
+        manifesto = {'largura': largura_original, 'altura': altura_original, 'variantes': variantes}
+        def gravar(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(manifesto, f)
+
+        _publicar(gravar, _caminho_manifesto(destino))
+        return manifesto
+    except Exception as e:
+        log.error("Erro ao gerar derivadas de %s: %s", destino, e)
+        return None
+
+
+def processar_upload(staging_path: str, destino: str, max_size: Optional[Tuple[int, int]],
+                     derivadas: bool = False) -> str:
+    """Tarefa executada no pool: gera o arquivo final a partir do original em staging."""
+    try:
+        ok = False
+        if max_size and not destino.lower().endswith('.svg'):
+            ok = resize_image(staging_path, max_size, destino=destino)
+        if not ok:
+            # SVG, formato não suportado ou falha no Pillow: publica o original
+            _publicar(lambda tmp: shutil.copyfile(staging_path, tmp), destino)
+        # O manifesto é gravado por último; enquanto não existir, o helper de
+        # template usa a imagem única
+        if derivadas:
+            gerar_derivadas(destino)
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+    return destino
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = int(current_app.config.get('IMAGE_WORKERS', 1))
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _caminho_staging() -> str:
+    return current_app.config.get('UPLOAD_STAGING_FOLDER') or os.path.join(current_app.instance_path, 'staging')
+
+
+def staging_folder() -> str:
+    path = _caminho_staging()
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def uploads_pendentes() -> str:
+    """Assinatura dos uploads ainda em processamento (arquivos em staging).
+
+    O pool remove o arquivo de staging só depois de publicar a imagem e as
+    derivadas, então a assinatura muda quando o processamento termina; vale
+    para todos os workers, já que a pasta é compartilhada.
+    """
+    try:
+        return ','.join(sorted(os.listdir(_caminho_staging())))
+    except OSError:
+        return ''
+
+
+def _gravar_com_hash(file, staging_path: str) -> str:
+    """Grava o upload em disco calculando o SHA-256 durante a cópia."""
+    digest = hashlib.sha256()
+    stream = getattr(file, 'stream', file)
+    with open(staging_path, 'wb') as out:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def upload_imutavel(relative_path: Optional[str]) -> bool:
+    """Indica se o caminho é de um upload endereçado por conteúdo."""
+    return bool(relative_path and UPLOAD_IMUTAVEL_RE.search(relative_path))
+
+
+def enfileirar_upload(file, folder: str, max_size: Optional[Tuple[int, int]] = (800, 600),
+                      derivadas: bool = False) -> str:
+    """Grava o upload em staging e agenda o processamento.
+
+    `folder` é a pasta de destino relativa a static/ (ex.: 'uploads'). O
+    arquivo final é nomeado pelo hash do conteúdo enviado, então reenviar a
+    mesma imagem reaproveita o arquivo existente sem reprocessar.
+    Retorna o caminho relativo para gravar no banco; até o processamento
+    terminar, `imagem_pronta()` é False e os templates mostram o
+    placeholder. Com `derivadas=True`, o pool também gera as versões
+    responsivas (ver gerar_derivadas). Levanta ImagemRejeitada se o arquivo
+    não for uma imagem legível ou passar de MAX_PIXELS.
+    """
+    ext = os.path.splitext(secure_filename(file.filename or ''))[1].lower()
+    staging_path = os.path.join(staging_folder(), f"{uuid.uuid4().hex}{ext}")
+    digest = _gravar_com_hash(file, staging_path)
+    if ext != '.svg':
+        # Rejeita bombas de descompressão e arquivos corrompidos antes do pool
+        try:
+            sondar_imagem(staging_path)
+        except ImagemRejeitada:
+            os.remove(staging_path)
+            raise
+    relative_path = f"{folder.strip('/')}/{digest[:HASH_LEN]}{ext}"
+    destino = os.path.join(current_app.static_folder, relative_path)
+
+    # Deduplicação: conteúdo idêntico já publicado (e com derivadas, se pedidas)
+    if os.path.exists(destino) and (not derivadas or os.path.exists(_caminho_manifesto(destino))
+                                    or destino.lower().endswith(FORMATOS_SEM_DERIVADAS)):
+        os.remove(staging_path)
+        _renovar(destino)
+        return relative_path
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if not current_app.config.get('IMAGE_PROCESSING_ASYNC', True):
+        processar_upload(staging_path, destino, max_size, derivadas)
+        return relative_path
+    try:
+        _get_executor().submit(processar_upload, staging_path, destino, max_size, derivadas)
+    except Exception as e:
+        # Pool indisponível (ex.: BrokenProcessPool): processa na própria requisição
+        log.warning("Falha ao enfileirar imagem, processando de forma síncrona: %s", e)
+        processar_upload(staging_path, destino, max_size, derivadas)
+    return relative_path
+
+
+def _arquivos_da_imagem(path: str) -> List[str]:
+    """Arquivo publicado, manifesto, derivadas e variantes comprimidas que existem no disco."""
+    arquivos = []
+    manifesto_path = _caminho_manifesto(path)
+    if os.path.exists(manifesto_path):
+        try:
+            with open(manifesto_path, encoding='utf-8') as f:
+                variantes = json.load(f).get('variantes', [])
+        except (OSError, ValueError):
+            variantes = []
+        pasta = os.path.dirname(path)
+        for variante in variantes:
+            for nome in (variante.get('webp'), variante.get('jpeg')):
+                if nome and os.path.exists(os.path.join(pasta, nome)):
+                    arquivos.append(os.path.join(pasta, nome))
+        arquivos.append(manifesto_path)
+    return arquivos + [a for a in (path, f"{path}.gz", f"{path}.br") if os.path.exists(a)]
+
+
+def _renovar(path: str) -> None:
+    """Atualiza o mtime de uma imagem reaproveitada (e das derivadas).
+
+    A limpeza de uploads (limpar-uploads) só mexe em arquivos mais velhos que
+    a carência; um órfão antigo que voltou a ser enviado precisa parecer novo
+    até o formulário gravar a referência.
+    """
+    for arquivo in _arquivos_da_imagem(path):
+        try:
+            os.utime(arquivo)
+        except OSError:
+            pass  # removido por outro worker no meio do caminho
+
+
+def remover_imagem(relative_path: Optional[str]) -> None:
+    """Remove do disco uma imagem (relativa a static/) e a esquece no cache."""
+    if not relative_path:
+        return
+    _manifestos.pop(relative_path, None)
+    for arquivo in _arquivos_da_imagem(os.path.join(current_app.static_folder, relative_path)):
+        os.remove(arquivo)
+
+
+def imagem_pronta(relative_path: Optional[str]) -> bool:
+    """Indica se o arquivo final de uma imagem (relativo a static/) já existe.
+
+    Consulta o disco a cada chamada (um stat): o arquivo é publicado pelo pool
+    e pode ser removido por qualquer worker, então um cache por processo
+    ficaria desatualizado.
+    """
+    if not relative_path:
+        return False
+    return os.path.exists(os.path.join(current_app.static_folder, relative_path))
+
+
+def manifesto_imagem(relative_path: Optional[str]) -> Optional[dict]:
+    """Manifesto de derivadas de uma imagem (relativa a static/), ou None."""
+    if not relative_path:
+        return None
+    path = _caminho_manifesto(os.path.join(current_app.static_folder, relative_path))
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        _manifestos.pop(relative_path, None)
+        return None
+    em_cache = _manifestos.get(relative_path)
+    if em_cache is not None and em_cache[0] == mtime:
+        return em_cache[1]
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    _manifestos[relative_path] = (mtime, manifesto)
+    return manifesto
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+# Pastas (relativas a static/) que recebem uploads do admin
+PASTAS_UPLOAD = ('uploads', 'images/uploads')
+
+# Derivadas responsivas e manifesto gerados ao lado de cada imagem
+_DERIVADA_RE = re.compile(r'^(?P<base>.+?)(-\d+w\.(webp|jpg)|\.srcset\.json)$')
+
+
+def normalizar_caminho(valor: Optional[str]) -> Optional[str]:
+    """Converte um valor salvo no banco em caminho relativo a static/."""
+    if not valor:
+        return None
+    valor = valor.strip().split('?', 1)[0]
+    if valor.startswith('/'):
+        valor = valor.lstrip('/')
+    if valor.startswith('static/'):
+        valor = valor[len('static/'):]
+    return valor or None
+
+
+def _base_sem_ext(caminho: str) -> str:
+    return os.path.splitext(caminho)[0]
+
+
+def _referenciado(relativo: str, caminhos: Set[str], bases: Set[str]) -> bool:
+    if relativo in caminhos:
+        return True
+    # Variantes pré-comprimidas (.gz/.br) seguem o arquivo original
+    if relativo.endswith(('.gz', '.br')):
+        return _referenciado(relativo[:-3], caminhos, bases)
+    match = _DERIVADA_RE.match(relativo)
+    return bool(match and match.group('base') in bases)
+
+
+def _varrer(pasta: str) -> Iterable[os.DirEntry]:
+    """Percorre recursivamente uma pasta com os.scandir (arquivos apenas)."""
+    try:
+        with os.scandir(pasta) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _varrer(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+    except FileNotFoundError:
+        return
+
+
+def coletar_orfaos(static_folder: str, referenciados: Iterable[str], quarentena: str,
+                   carencia_segundos: float, pastas: Iterable[str] = PASTAS_UPLOAD,
+                   extras: Iterable[str] = (), dry_run: bool = False) -> Dict[str, object]:
+    """Move para a quarentena os uploads não referenciados mais antigos que a carência.
+
+    `referenciados` são caminhos relativos a static/ (Doce.imagem_url,
+    valores de Configuracao). Derivadas e manifestos de uma imagem
+    referenciada também são mantidos. `extras` são pastas absolutas
+    adicionais (ex.: staging) em que qualquer arquivo antigo é órfão.
+    Retorna um resumo com arquivos movidos e bytes recuperados.
+    """
+    caminhos = {c for c in (normalizar_caminho(r) for r in referenciados) if c}
+    bases = {_base_sem_ext(c) for c in caminhos}
+    limite = time.time() - carencia_segundos
+    destino_lote = os.path.join(quarentena, datetime.now().strftime('%Y%m%d-%H%M%S'))
+
+    movidos: List[str] = []
+    bytes_recuperados = 0
+    mantidos = 0
+
+    def _mover(entry: os.DirEntry, relativo: str):
+        nonlocal bytes_recuperados
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > limite:
+            return False
+        if not dry_run:
+            alvo = os.path.join(destino_lote, relativo)
+            os.makedirs(os.path.dirname(alvo), exist_ok=True)
+            shutil.move(entry.path, alvo)
+        movidos.append(relativo)
+        bytes_recuperados += stat.st_size
+        return True
+
+    for pasta in pastas:
+        raiz = os.path.join(static_folder, pasta)
+        for entry in _varrer(raiz):
+            relativo = os.path.relpath(entry.path, static_folder).replace(os.sep, '/')
+            if _referenciado(relativo, caminhos, bases) or not _mover(entry, relativo):
+                mantidos += 1
+
+    for pasta in extras:
+        for entry in _varrer(pasta):
+            relativo = os.path.join('_' + os.path.basename(pasta.rstrip(os.sep)),
+                                    os.path.relpath(entry.path, pasta)).replace(os.sep, '/')
+            if not _mover(entry, relativo):
+                mantidos += 1
+
+    return {
+        'movidos': movidos,
+        'bytes_recuperados': bytes_recuperados,
+        'mantidos': mantidos,
+        'quarentena': destino_lote if movidos and not dry_run else None,
+    }
+
+
+def purgar_quarentena(quarentena: str, dias: float) -> int:
+    """Apaga lotes da quarentena mais antigos que `dias`. Retorna bytes liberados."""
+    liberados = 0
+    limite = time.time() - dias * 86400
+    try:
+        lotes = list(os.scandir(quarentena))
+    except FileNotFoundError:
+        return 0
+    for lote in lotes:
+        if lote.is_dir(follow_symlinks=False) and lote.stat().st_mtime < limite:
+            liberados += sum(e.stat(follow_symlinks=False).st_size for e in _varrer(lote.path))
+            shutil.rmtree(lote.path, ignore_errors=True)
+    return liberados
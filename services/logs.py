@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+# Todos os loggers da aplicação ficam abaixo deste (pasta_art.loja, pasta_art.carrinho...)
+RAIZ = 'pasta_art'
+
+# Eventos de carrinho são muitos e repetitivos: em produção só uma fração é registrada
+AMOSTRAGEM_PADRAO = {'carrinho': 0.1}
+
+_CORES = {
+    'DEBUG': '\033[35m', 'INFO': '\033[36m', 'WARNING': '\033[33m',
+    'ERROR': '\033[31m', 'CRITICAL': '\033[31m',
+}
+_SEM_COR = '\033[0m'
+
+# Atributos que todo LogRecord tem; o resto veio de extra={...}
+_CAMPOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_handler: Optional['_HandlerFila'] = None
+# Filas extras (ex.: arquivo de consultas lentas), paradas/reiniciadas junto com a principal
+_filas_extras: list = []
+_lock = threading.Lock()
+
+
+def obter_logger(nome: str = '') -> logging.Logger:
+    return logging.getLogger(f"{RAIZ}.{nome}" if nome else RAIZ)
+
+
+class FormatadorJson(logging.Formatter):
+    """Uma linha JSON por registro (campos de extra={...} incluídos)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'nivel': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _CAMPOS_PADRAO:
+                dados[chave] = valor
+        if record.exc_info:
+            dados['exc'] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FormatadorTexto(logging.Formatter):
+    """[HH:MM:SS] NIVEL logger: mensagem — colorido quando a saída é um terminal."""
+
+    def __init__(self, cores: bool = False):
+        super().__init__('[%(asctime)s] %(levelname)s %(name)s: %(message)s', datefmt='%H:%M:%S')
+        self.cores = cores
+
+    def format(self, record: logging.LogRecord) -> str:
+        linha = super().format(record)
+        if self.cores:
+            return f"{_CORES.get(record.levelname, '')}{linha}{_SEM_COR}"
+        return linha
+
+
+class Amostragem(logging.Filter):
+    """Deixa passar só uma fração dos DEBUG/INFO dos loggers indicados.
+
+    `taxas` mapeia sufixo do logger ('carrinho') para a fração mantida;
+    WARNING ou acima sempre passa.
+    """
+
+    def __init__(self, taxas: Dict[str, float]):
+        super().__init__()
+        self.taxas = {f"{RAIZ}.{nome}": taxa for nome, taxa in taxas.items()}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.taxas:
+            return True
+        taxa = self.taxas.get(record.name)
+        if taxa is None:
+            return True
+        return taxa >= 1 or random.random() < taxa
+
+
+class _HandlerFila(logging.handlers.QueueHandler):
+    """QueueHandler cuja escrita (stdout/arquivo) roda em uma thread própria.
+
+    A thread de escrita só existe no processo que a iniciou; em um processo
+    filho (fork do ProcessPoolExecutor, worker do gunicorn com --preload)
+    os registros são escritos diretamente até `reiniciar_apos_fork()`.
+    """
+
+    def __init__(self, destinos: Sequence[logging.Handler]):
+        super().__init__(queue.SimpleQueue())
+        self.destinos = list(destinos)
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._pid: Optional[int] = None
+
+    def iniciar(self) -> None:
+        self.parar()
+        self.queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self.queue, *self.destinos, respect_handler_level=True)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def parar(self) -> None:
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+        self._listener = None
+        self._pid = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._pid == os.getpid():
+            super().emit(record)
+            return
+        for destino in self.destinos:
+            if record.levelno >= destino.level:
+                destino.handle(record)
+
+
+def configurar_logs(nivel: str = 'INFO', formato: str = 'texto',
+                    amostragem: Optional[Dict[str, float]] = None,
+                    destinos: Optional[Sequence[logging.Handler]] = None) -> logging.Logger:
+    """Configura o logger `pasta_art` (idempotente; pode ser chamada de novo para trocar opções).
+
+    As chamadas de log só formatam a mensagem e a colocam numa fila; a
+    escrita acontece na thread do QueueListener, então a requisição nunca
+    espera por I/O. Com o nível desligado, `log.debug(...)` custa uma
+    comparação de inteiros.
+    """
+    global _handler
+    with _lock:
+        if destinos is None:
+            saida = logging.StreamHandler(sys.stdout)
+            if formato == 'json':
+                saida.setFormatter(FormatadorJson())
+            else:
+                saida.setFormatter(FormatadorTexto(cores=sys.stdout.isatty()))
+            destinos = [saida]
+
+        raiz = obter_logger()
+        if _handler is not None:
+            _handler.parar()
+            raiz.removeHandler(_handler)
+        _handler = _HandlerFila(destinos)
+        _handler.addFilter(Amostragem(AMOSTRAGEM_PADRAO if amostragem is None else amostragem))
+        _handler.iniciar()
+
+        raiz.addHandler(_handler)
+        raiz.setLevel(nivel.upper())
+        # Não duplica no logger raiz do Python (gunicorn/werkzeug têm os seus)
+        raiz.propagate = False
+    return raiz
+
+
+def handler_em_fila(*destinos: logging.Handler) -> logging.Handler:
+    """Handler que entrega os registros a `destinos` por uma thread própria (ex.: arquivo)."""
+    with _lock:
+        handler = _HandlerFila(destinos)
+        handler.iniciar()
+        _filas_extras.append(handler)
+    return handler
+
+
+def reiniciar_apos_fork() -> None:
+    """Sobe as threads de escrita no processo atual (ex.: post_fork do gunicorn)."""
+    with _lock:
+        for handler in [_handler, *_filas_extras]:
+            if handler is not None and handler._pid != os.getpid():
+                handler.iniciar()
+
+
+def parar_logs() -> None:
+    """Esvazia as filas e encerra as threads de escrita."""
+    with _lock:
+        for handler in [_handler, *_filas_extras]:
+            if handler is not None:
+                handler.parar()
+
+
+atexit.register(parar_logs)
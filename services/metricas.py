@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from flask import g, request
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # prometheus_client é opcional: sem ele, /admin/metrics responde 501
+    prometheus_client = None
+
+# Com gunicorn, cada worker grava seus valores em arquivos mmap nesta pasta e
+# /admin/metrics soma todos (precisa existir e estar vazia ao subir o serviço)
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SMTP = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Quase sempre ~0 (conexão livre no pool); a cauda mostra workers/threads brigando por conexões
+BUCKETS_POOL = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+if prometheus_client is not None:
+    REQUISICOES = Counter(
+        'pasta_art_http_requests_total', 'Requisições por rota, método e status',
+        ['endpoint', 'metodo', 'status'],
+    )
+    LATENCIA = Histogram(
+        'pasta_art_http_request_duration_seconds', 'Latência das requisições por rota',
+        ['endpoint', 'metodo'], buckets=BUCKETS_LATENCIA,
+    )
+    EM_ANDAMENTO = Gauge(
+        'pasta_art_http_requests_in_progress', 'Requisições em andamento',
+        multiprocess_mode='livesum',
+    )
+    TEMPO_DB = Histogram(
+        'pasta_art_db_time_seconds', 'Tempo gasto em consultas SQL por requisição',
+        ['endpoint'], buckets=BUCKETS_LATENCIA,
+    )
+    CONSULTAS = Counter('pasta_art_db_queries_total', 'Consultas SQL executadas', ['endpoint'])
+    TEMPO_SMTP = Histogram(
+        'pasta_art_smtp_duration_seconds', 'Tempo de envio de e-mails via SMTP',
+        ['resultado'], buckets=BUCKETS_SMTP,
+    )
+    ESPERA_POOL = Histogram(
+        'pasta_art_db_pool_wait_seconds', 'Espera por uma conexão livre no pool do banco',
+        buckets=BUCKETS_POOL,
+    )
+    POOL_ESGOTADO = Counter(
+        'pasta_art_db_pool_timeouts_total', 'Pedidos de conexão que estouraram o pool_timeout',
+    )
+
+
+def disponivel() -> bool:
+    return prometheus_client is not None
+
+
+def _endpoint() -> str:
+    # Rotas não encontradas não viram um rótulo por URL (cardinalidade)
+    return request.endpoint or 'nao_encontrado'
+
+
+@contextmanager
+def medir_smtp():
+    """Mede um envio de e-mail; o resultado é 'ok' ou 'erro' (exceção)."""
+    inicio = time.perf_counter()
+    resultado = 'erro'
+    try:
+        yield
+        resultado = 'ok'
+    finally:
+        if prometheus_client is not None:
+            TEMPO_SMTP.labels(resultado).observe(time.perf_counter() - inicio)
+
+
+def observar_espera_pool(segundos: float, esgotado: bool = False) -> None:
+    if prometheus_client is not None:
+        ESPERA_POOL.observe(segundos)
+        if esgotado:
+            POOL_ESGOTADO.inc()
+
+
+def gerar_metricas() -> Tuple[bytes, str]:
+    """Texto no formato Prometheus (somando todos os workers no modo multiprocesso)."""
+    if MULTIPROC_DIR:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registro), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def marcar_processo_encerrado(pid: int) -> None:
+    """Descarta os gauges de um worker que saiu (hook child_exit do gunicorn)."""
+    if prometheus_client is not None and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def registrar(app) -> None:
+    """Contadores e histogramas por rota (latência, status, SQL) e requisições em andamento."""
+    app.config.setdefault('METRICS_ENABLED', True)
+    if prometheus_client is None or not app.config['METRICS_ENABLED']:
+        return
+
+    @app.before_request
+    def iniciar_metricas():
+        g.metricas_inicio = time.perf_counter()
+        EM_ANDAMENTO.inc()
+
+    @app.after_request
+    def registrar_metricas(response):
+        inicio = g.get('metricas_inicio')
+        if inicio is None:
+            return response
+        endpoint = _endpoint()
+        REQUISICOES.labels(endpoint, request.method, str(response.status_code)).inc()
+        LATENCIA.labels(endpoint, request.method).observe(time.perf_counter() - inicio)
+        sql = g.get('perfil_sql')
+        if sql is not None:
+            TEMPO_DB.labels(endpoint).observe(sql.tempo)
+            if sql.total:
+                CONSULTAS.labels(endpoint).inc(sql.total)
+        return response
+
+    @app.teardown_request
+    def encerrar_metricas(_erro=None):
+        if g.pop('metricas_inicio', None) is not None:
+            EM_ANDAMENTO.dec()
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import importlib
+import os
+import re
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, OperationalError, ProgrammingError
+
+PACOTE = 'migrations'
+PASTA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), PACOTE)
+_ARQUIVO = re.compile(r'^v(\d{4})_(\w+)\.py$')
+
+# Erros que indicam que a mudança já está no banco (bancos anteriores às migrações):
+# 1050 tabela já existe, 1060 coluna duplicada, 1061 índice duplicado
+_CODIGOS_JA_APLICADO = (1050, 1060, 1061)
+_MENSAGENS_JA_APLICADO = ('duplicate column', 'duplicate key name', 'already exists')
+_ERRO_SINTAXE_MYSQL = 1064
+# SQLite não tem ADD COLUMN IF NOT EXISTS: a coluna é procurada antes (PRAGMA table_info)
+_ADD_COLUMN = re.compile(r'^\s*ALTER TABLE (\w+) ADD COLUMN (\w+)', re.IGNORECASE)
+
+# Evita dois deploys migrando o mesmo banco ao mesmo tempo (MySQL/MariaDB)
+_LOCK_MYSQL = 'pasta_art_schema'
+_DIALETOS_MYSQL = ('mysql', 'mariadb')
+
+
+class Migracao(NamedTuple):
+    versao: int
+    nome: str
+    modulo: str
+
+
+def descobrir(pasta: str = PASTA, pacote: str = PACOTE) -> List[Migracao]:
+    """Migrações vNNNN_nome.py da pasta, em ordem de versão."""
+    migracoes = []
+    for arquivo in os.listdir(pasta):
+        encontrado = _ARQUIVO.match(arquivo)
+        if encontrado:
+            migracoes.append(Migracao(int(encontrado.group(1)), encontrado.group(2),
+                                      f"{pacote}.{arquivo[:-3]}"))
+    migracoes.sort()
+    versoes = [m.versao for m in migracoes]
+    if len(versoes) != len(set(versoes)):
+        raise RuntimeError(f"Versões de migração duplicadas em {pasta}")
+    return migracoes
+
+
+def ultima_versao(pasta: str = PASTA) -> int:
+    migracoes = descobrir(pasta)
+    return migracoes[-1].versao if migracoes else 0
+
+
+def _garantir_tabela(conexao: Connection) -> None:
+    conexao.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " versao INTEGER NOT NULL PRIMARY KEY,"
+        " nome VARCHAR(100) NOT NULL,"
+        " aplicada_em DATETIME NOT NULL)"
+    ))
+    conexao.commit()
+
+
+def versao_atual(conexao: Connection) -> Optional[int]:
+    """Maior versão aplicada; None se o banco nunca passou pelas migrações."""
+    try:
+        return conexao.execute(text("SELECT MAX(versao) FROM schema_version")).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        conexao.rollback()
+        return None
+
+
+def _versoes_aplicadas(conexao: Connection) -> set:
+    return {linha[0] for linha in conexao.execute(text("SELECT versao FROM schema_version"))}
+
+
+def _codigo_erro(erro: DBAPIError) -> Optional[int]:
+    args = getattr(erro.orig, 'args', ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def _ja_aplicado(erro: DBAPIError) -> bool:
+    mensagem = str(erro.orig).lower()
+    return _codigo_erro(erro) in _CODIGOS_JA_APLICADO or any(m in mensagem for m in _MENSAGENS_JA_APLICADO)
+
+
+def _coluna_existe_sqlite(conexao: Connection, ddl: str) -> bool:
+    encontrado = _ADD_COLUMN.match(ddl)
+    if not encontrado or conexao.dialect.name != 'sqlite':
+        return False
+    tabela, coluna = encontrado.groups()
+    return any(linha[1] == coluna for linha in conexao.exec_driver_sql(f"PRAGMA table_info({tabela})"))
+
+
+def _executar_ddl(conexao: Connection, ddl: str) -> bool:
+    """Executa um comando; False se a mudança já existia no banco."""
+    if _coluna_existe_sqlite(conexao, ddl):
+        return False
+    try:
+        conexao.execute(text(ddl))
+        conexao.commit()
+        return True
+    except DBAPIError as e:
+        conexao.rollback()
+        # MySQL não aceita ADD COLUMN IF NOT EXISTS (MariaDB aceita): tenta sem ele
+        if _codigo_erro(e) == _ERRO_SINTAXE_MYSQL and ' IF NOT EXISTS' in ddl:
+            return _executar_ddl(conexao, ddl.replace(' IF NOT EXISTS', ''))
+        if _ja_aplicado(e):
+            return False
+        raise
+
+
+def _aplicar_migracao(conexao: Connection, migracao: Migracao, dialeto: str) -> str:
+    modulo = importlib.import_module(migracao.modulo)
+    dialetos = getattr(modulo, 'DIALETOS', None)
+    # DDL_SQLITE etc.: comandos próprios do dialeto, no lugar de DDL (e de DIALETOS)
+    ddl_dialeto = getattr(modulo, f'DDL_{dialeto.upper()}', None)
+    if ddl_dialeto is None and dialetos and dialeto not in dialetos:
+        situacao = 'pulada'
+    else:
+        ddls = ddl_dialeto if ddl_dialeto is not None else getattr(modulo, 'DDL', ())
+        resultados = [_executar_ddl(conexao, ddl) for ddl in ddls]
+        if hasattr(modulo, 'aplicar'):
+            modulo.aplicar(conexao)
+            conexao.commit()
+        situacao = 'já existia' if resultados and not any(resultados) else 'aplicada'
+    conexao.execute(
+        text("INSERT INTO schema_version (versao, nome, aplicada_em) VALUES (:versao, :nome, :agora)"),
+        {'versao': migracao.versao, 'nome': migracao.nome, 'agora': datetime.utcnow()},
+    )
+    conexao.commit()
+    return situacao
+
+
+def migrar(engine: Engine, ate: Optional[int] = None,
+           aviso: Callable[[str], None] = print) -> List[Tuple[Migracao, str]]:
+    """Aplica, em ordem, as migrações pendentes (até a versão `ate`, se informada).
+
+    Cada comando é executado e confirmado separadamente; em bancos criados
+    antes das migrações, colunas/tabelas/índices que já existem são aceitos
+    e a versão é registrada mesmo assim. Retorna [(migração, situação)].
+    """
+    dialeto = engine.dialect.name
+    aplicadas: List[Tuple[Migracao, str]] = []
+    with engine.connect() as conexao:
+        travado = dialeto in _DIALETOS_MYSQL
+        if travado and not conexao.execute(text("SELECT GET_LOCK(:nome, 120)"), {'nome': _LOCK_MYSQL}).scalar():
+            raise RuntimeError("Outra migração está em andamento (GET_LOCK expirou)")
+        try:
+            _garantir_tabela(conexao)
+            feitas = _versoes_aplicadas(conexao)
+            for migracao in descobrir():
+                if migracao.versao in feitas or (ate is not None and migracao.versao > ate):
+                    continue
+                situacao = _aplicar_migracao(conexao, migracao, dialeto)
+                aviso(f"v{migracao.versao:04d} {migracao.nome}: {situacao}")
+                aplicadas.append((migracao, situacao))
+        finally:
+            if travado:
+                conexao.execute(text("SELECT RELEASE_LOCK(:nome)"), {'nome': _LOCK_MYSQL})
+    return aplicadas
+
+
+def estado(engine: Engine) -> Tuple[Optional[int], int]:
+    """(versão do banco, última versão do código) com uma única consulta."""
+    with engine.connect() as conexao:
+        return versao_atual(conexao), ultima_versao()
+
+
+def status(engine: Engine) -> List[Tuple[Migracao, Optional[datetime]]]:
+    """Todas as migrações do código com a data em que foram aplicadas (ou None)."""
+    with engine.connect() as conexao:
+        if versao_atual(conexao) is None:
+            aplicadas = {}
+        else:
+            aplicadas = dict(conexao.execute(text("SELECT versao, aplicada_em FROM schema_version")).all())
+    return [(m, aplicadas.get(m.versao)) for m in descobrir()]
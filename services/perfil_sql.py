@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, List, Optional, Tuple
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from services.logs import obter_logger
+
+log = obter_logger('sql')
+
+# Mesmo formato de consulta repetido N vezes numa requisição: provável N+1
+LIMITE_N1 = 5
+
+_PLACEHOLDERS_IN = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)')
+_ESPACOS = re.compile(r'\s+')
+
+# Observadores de consultas ativos no contexto atual (requisição, contar_consultas()...)
+_ativas: ContextVar[Tuple['EstatisticaSQL', ...]] = ContextVar('perfil_sql_ativas', default=())
+# Funções avisadas de toda consulta com o tempo medido aqui (ex.: services/consultas_lentas.py)
+_assinantes: List[Callable] = []
+_instalado = False
+
+
+def formato_consulta(statement: str) -> str:
+    """Forma da consulta: espaços normalizados e listas IN (?, ?, ...) colapsadas."""
+    return _PLACEHOLDERS_IN.sub('(?...)', _ESPACOS.sub(' ', statement).strip())
+
+
+class EstatisticaSQL:
+    """Contagem e tempo das consultas executadas enquanto está ativa."""
+
+    __slots__ = ('total', 'tempo', 'formatos')
+
+    def __init__(self):
+        self.total = 0
+        self.tempo = 0.0
+        self.formatos: Counter = Counter()
+
+    def registrar(self, statement: str, duracao: float) -> None:
+        self.total += 1
+        self.tempo += duracao
+        self.formatos[statement] += 1
+
+    def suspeitas_n1(self, limite: int = LIMITE_N1) -> List[Tuple[str, int]]:
+        """[(forma da consulta, repetições)] que se repetiram `limite` vezes ou mais."""
+        agrupados: Counter = Counter()
+        for statement, vezes in self.formatos.items():
+            agrupados[formato_consulta(statement)] += vezes
+        return [(forma, vezes) for forma, vezes in agrupados.most_common() if vezes >= limite]
+
+
+class OrcamentoSQLExcedido(AssertionError):
+    pass
+
+
+@contextmanager
+def contar_consultas():
+    """Conta as consultas executadas dentro do bloco (inclusive por requisições do test client).
+
+        with contar_consultas() as sql:
+            client.get('/carrinho')
+        assert sql.total <= 5, sql.suspeitas_n1(2)
+    """
+    estatistica = EstatisticaSQL()
+    token = _ativas.set(_ativas.get() + (estatistica,))
+    try:
+        yield estatistica
+    finally:
+        _ativas.reset(token)
+
+
+def orcamento_sql(maximo: int) -> Callable:
+    """Decorator: número máximo de consultas esperado para a rota.
+
+    Acima dele a requisição é registrada como WARNING; com TESTING ou
+    SQL_ORCAMENTO_ESTRITO, levanta OrcamentoSQLExcedido.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.orcamento_sql = maximo
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _antes_cursor(conn, cursor, statement, parameters, context, executemany):
+    if _ativas.get() or _assinantes:
+        conn.info.setdefault('perfil_sql_inicio', []).append(time.perf_counter())
+
+
+def _erro_cursor(contexto):
+    # Consulta que falhou não chega ao after_cursor_execute: descarta o início
+    if contexto.connection is not None and contexto.connection.info.get('perfil_sql_inicio'):
+        contexto.connection.info['perfil_sql_inicio'].pop()
+
+
+def _depois_cursor(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('perfil_sql_inicio')
+    if not inicios:
+        return
+    duracao = time.perf_counter() - inicios.pop()
+    for estatistica in _ativas.get():
+        estatistica.registrar(statement, duracao)
+    for assinante in _assinantes:
+        assinante(conn, statement, parameters, duracao, executemany)
+
+
+def instalar_eventos() -> None:
+    """Escuta a execução de consultas de todas as engines (uma vez por processo)."""
+    global _instalado
+    if not _instalado:
+        event.listen(Engine, 'before_cursor_execute', _antes_cursor)
+        event.listen(Engine, 'after_cursor_execute', _depois_cursor)
+        event.listen(Engine, 'handle_error', _erro_cursor)
+        _instalado = True
+
+
+def assinar(funcao: Callable) -> None:
+    """Chama funcao(conn, statement, parameters, duracao, executemany) depois de cada consulta.
+
+    O tempo vem do mesmo par de eventos do contador por requisição: quem
+    precisa da duração de cada consulta assina aqui em vez de escutar a engine.
+    """
+    if funcao not in _assinantes:
+        _assinantes.append(funcao)
+    instalar_eventos()
+
+
+def estatistica_atual() -> Optional[EstatisticaSQL]:
+    return g.get('perfil_sql')
+
+
+def registrar(app) -> None:
+    """Contador de consultas por requisição, cabeçalho X-SQL-* e alerta de N+1.
+
+    Config: SQL_PERFIL (liga/desliga), SQL_N1_LIMITE, SQL_PERFIL_CABECALHO
+    (padrão: só em debug) e SQL_ORCAMENTO_ESTRITO (padrão: só com TESTING).
+    """
+    app.config.setdefault('SQL_PERFIL', True)
+    app.config.setdefault('SQL_N1_LIMITE', LIMITE_N1)
+    if os.getenv('SQL_PERFIL_CABECALHO'):
+        # Ex.: scripts/bench_carga.py lê X-SQL-Queries de um servidor rodando fora de debug
+        app.config.setdefault('SQL_PERFIL_CABECALHO', os.getenv('SQL_PERFIL_CABECALHO') != '0')
+    if not app.config['SQL_PERFIL']:
+        return
+    instalar_eventos()
+
+    @app.before_request
+    def iniciar_perfil_sql():
+        estatistica = EstatisticaSQL()
+        g.perfil_sql = estatistica
+        g.perfil_sql_token = _ativas.set(_ativas.get() + (estatistica,))
+
+    @app.after_request
+    def resumir_perfil_sql(response):
+        estatistica = g.get('perfil_sql')
+        if estatistica is None:
+            return response
+        suspeitas = estatistica.suspeitas_n1(current_app.config['SQL_N1_LIMITE'])
+        if current_app.config.get('SQL_PERFIL_CABECALHO', current_app.debug):
+            response.headers['X-SQL-Queries'] = str(estatistica.total)
+            response.headers['X-SQL-Time'] = f"{estatistica.tempo * 1000:.1f}ms"
+            if suspeitas:
+                response.headers['X-SQL-N1'] = '; '.join(f"{vezes}x {forma[:80]}" for forma, vezes in suspeitas)
+
+        if suspeitas:
+            log.warning("Possível N+1 em %s %s: %s", request.method, request.path,
+                        ', '.join(f"{vezes}x {forma[:120]}" for forma, vezes in suspeitas),
+                        extra={'endpoint': request.endpoint, 'consultas': estatistica.total})
+        elif log.isEnabledFor(logging.DEBUG):
+            log.debug("%s %s: %d consulta(s), %.1f ms", request.method, request.path,
+                      estatistica.total, estatistica.tempo * 1000)
+
+        orcamento = g.get('orcamento_sql')
+        if orcamento is not None and estatistica.total > orcamento:
+            mensagem = f"{request.endpoint}: {estatistica.total} consultas (orçamento {orcamento})"
+            if current_app.config.get('SQL_ORCAMENTO_ESTRITO', current_app.testing):
+                raise OrcamentoSQLExcedido(mensagem)
+            log.warning("Orçamento de consultas excedido em %s", mensagem)
+        return response
+
+    @app.teardown_request
+    def encerrar_perfil_sql(_erro=None):
+        token = g.pop('perfil_sql_token', None)
+        if token is not None:
+            try:
+                _ativas.reset(token)
+            except ValueError:
+                # Token criado em outro contexto (ex.: resposta em streaming)
+                _ativas.set(())
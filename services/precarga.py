@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import importlib
+import os
+import time
+
+from services.banco import fechar_pools
+from services.logs import obter_logger
+
+log = obter_logger('app')
+
+# Importados só quando usados (para o boot sem --preload ficar leve); com
+# --preload vale carregá-los uma vez no mestre e dividir as páginas
+MODULOS_SOB_DEMANDA = (
+    'smtplib', 'email.mime.multipart', 'email.mime.text',
+    'requests', 'PIL.Image', 'PIL.ImageOps',
+)
+EXTENSOES_TEMPLATE = ('.html', '.xml', '.txt')
+
+
+def preload_ativo() -> bool:
+    """Aplicação carregada no mestre do gunicorn antes do fork (GUNICORN_PRELOAD, ver gunicorn.conf.py)."""
+    return os.getenv('GUNICORN_PRELOAD', '0') == '1'
+
+
+def compilar_templates(app) -> int:
+    """Compila todos os templates Jinja para o cache do ambiente; devolve quantos."""
+    env = app.jinja_env
+    nomes = env.list_templates(filter_func=lambda nome: nome.endswith(EXTENSOES_TEMPLATE))
+    for nome in nomes:
+        env.get_template(nome)
+    return len(nomes)
+
+
+def importar_modulos(nomes=MODULOS_SOB_DEMANDA) -> int:
+    importados = 0
+    for nome in nomes:
+        try:
+            importlib.import_module(nome)
+            importados += 1
+        except ImportError:
+            pass  # dependência opcional (ex.: Pillow fora do ambiente)
+    return importados
+
+
+def registrar(app) -> None:
+    """Com PRELOAD, deixa no mestre tudo o que é imutável e nenhuma conexão aberta.
+
+    Templates compilados, módulos e manifestos carregados aqui são herdados
+    pelos workers por copy-on-write. As conexões abertas durante o boot
+    (verificação do schema) são fechadas: cada worker abre as suas no
+    post_fork (services.banco.preparar_worker).
+    """
+    if not app.config.get('PRELOAD'):
+        return
+    inicio = time.perf_counter()
+    templates = compilar_templates(app)
+    modulos = importar_modulos()
+    fechar_pools(app)
+    log.info("Pré-carga no mestre: %d templates compilados, %d módulos em %.0f ms",
+             templates, modulos, (time.perf_counter() - inicio) * 1000)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+from services.banco import opcoes_engine
+from services.logs import obter_logger
+
+log = obter_logger('banco')
+
+PREFIXO_BIND = 'replica_'
+# Atraso de replicação tolerado (s): réplicas mais atrasadas saem da rotação e,
+# depois de uma escrita, o mesmo visitante lê do primário por esse tempo
+ATRASO_MAX = 5.0
+INTERVALO_CHECAGEM = 30.0
+# Momento da última escrita do visitante (sessão Flask)
+MARCA_ESCRITA = '_db_escrita'
+
+# engine -> (saudável, verificado_em)
+_saude: Dict[object, Tuple[bool, float]] = {}
+# Uma checagem por engine de cada vez; _lock só protege a criação desses locks
+_checando: Dict[object, threading.Lock] = {}
+_lock = threading.Lock()
+
+
+def binds_replicas(uris: str) -> dict:
+    """SQLALCHEMY_BINDS a partir de DB_REPLICAS (URIs separadas por vírgula)."""
+    binds = {}
+    for indice, uri in enumerate(u.strip() for u in uris.split(',') if u.strip()):
+        binds[f"{PREFIXO_BIND}{indice}"] = {'url': uri, **opcoes_engine(uri)}
+    return binds
+
+
+def atraso_replicacao(engine) -> Optional[float]:
+    """Segundos de atraso da réplica; None se está fora do ar ou com a replicação parada."""
+    try:
+        with engine.connect() as conexao:
+            if conexao.dialect.name == 'sqlite':
+                # SELECT 1 não chega a ler o arquivo
+                conexao.exec_driver_sql('SELECT COUNT(*) FROM sqlite_master')
+                return 0.0
+            if conexao.dialect.name not in ('mysql', 'mariadb'):
+                conexao.exec_driver_sql('SELECT 1')
+                return 0.0
+            for comando in ('SHOW REPLICA STATUS', 'SHOW SLAVE STATUS'):
+                try:
+                    linha = conexao.exec_driver_sql(comando).mappings().first()
+                except DBAPIError:
+                    # MySQL antigo (sem REPLICA) ou usuário sem REPLICATION CLIENT
+                    conexao.rollback()
+                    continue
+                if linha is None:
+                    return 0.0  # não é réplica (ex.: o próprio primário em desenvolvimento)
+                atraso = linha.get('Seconds_Behind_Source', linha.get('Seconds_Behind_Master'))
+                return None if atraso is None else float(atraso)
+            conexao.exec_driver_sql('SELECT 1')
+            return 0.0
+    except SQLAlchemyError as e:
+        log.warning("Réplica %s indisponível: %s", engine.url.host or engine.url.database, e)
+        return None
+
+
+def _saudavel(engine, atraso_max: float, intervalo: float) -> bool:
+    agora = time.monotonic()
+    estado = _saude.get(engine)
+    if estado is not None and agora - estado[1] < intervalo:
+        return estado[0]
+    with _lock:
+        checando = _checando.setdefault(engine, threading.Lock())
+    # Outra thread já está consultando esta réplica: fica com o último resultado
+    # (ou com o primário, se ainda não há nenhum) em vez de esperar pela rede
+    if not checando.acquire(blocking=False):
+        return estado is not None and estado[0]
+    try:
+        atraso = atraso_replicacao(engine)
+        saudavel = atraso is not None and atraso <= atraso_max
+        if estado is not None and estado[0] != saudavel:
+            log.warning("Réplica %s %s (atraso: %s s)", engine.url.host or engine.url.database,
+                        'de volta à rotação' if saudavel else 'fora da rotação', atraso)
+        _saude[engine] = (saudavel, time.monotonic())
+        return saudavel
+    finally:
+        checando.release()
+
+
+def escolher_replica(db) -> Optional[object]:
+    """Uma réplica saudável ao acaso, ou None (usar o primário).
+
+    Dentro de uma requisição a escolha é feita uma vez e guardada em g: todos
+    os SELECTs da página leem da mesma réplica (mesmo ponto da replicação).
+    """
+    if has_request_context() and 'replica_escolhida' in g:
+        return g.replica_escolhida
+    config = current_app.config
+    replicas: List[object] = [
+        engine for chave, engine in db.engines.items()
+        if chave and chave.startswith(PREFIXO_BIND)
+        and _saudavel(engine, config['DB_REPLICA_ATRASO_MAX'], config['DB_REPLICA_CHECAGEM'])
+    ]
+    escolhida = random.choice(replicas) if replicas else None
+    if has_request_context():
+        g.replica_escolhida = escolhida
+    return escolhida
+
+
+class SessaoRoteada(Session):
+    """Sessão que manda os SELECTs de rotas de leitura para uma réplica.
+
+    Escritas (flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE) vão para o
+    primário e, a partir daí, o resto da requisição também lê do primário.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase) or (
+                isinstance(clause, Select) and clause._for_update_arg is not None
+            ):
+                self.info['escreveu'] = True
+            elif (isinstance(clause, Select) and not self.info.get('escreveu')
+                  and has_request_context() and g.get('banco_leitura')):
+                replica = escolher_replica(self._db)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _escreveu_recentemente() -> bool:
+    return time.time() - session.get(MARCA_ESCRITA, 0) < current_app.config['DB_REPLICA_ATRASO_MAX']
+
+
+def leitura_replica(view):
+    """Decorator: rota só de leitura, pode ler de uma réplica (se houver e o visitante não escreveu há pouco)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_app.config.get('SQLALCHEMY_BINDS') and not _escreveu_recentemente():
+            g.banco_leitura = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def registrar(app) -> None:
+    """Marca na sessão do visitante as requisições que escreveram no banco (leitura após escrita)."""
+    app.config.setdefault('DB_REPLICA_ATRASO_MAX', float(os.getenv('DB_REPLICA_ATRASO_MAX', ATRASO_MAX)))
+    app.config.setdefault('DB_REPLICA_CHECAGEM', float(os.getenv('DB_REPLICA_CHECAGEM', INTERVALO_CHECAGEM)))
+    if not app.config.get('SQLALCHEMY_BINDS'):
+        return
+    from models import db
+
+    log.info("Leituras do catálogo/admin distribuídas entre %d réplica(s)", len(app.config['SQLALCHEMY_BINDS']))
+
+    @app.after_request
+    def marcar_escrita(response):
+        if db.session.info.get('escreveu'):
+            session[MARCA_ESCRITA] = time.time()
+        return response
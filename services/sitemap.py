@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from flask import current_app, request
+
+from services.logs import obter_logger
+
+log = obter_logger('sitemap')
+
+# Limites do protocolo (sitemaps.org): 50.000 URLs e 50 MB por arquivo
+LIMITE_URLS = 50_000
+LIMITE_BYTES = 50 * 1024 * 1024
+
+_XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# (loc, lastmod, changefreq)
+Entrada = Tuple[str, Optional[datetime], str]
+
+
+def origem_canonica() -> str:
+    """Origem pública do site (com / no fim) para URLs absolutas compartilhadas.
+
+    Sitemap e robots.txt são cacheados e servidos a todos os visitantes, então
+    não podem vir do Host da requisição (um "Host: evil.example" ficaria no
+    cache e no disco). Usa SITE_URL ou SERVER_NAME + PREFERRED_URL_SCHEME; só
+    sem nenhum dos dois (desenvolvimento) cai no Host da requisição.
+    """
+    config = current_app.config
+    if config.get('SITE_URL'):
+        return config['SITE_URL'].rstrip('/') + '/'
+    if config.get('SERVER_NAME'):
+        return f"{config.get('PREFERRED_URL_SCHEME', 'http')}://{config['SERVER_NAME']}{request.script_root}/"
+    return request.url_root
+
+
+def _data_w3c(data: Optional[datetime]) -> Optional[str]:
+    return data.strftime('%Y-%m-%dT%H:%M:%S+00:00') if data else None
+
+
+def _urlset(entradas: Sequence[Entrada]) -> bytes:
+    partes = ['<?xml version="1.0" encoding="UTF-8"?>\n', f'<urlset xmlns="{_XMLNS}">\n']
+    for loc, lastmod, changefreq in entradas:
+        partes.append(f'<url><loc>{escape(loc)}</loc>')
+        if lastmod:
+            partes.append(f'<lastmod>{_data_w3c(lastmod)}</lastmod>')
+        partes.append(f'<changefreq>{changefreq}</changefreq></url>\n')
+    partes.append('</urlset>\n')
+    return ''.join(partes).encode('utf-8')
+
+
+def _sitemapindex(arquivos: Sequence[Tuple[str, Optional[datetime]]]) -> bytes:
+    partes = ['<?xml version="1.0" encoding="UTF-8"?>\n', f'<sitemapindex xmlns="{_XMLNS}">\n']
+    for loc, lastmod in arquivos:
+        partes.append(f'<sitemap><loc>{escape(loc)}</loc>')
+        if lastmod:
+            partes.append(f'<lastmod>{_data_w3c(lastmod)}</lastmod>')
+        partes.append('</sitemap>\n')
+    partes.append('</sitemapindex>\n')
+    return ''.join(partes).encode('utf-8')
+
+
+def _dividir(entradas: List[Entrada], limite_urls: int, limite_bytes: int) -> List[List[Entrada]]:
+    """Divide as entradas em lotes que respeitam os limites de URLs e de bytes."""
+    lotes: List[List[Entrada]] = [[]]
+    tamanho = len(_urlset([]))
+    for entrada in entradas:
+        tamanho_entrada = len(_urlset([entrada])) - len(_urlset([]))
+        if lotes[-1] and (len(lotes[-1]) >= limite_urls or tamanho + tamanho_entrada > limite_bytes):
+            lotes.append([])
+            tamanho = len(_urlset([]))
+        lotes[-1].append(entrada)
+        tamanho += tamanho_entrada
+    return lotes
+
+
+class SitemapCache:
+    """Sitemap gerado uma vez por versão do catálogo, em memória e em disco.
+
+    `versao()` é barata (uma consulta agregada) e só é chamada a cada
+    `ttl` segundos; quando muda, as entradas são relidas e apenas os lotes
+    cujo conteúdo mudou são serializados de novo. Os arquivos ficam em
+    `pasta` para que outros workers (ou um restart) os reaproveitem.
+    Acima dos limites do protocolo, sitemap.xml vira um índice apontando
+    para sitemap-1.xml, sitemap-2.xml, ...
+    """
+
+    def __init__(self, pasta: str, ttl: float = 60, limite_urls: int = LIMITE_URLS,
+                 limite_bytes: int = LIMITE_BYTES):
+        self.pasta = pasta
+        self.ttl = ttl
+        self.limite_urls = limite_urls
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        self._chave: Optional[str] = None
+        self._verificado_em = 0.0
+        self._arquivos: Dict[str, Tuple[bytes, Optional[datetime]]] = {}
+        self._lotes: Dict[str, bytes] = {}
+
+    def _ler_disco(self, chave: str) -> bool:
+        try:
+            with open(os.path.join(self.pasta, 'versao.txt'), encoding='utf-8') as f:
+                linhas = f.read().splitlines()
+        except OSError:
+            return False
+        if not linhas or linhas[0] != chave:
+            return False
+        arquivos = {}
+        for linha in linhas[1:]:
+            nome, _, lastmod = linha.partition(' ')
+            try:
+                with open(os.path.join(self.pasta, nome), 'rb') as f:
+                    arquivos[nome] = (f.read(), datetime.fromisoformat(lastmod) if lastmod else None)
+            except (OSError, ValueError):
+                return False
+        self._arquivos = arquivos
+        return True
+
+    def _gravar_disco(self, chave: str) -> None:
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            for nome, (conteudo, _) in self._arquivos.items():
+                destino = os.path.join(self.pasta, nome)
+                with open(f"{destino}.tmp", 'wb') as f:
+                    f.write(conteudo)
+                os.replace(f"{destino}.tmp", destino)
+            # versao.txt por último: só vale depois de todos os arquivos gravados
+            indice = [chave] + [
+                f"{nome} {lastmod.isoformat() if lastmod else ''}".rstrip()
+                for nome, (_, lastmod) in self._arquivos.items()
+            ]
+            destino = os.path.join(self.pasta, 'versao.txt')
+            with open(f"{destino}.tmp", 'w', encoding='utf-8') as f:
+                f.write('\n'.join(indice) + '\n')
+            os.replace(f"{destino}.tmp", destino)
+        except OSError as e:
+            log.warning("Não foi possível gravar o sitemap em disco: %s", e)
+
+    def _gerar(self, base: str, entradas: List[Entrada]) -> None:
+        lotes = _dividir(entradas, self.limite_urls, self.limite_bytes)
+        lotes_anteriores, self._lotes = self._lotes, {}
+        arquivos: Dict[str, Tuple[bytes, Optional[datetime]]] = {}
+
+        def _serializar(lote: List[Entrada]) -> bytes:
+            # Lote idêntico ao da geração anterior: reaproveita os bytes
+            assinatura = hashlib.sha256(repr(lote).encode('utf-8')).hexdigest()
+            conteudo = lotes_anteriores.get(assinatura) or _urlset(lote)
+            self._lotes[assinatura] = conteudo
+            return conteudo
+
+        def _ultima(lote: List[Entrada]) -> Optional[datetime]:
+            return max((e[1] for e in lote if e[1]), default=None)
+
+        if len(lotes) == 1:
+            arquivos['sitemap.xml'] = (_serializar(lotes[0]), _ultima(lotes[0]))
+        else:
+            indice = []
+            for n, lote in enumerate(lotes, start=1):
+                nome = f"sitemap-{n}.xml"
+                arquivos[nome] = (_serializar(lote), _ultima(lote))
+                indice.append((f"{base.rstrip('/')}/{nome}", arquivos[nome][1]))
+            arquivos['sitemap.xml'] = (_sitemapindex(indice), max((d for _, d in indice if d), default=None))
+        self._arquivos = arquivos
+
+    def obter(self, nome: str, base: str, versao: Callable[[], str],
+              entradas: Callable[[], List[Entrada]]) -> Optional[Tuple[bytes, Optional[datetime]]]:
+        """(conteúdo, lastmod) de um arquivo do sitemap, regenerando se o catálogo mudou."""
+        with self._lock:
+            agora = time.monotonic()
+            if self._chave is None or agora - self._verificado_em >= self.ttl:
+                chave = hashlib.sha256(f"{base}|{versao()}".encode('utf-8')).hexdigest()[:32]
+                self._verificado_em = agora
+                if chave != self._chave:
+                    if not self._ler_disco(chave):
+                        self._gerar(base, entradas())
+                        self._gravar_disco(chave)
+                    self._chave = chave
+            return self._arquivos.get(nome)
@@ -52,26 +52,14 @@ function initAdminNavigation() {
  * Funcionalidades de tabelas
  */
 function initDataTables() {
-    // Filtros
+    // Filtros (aplicados no servidor)
     const statusFilter = document.getElementById('status-filter');
-    if (statusFilter) {
+    if (statusFilter && statusFilter.form) {
         statusFilter.addEventListener('change', function() {
-            filterTableRows('status', this.value);
+            this.form.submit();
         });
     }
     
-    // Ordenação
-    const sortButtons = document.querySelectorAll('[data-sort]');
-    sortButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            const column = this.dataset.sort;
-            const direction = this.dataset.direction === 'asc' ? 'desc' : 'asc';
-            this.dataset.direction = direction;
-            
-            sortTable(column, direction);
-        });
-    });
-    
     // Seleção múltipla
     const selectAll = document.querySelector('#select-all');
     if (selectAll) {
@@ -90,76 +78,6 @@ function initDataTables() {
     });
 }
 
-/**
- * Filtrar linhas da tabela
- */
-function filterTableRows(filterType, filterValue) {
-    const rows = document.querySelectorAll('.product-row');
-    
-    rows.forEach(row => {
-        let show = true;
-        
-        if (filterType === 'status' && filterValue) {
-            const rowStatus = row.dataset.status;
-            show = rowStatus === filterValue;
-        }
-        
-        row.style.display = show ? 'table-row' : 'none';
-    });
-    
-    updateTableCount();
-}
-
-/**
- * Ordenar tabela
- */
-function sortTable(column, direction) {
-    const tbody = document.querySelector('.admin-table tbody');
-    const rows = Array.from(tbody.querySelectorAll('tr'));
-    
-    rows.sort((a, b) => {
-        let aValue, bValue;
-        
-        switch (column) {
-            case 'name':
-                aValue = a.querySelector('.product-name-content h4').textContent;
-                bValue = b.querySelector('.product-name-content h4').textContent;
-                break;
-            case 'price':
-                aValue = parseFloat(a.querySelector('.price-display').textContent.replace('R$ ', ''));
-                bValue = parseFloat(b.querySelector('.price-display').textContent.replace('R$ ', ''));
-                break;
-            case 'date':
-                aValue = a.querySelector('.date-display').textContent;
-                bValue = b.querySelector('.date-display').textContent;
-                break;
-            default:
-                return 0;
-        }
-        
-        if (direction === 'asc') {
-            return aValue > bValue ? 1 : -1;
-        } else {
-            return aValue < bValue ? 1 : -1;
-        }
-    });
-    
-    rows.forEach(row => tbody.appendChild(row));
-}
-
-/**
- * Atualizar contador da tabela
- */
-function updateTableCount() {
-    const visibleRows = document.querySelectorAll('.product-row[style*="table-row"], .product-row:not([style])');
-    const totalRows = document.querySelectorAll('.product-row');
-    const countElement = document.querySelector('.table-count');
-    
-    if (countElement) {
-        countElement.textContent = `${visibleRows.length} de ${totalRows.length} produtos`;
-    }
-}
-
 /**
  * Atualizar ações em lote
  */